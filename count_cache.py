@@ -0,0 +1,220 @@
+'''
+Cache for the big list endpoints that checks the matching count endpoint before re-downloading
+
+get_detections, get_timelines and friends are expensive to pull in full, but their count
+endpoints are tiny. CountValidatedCache keeps the last full list and only pulls it again
+when the count (plus any extra fingerprint you give it) says something changed.
+
+Usage:
+    cache = CountValidatedCache(test, directory="list_cache")
+    detections = cache.get("get_detections")       # first call pulls the full list
+    detections = cache.get("get_detections")       # later calls only hit detections_count
+    cache.stats                                    # ---> {"probes": 2, "refetches": 1, "bytes_saved": ...}
+
+    # every caller gets its own list, but the records in it are shared with the cache, so copy a
+    # record before changing it
+
+
+    # counts do not change when a record is replaced (one deleted, one added), add a fingerprint
+    # for lists where that matters, ex: the highest ID from a cheap query you already have.
+    # It is called with the LiongardAPI instance and compared the same way the count is
+    cache = CountValidatedCache(test, fingerprints={"get_alerts": newest_alert_ID})
+'''
+
+import os
+import json
+import time
+import threading
+
+
+# list method ---> count method used to validate it
+COUNTS = {
+    "get_environments": "environment_count",
+    "get_systems": "system_count",
+    "get_alerts": "alert_count",
+    "get_detections": "detections_count",
+    "get_agents": "agent_count",
+    "get_users": "user_count",
+    "get_launchpoints": "get_launchpoints_count",
+    "get_timelines": "get_timeline_count",
+}
+
+# records serialized to estimate the size of a list for bytes_saved, instead of all of them
+SIZE_SAMPLE = 64
+
+
+def _estimate_bytes(data):
+    '''
+    Helper function: about how many bytes of JSON data is, from an evenly spaced sample of its records
+    '''
+    if not isinstance(data, list) or len(data) <= SIZE_SAMPLE:
+        return len(json.dumps(data, default=str))
+
+    step = len(data) / SIZE_SAMPLE
+    sampled = sum(len(json.dumps(data[int(index * step)], default=str)) for index in range(SIZE_SAMPLE))
+
+    # the records plus ", " between them and the brackets
+    return int(sampled / SIZE_SAMPLE * len(data)) + 2 * len(data)
+
+
+class CountValidatedCache():
+    '''
+    Purpose:
+        holds the last full result for each list method along with the count it was pulled at
+
+    Usage:
+        max_age ---> seconds a cached list is trusted without even probing the count, 0 probes every time
+        fingerprints ---> {list method: callable(api)} extra cheap checks, see the module docstring
+        directory ---> optional folder to keep the cache in so it survives between script runs
+
+        stats ---> probes, hits (count unchanged), refetches and bytes_saved (estimated size of
+            the JSON that did not have to be downloaded again)
+
+    List of Methods:
+        def get(self, method, force=False)
+        def invalidate(self, method="")
+    '''
+
+    def __init__(self, api, max_age=0, fingerprints=None, directory=""):
+        self.api = api
+        self.max_age = max_age
+        self.fingerprints = fingerprints or {}
+        self.directory = directory
+
+        self.entries = {}
+        self.locks = {method: threading.Lock() for method in COUNTS}
+        self.stats = {"probes": 0, "hits": 0, "refetches": 0, "bytes_saved": 0}
+        self.stats_lock = threading.Lock()
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+
+    def _path(self, method):
+        return os.path.join(self.directory, f"{method}.json")
+
+
+    def _load(self, method):
+        '''
+        Helper function: cached entry for method from memory, or from disk if a directory was given
+        '''
+        if method in self.entries:
+            return self.entries[method]
+
+        if self.directory and os.path.exists(self._path(method)):
+            with open(self._path(method), 'r') as reader:
+                self.entries[method] = json.load(reader)
+            return self.entries[method]
+
+        return None
+
+
+    def _save(self, method, entry):
+        self.entries[method] = entry
+
+        if self.directory:
+            with open(f"{self._path(method)}.tmp", 'w') as writer:
+                json.dump(entry, writer)
+            os.replace(f"{self._path(method)}.tmp", self._path(method))
+
+
+    def _tally(self, **amounts):
+        '''
+        Helper function: adds to self.stats, the per-method locks do not cover it since every method shares it
+        '''
+        with self.stats_lock:
+            for name, amount in amounts.items():
+                self.stats[name] += amount
+
+
+    def signature(self, method):
+        '''
+        Helper function: the count (and fingerprint, if there is one) for a list method right now
+
+        returns: None when the count endpoint did not give back a number, so a failed probe
+            (the count methods return 0 or False on errors) is never taken as "nothing changed",
+            a real count of 0 is treated the same way since an empty list is cheap to pull again
+        '''
+        self._tally(probes=1)
+
+        count = getattr(self.api, COUNTS[method])()
+
+        if not isinstance(count, int) or isinstance(count, bool) or count == 0:
+            return None
+
+        signature = [str(count)]
+
+        if method in self.fingerprints:
+            signature.append(json.dumps(self.fingerprints[method](self.api), sort_keys=True, default=str))
+
+        return signature
+
+
+    def get(self, method, force=False):
+        '''
+        description:
+            returns the full list for method ---> one of the keys in COUNTS, ex: "get_detections"
+            the list is only pulled again if its count changed or force is True
+
+        returns: the same thing the list method returns, a list is a new list every call but the
+            records in it are the cached ones, treat them as read-only
+        '''
+        if method not in COUNTS:
+            raise ValueError(f"{method} has no count endpoint to validate against, pick one of {sorted(COUNTS)}")
+
+        with self.locks[method]:
+            entry = self._load(method)
+
+            if entry is not None and not force:
+                if self.max_age and time.time() - entry["fetched"] < self.max_age:
+                    self._tally(hits=1, bytes_saved=entry["bytes"])
+                    return CountValidatedCache._copy(entry["data"])
+
+                signature = self.signature(method)
+
+                if signature is not None and signature == entry["signature"]:
+                    entry["fetched"] = time.time()
+                    self._tally(hits=1, bytes_saved=entry["bytes"])
+                    return CountValidatedCache._copy(entry["data"])
+            else:
+                signature = self.signature(method)
+
+            data = getattr(self.api, method)()
+            self._tally(refetches=1)
+
+            # the error values the list methods return (0/False) are not worth caching, and without
+            # a count there is nothing to check the list against next time
+            if data is False or data == 0:
+                return data
+
+            if signature is None:
+                self.invalidate(method)
+                return data
+
+            self._save(method, {
+                "signature": signature,
+                "data": data,
+                "bytes": _estimate_bytes(data),
+                "fetched": time.time(),
+            })
+
+            return CountValidatedCache._copy(data)
+
+
+    @classmethod
+    def _copy(self, data):
+        '''
+        Helper function: a new list around the cached records so callers can sort or filter it in place
+        '''
+        return list(data) if isinstance(data, list) else data
+
+
+    def invalidate(self, method=""):
+        '''
+        forgets the cached list for method, or for every method when left blank
+        '''
+        for name in ([method] if method else list(COUNTS)):
+            self.entries.pop(name, None)
+
+            if self.directory and os.path.exists(self._path(name)):
+                os.remove(self._path(name))
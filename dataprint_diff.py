@@ -0,0 +1,209 @@
+'''
+Structural diff engine for dataprints returned by LiongardAPI.get_system_detail_view
+
+Every node of a dataprint (dict, list or plain value) gets a Merkle style hash built
+from the hashes of its children. Two dataprints can then be compared top down and any
+subtree whose hash matches on both sides is skipped without looking inside of it.
+
+Usage:
+    old_tree = hash_tree(yesterday)            # or load_hash_tree("yesterday_hashes")
+    new_tree = hash_tree(today)
+    changes = diff_dataprints(yesterday, today, old_tree, new_tree)
+
+    save_hash_tree(new_tree, "today_hashes")   # cache it for tomorrow's comparison
+'''
+
+import json
+import hashlib
+from collections import deque
+
+
+def _digest(data):
+    '''
+    Helper function: 16 byte blake2b digest returned as a hex string
+    '''
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def hash_tree(data):
+    '''
+    description:
+        builds the hash tree for a dataprint (or any JSON parseable object)
+
+    returns:
+        nested dictionary mirroring the shape of the data
+            {"h": <hex hash>}                         ---> plain values
+            {"h": <hex hash>, "d": {key: node, ...}}  ---> dictionaries
+            {"h": <hex hash>, "l": [node, ...]}       ---> lists
+
+    the tree only holds hashes, so it can be cached with save_hash_tree and reused
+    '''
+    if isinstance(data, dict):
+        children = {}
+        parts = [b"d"]
+        for key in sorted(data):
+            node = hash_tree(data[key])
+            children[key] = node
+            parts.append(json.dumps(key).encode())
+            parts.append(node["h"].encode())
+
+        return {"h": _digest(b"\x00".join(parts)), "d": children}
+
+    if isinstance(data, list):
+        children = [hash_tree(item) for item in data]
+        parts = [b"l"] + [node["h"].encode() for node in children]
+
+        return {"h": _digest(b"\x00".join(parts)), "l": children}
+
+    return {"h": _digest(b"v" + json.dumps(data, sort_keys=True).encode())}
+
+
+def save_hash_tree(tree, file):
+    '''
+    Helper function: dumps a hash tree to the user specified file, .json is added automatically
+    '''
+    with open(f"{file}.json", 'w') as dumper:
+        json.dump(tree, dumper, separators=(",", ":"))
+
+
+def load_hash_tree(file):
+    '''
+    Helper function: loads a hash tree that was saved with save_hash_tree
+    '''
+    with open(f"{file}.json", 'r') as loader:
+        return json.load(loader)
+
+
+def _join(path, key):
+    '''
+    Helper function: builds JMESpath style paths ---> Computers[3].Name
+    '''
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+
+    return f"{path}.{key}" if path else str(key)
+
+
+def diff_dataprints(old, new, old_tree=None, new_tree=None, path=""):
+    '''
+    description:
+        compares two dataprints and returns a list of the paths that changed between them
+
+        old_tree/new_tree ---> the hash trees for old/new, if they are not passed they are
+            built on the spot. Pass in cached trees so only the changed subtrees are walked
+
+    returns:
+        list of changes, each one looks like
+            {"path": "Computers[3].Name", "change": "modified", "old": "PC-1", "new": "PC-2"}
+
+        "change" is one of "added", "removed" or "modified"
+
+        list items are matched up by hash (and then by ID) instead of by position, so one record
+        inserted at the front of a list is one "added", list paths use the position in new
+        (in old for "removed")
+    '''
+    if old_tree is None:
+        old_tree = hash_tree(old)
+    if new_tree is None:
+        new_tree = hash_tree(new)
+
+    changes = []
+    _diff_node(old, new, old_tree, new_tree, path, changes)
+
+    return changes
+
+
+def _diff_node(old, new, old_tree, new_tree, path, changes):
+    '''
+    Helper function: walks both trees at the same time, identical hashes end the walk
+    '''
+    if old_tree["h"] == new_tree["h"]:
+        return
+
+    if "d" in old_tree and "d" in new_tree:
+        old_children = old_tree["d"]
+        new_children = new_tree["d"]
+
+        for key in old_children:
+            if key not in new_children:
+                changes.append({"path": _join(path, key), "change": "removed", "old": old[key], "new": None})
+            else:
+                _diff_node(old[key], new[key], old_children[key], new_children[key], _join(path, key), changes)
+
+        for key in new_children:
+            if key not in old_children:
+                changes.append({"path": _join(path, key), "change": "added", "old": None, "new": new[key]})
+
+        return
+
+    if "l" in old_tree and "l" in new_tree:
+        old_children = old_tree["l"]
+        new_children = new_tree["l"]
+
+        for old_index, new_index in _match_items(old, new, old_children, new_children):
+            if old_index is None:
+                changes.append({"path": _join(path, new_index), "change": "added", "old": None, "new": new[new_index]})
+            elif new_index is None:
+                changes.append({"path": _join(path, old_index), "change": "removed", "old": old[old_index], "new": None})
+            else:
+                _diff_node(old[old_index], new[new_index], old_children[old_index], new_children[new_index],
+                           _join(path, new_index), changes)
+
+        return
+
+    changes.append({"path": path, "change": "modified", "old": old, "new": new})
+
+
+def _match_items(old, new, old_children, new_children):
+    '''
+    Helper function: pairs up the items of two lists so an insert or delete does not shift
+    every item after it in to a "modified"
+
+        items with the same subtree hash are paired first (in order), they are unchanged
+        items left over that are dictionaries with the same ID are paired next, they get diffed
+        anything still left over was added (new side) or removed (old side)
+
+    returns: list of (old index, new index) for the pairs to diff, (old index, None) for the
+        removed items and (None, new index) for the added ones, paths use the new index
+    '''
+    by_hash = {}
+    for index, node in enumerate(old_children):
+        by_hash.setdefault(node["h"], deque()).append(index)
+
+    matched_old = set()
+    unmatched_new = []
+    for index, node in enumerate(new_children):
+        if by_hash.get(node["h"]):
+            matched_old.add(by_hash[node["h"]].popleft())
+        else:
+            unmatched_new.append(index)
+
+    by_ID = {}
+    for index in range(len(old_children)):
+        if index not in matched_old and _item_ID(old[index]) is not None:
+            by_ID.setdefault(_item_ID(old[index]), deque()).append(index)
+
+    pairs = []
+    for index in unmatched_new:
+        ID = _item_ID(new[index])
+        if ID is not None and by_ID.get(ID):
+            old_index = by_ID[ID].popleft()
+            matched_old.add(old_index)
+            pairs.append((old_index, index))
+        else:
+            pairs.append((None, index))
+
+    removed = [(index, None) for index in range(len(old_children)) if index not in matched_old]
+
+    return removed + pairs
+
+
+def _item_ID(item):
+    '''
+    Helper function: the ID of a list item that is a record, else None
+    '''
+    if isinstance(item, dict):
+        ID = item.get("ID")
+        return json.dumps(ID, sort_keys=True) if ID is not None else None
+
+    return None
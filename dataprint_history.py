@@ -0,0 +1,304 @@
+'''
+Content addressed history store for dataprints returned by LiongardAPI.get_system_detail_view
+
+Dataprints are split into subtrees keyed by their Merkle hash (see dataprint_diff.hash_tree),
+every unique subtree is written to a local SQLite file exactly once. A version is just the
+root hash recorded against a systemID and a date, so a day where 95% of the dataprint did not
+change only costs the subtrees that did. Long lists are stored as a tree of pages whose
+boundaries depend on the items' content, so changing (or inserting) one item only rewrites the
+page it is in, not every item hash of the list.
+
+Usage:
+    history = DataprintHistory("history")      # creates history.db in the current directory
+    history.record(api, 1234)                  # pulls today's dataprint and stores it
+    history.list_versions(1234)                # ---> ["2022-08-01", "2022-08-02", ...]
+    history.fetch_version(1234, "2022-08-01")  # ---> the dataprint exactly as it was stored, key order included
+'''
+
+import copy
+import json
+import zlib
+import hashlib
+import sqlite3
+import datetime
+
+from dataprint_diff import hash_tree
+
+
+# average number of items in a list page, a page ends after an item whose hash is a multiple of this
+LIST_PAGE = 64
+
+# no page is allowed to grow past this many items
+MAX_LIST_PAGE = LIST_PAGE * 4
+
+
+def _digest(text):
+    '''
+    Helper function: 16 byte blake2b digest of text as a hex string
+    '''
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+class DataprintHistory():
+    '''
+    Purpose:
+        stores daily dataprints for audit history without storing the same content twice
+
+    Usage:
+        file ---> name of the SQLite file to use, .db is added automatically
+        inline_bytes ---> lists/dicts that hold only plain values and serialize smaller than this
+            are kept inside of their parent instead of becoming their own chunk
+
+    List of Methods:
+        def put(self, systemID, dataprint, date="", tree=None)
+        def record(self, api, systemID, date="")
+        def list_versions(self, systemID)
+        def list_systems(self)
+        def fetch_version(self, systemID, date)
+        def stats(self)
+    '''
+
+    def __init__(self, file="dataprint_history", inline_bytes=256):
+        self.inline_bytes = inline_bytes
+
+        self.connection = sqlite3.connect(f"{file}.db", check_same_thread=False)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS chunks (hash TEXT PRIMARY KEY, body BLOB NOT NULL)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS versions ("
+            "system_id TEXT NOT NULL, date TEXT NOT NULL, root TEXT NOT NULL, "
+            "PRIMARY KEY (system_id, date))"
+        )
+        self.connection.commit()
+
+
+    @classmethod
+    def format_date(self, date):
+        '''
+        Helper function: accepts "YYYY-MM-DD", a date/datetime object or "" for today
+        '''
+        if date == "" or date is None:
+            return datetime.date.today().isoformat()
+
+        if isinstance(date, datetime.datetime):
+            return date.date().isoformat()
+
+        if isinstance(date, datetime.date):
+            return date.isoformat()
+
+        return str(date)
+
+
+    def put(self, systemID, dataprint, date="", tree=None):
+        '''
+        description:
+            stores the dataprint for systemID under date (defaults to today), a second put
+            for the same system and date replaces the first one
+
+            tree ---> optional hash tree for the dataprint if you already built/cached one
+
+        returns: the root hash of the stored version
+        '''
+        if tree is None:
+            tree = hash_tree(dataprint)
+
+        cursor = self.connection.cursor()
+        root = self._store(cursor, dataprint, tree)
+
+        cursor.execute(
+            "INSERT OR REPLACE INTO versions (system_id, date, root) VALUES (?, ?, ?)",
+            (str(systemID), DataprintHistory.format_date(date), root)
+        )
+        self.connection.commit()
+
+        return root
+
+
+    def record(self, api, systemID, date=""):
+        '''
+        Grabs the current dataprint for systemID through the LiongardAPI instance passed
+        through and stores it
+
+        returns: the root hash of the stored version, or 0 if no dataprint came back (nothing is stored)
+        '''
+        dataprint = api.get_system_detail_view(systemID)
+
+        # the getter hands back 0/False/None or an error message instead of raising
+        if dataprint is None or dataprint is False or dataprint == 0 or isinstance(dataprint, str):
+            print(f"record: no dataprint came back for system {systemID}, nothing was stored")
+            return 0
+
+        return self.put(systemID, dataprint, date)
+
+
+    def _store(self, cursor, data, tree):
+        '''
+        Helper function: writes the subtree if its hash is not stored yet and returns the hash,
+        a stored hash means every chunk beneath it is already stored too
+        '''
+        key = tree["h"]
+
+        # the Merkle hash ignores key order, a dictionary whose keys are not sorted gets its
+        # order added to the key so it comes back the way it went in
+        if "d" in tree and list(data) != sorted(data):
+            key = f"{key}-{_digest(json.dumps(list(data)))}"
+
+        if cursor.execute("SELECT 1 FROM chunks WHERE hash = ?", (key,)).fetchone():
+            return key
+
+        if "d" in tree:
+            body = {"d": [[name, self._reference(cursor, data[name], tree["d"][name])] for name in data]}
+        elif "l" in tree:
+            body = self._pages(cursor, [self._reference(cursor, data[index], node) for index, node in enumerate(tree["l"])],
+                               [node["h"] for node in tree["l"]])
+        else:
+            body = {"v": data}
+
+        self._write(cursor, key, body)
+
+        return key
+
+
+    @classmethod
+    def _write(self, cursor, key, body):
+        encoded = zlib.compress(json.dumps(body, separators=(",", ":")).encode())
+        cursor.execute("INSERT OR IGNORE INTO chunks (hash, body) VALUES (?, ?)", (key, encoded))
+
+
+    def _pages(self, cursor, references, hashes):
+        '''
+        Helper function: splits a long list of references in to page chunks, level by level, until
+        the top level is short, page boundaries come from the item hashes so an insert only moves
+        the boundaries around it
+
+        returns: the list body, {"l": references} or {"l": page keys, "pages": levels}
+        '''
+        levels = 0
+
+        while len(references) > MAX_LIST_PAGE:
+            pages = []
+            start = 0
+
+            for index, item_hash in enumerate(hashes):
+                if int(item_hash[-8:], 16) % LIST_PAGE == 0 or index + 1 - start >= MAX_LIST_PAGE or index + 1 == len(hashes):
+                    page = references[start:index + 1]
+                    page_key = "p" + _digest(json.dumps(page, separators=(",", ":")))
+                    self._write(cursor, page_key, {"l": page})
+                    pages.append(page_key)
+                    start = index + 1
+
+            references, hashes = pages, [page[1:] for page in pages]
+            levels += 1
+
+        if not levels:
+            return {"l": references}
+
+        return {"l": references, "pages": levels}
+
+
+    def _reference(self, cursor, data, tree):
+        '''
+        Helper function: a child is either [value] when it is kept inline or the hash of its chunk
+        '''
+        if "d" not in tree and "l" not in tree:
+            return [data]
+
+        children = tree["d"].values() if "d" in tree else tree["l"]
+        flat = all("d" not in child and "l" not in child for child in children)
+
+        if flat and len(json.dumps(data, separators=(",", ":"))) < self.inline_bytes:
+            return [data]
+
+        return self._store(cursor, data, tree)
+
+
+    def list_versions(self, systemID):
+        '''
+        returns: sorted list of the dates stored for systemID ---> ["2022-08-01", ...]
+        '''
+        rows = self.connection.execute(
+            "SELECT date FROM versions WHERE system_id = ? ORDER BY date", (str(systemID),)
+        ).fetchall()
+
+        return [row[0] for row in rows]
+
+
+    def list_systems(self):
+        '''
+        returns: list of every systemID that has at least one stored version
+        '''
+        rows = self.connection.execute("SELECT DISTINCT system_id FROM versions ORDER BY system_id").fetchall()
+
+        return [row[0] for row in rows]
+
+
+    def fetch_version(self, systemID, date):
+        '''
+        Rebuilds the dataprint stored for systemID on date
+
+        returns: the dataprint, or 0 if there is no version stored for that day
+        '''
+        row = self.connection.execute(
+            "SELECT root FROM versions WHERE system_id = ? AND date = ?",
+            (str(systemID), DataprintHistory.format_date(date))
+        ).fetchone()
+
+        if row is None:
+            print(f"no version stored for system {systemID} on {DataprintHistory.format_date(date)}")
+            return 0
+
+        return self._load(row[0], {})
+
+
+    def _load(self, key, seen):
+        '''
+        Helper function: rebuilds a chunk and everything beneath it, seen caches the chunk
+        bodies that show up more than once in the same dataprint
+        '''
+        body = self._body(key, seen)
+
+        if "d" in body:
+            data = {name: self._resolve(reference, seen) for name, reference in body["d"]}
+        elif "l" in body:
+            references = body["l"]
+            for _ in range(body.get("pages", 0)):
+                references = [reference for page in references for reference in self._body(page, seen)["l"]]
+
+            data = [self._resolve(reference, seen) for reference in references]
+        else:
+            data = body["v"]
+
+        return data
+
+
+    def _body(self, key, seen):
+        '''
+        Helper function: the decoded body of a chunk
+        '''
+        if key not in seen:
+            encoded = self.connection.execute("SELECT body FROM chunks WHERE hash = ?", (key,)).fetchone()[0]
+            seen[key] = json.loads(zlib.decompress(encoded))
+
+        return seen[key]
+
+
+    def _resolve(self, reference, seen):
+        '''
+        Helper function: opposite of _reference
+        '''
+        if isinstance(reference, list):
+            if isinstance(reference[0], (dict, list)):
+                return copy.deepcopy(reference[0])
+
+            return reference[0]
+
+        return self._load(reference, seen)
+
+
+    def stats(self):
+        '''
+        returns: dictionary with the number of versions, unique chunks and compressed bytes stored
+        '''
+        versions = self.connection.execute("SELECT COUNT(*) FROM versions").fetchone()[0]
+        chunks, size = self.connection.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(body)), 0) FROM chunks").fetchone()
+
+        return {"versions": versions, "chunks": chunks, "bytes": size}
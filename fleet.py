@@ -0,0 +1,180 @@
+'''
+Agent operations across many agents at once
+
+flush_agent_job_queue, delete_agent and get_single_agent each handle one agent and hand back
+whatever text Liongard sent. AgentFleet runs the same calls (LiongardAPI.agent_call) over a whole
+selection of agents at the same time, inside the LiongardAPI instance's rate limit and under the
+"batch" priority by default. It returns one report entry per agent instead of strings to parse.
+
+Usage:
+    fleet = AgentFleet(test, workers=16)
+
+    stale = fleet.select(Status="Offline", where=lambda agent: "old-rmm" in agent['Name'])
+    fleet.flush(stale)
+    report = fleet.delete(stale)                 # dry run: lists what would be deleted
+    report = fleet.delete(stale, dry_run=False)  # actually deletes them
+
+    report["failed"]                             # ---> 2
+    [entry for entry in report["results"] if not entry["ok"]]
+
+Report format:
+    {"action": "delete", "dry_run": False, "total": 40, "succeeded": 38, "failed": 2,
+     "results": [{"ID": 1234, "Name": "...", "ok": True, "status": 200, "response": ..., "error": None}, ...]}
+'''
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from transport import submit
+from jsonstream import lookup
+
+
+def _matches(agent, match):
+    '''
+    Helper function: True if the agent has every field=value in match, a compiled regex value
+    is searched for in the field instead of compared
+    '''
+    for path, wanted in match.items():
+        value = lookup(agent, path.replace("__", "."))
+
+        if isinstance(wanted, re.Pattern):
+            if value is None or not wanted.search(str(value)):
+                return False
+        elif value != wanted:
+            return False
+
+    return True
+
+
+class AgentFleet():
+    '''
+    Purpose:
+        selects agents and runs flush/delete/refresh on all of them concurrently
+
+    Usage:
+        workers ---> calls in flight at once (the instance's rate limit still applies)
+        priority ---> scheduler priority class the calls run under, see LiongardAPI.priority
+
+    List of Methods:
+        def select(self, where=None, **match)
+        def flush(self, agents)
+        def delete(self, agents, dry_run=True)
+        def refresh(self, agents, fields=None)
+    '''
+
+    def __init__(self, api, workers=16, priority="batch"):
+        self.api = api
+        self.workers = workers
+        self.priority = priority
+
+
+    def select(self, where=None, **match):
+        '''
+        description:
+            picks agents out of get_agents
+
+            match ---> field=value pairs every agent has to have, use __ for nested fields
+                ex: Environment__Name="Acme", a value from re.compile(...) is searched for instead
+            where ---> optional callable(agent) returning True for the agents to keep
+
+        returns: list of agents
+        '''
+        agents = self.api.get_agents()
+
+        if not agents:
+            return []
+
+        return [agent for agent in agents if _matches(agent, match) and (where is None or where(agent))]
+
+
+    def flush(self, agents):
+        '''
+        flushes the job queue of every agent
+
+        returns: report (see the module docstring)
+        '''
+        return self._run("flush", agents, self._flush)
+
+
+    def delete(self, agents, dry_run=True):
+        '''
+        deletes every agent, nothing is deleted unless dry_run=False is passed,
+        deleted agents can not be recovered
+
+        returns: report (see the module docstring)
+        '''
+        if dry_run:
+            results = [
+                {"ID": ID, "Name": name, "ok": True, "status": None, "response": "would delete", "error": None}
+                for ID, name in self._identify(agents)
+            ]
+            return self._report("delete", True, results)
+
+        return self._run("delete", agents, self._delete)
+
+
+    def refresh(self, agents, fields=None):
+        '''
+        pulls every agent again with get_single_agent, the agent is in each result's "response"
+
+        fields ---> optional projection, see LiongardAPI.get_json
+
+        returns: report (see the module docstring)
+        '''
+        return self._run("refresh", agents, lambda ID: self._refresh(ID, fields))
+
+
+    @classmethod
+    def _identify(self, agents):
+        '''
+        Helper function: (ID, Name) for agents given as agent records or as plain IDs
+        '''
+        return [(agent['ID'], agent.get('Name')) if isinstance(agent, dict) else (agent, None) for agent in agents]
+
+
+    def _flush(self, ID):
+        return self.api.agent_call("POST", ID, "/flush")
+
+
+    def _delete(self, ID):
+        return self.api.agent_call("DELETE", ID)
+
+
+    def _refresh(self, ID, fields):
+        ok, status, data = self.api.agent_call("GET", ID, fields=fields)
+
+        return ok and bool(data), status, data
+
+
+    def _run(self, action, agents, call):
+        '''
+        Helper function: runs call(ID) for every agent on the pool and collects the report
+        '''
+        agents = self._identify(agents)
+
+        with self.api.priority(self.priority), ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [(ID, name, submit(pool, call, ID)) for ID, name in agents]
+
+            results = []
+            for ID, name, future in futures:
+                try:
+                    ok, status, response = future.result()
+                    results.append({"ID": ID, "Name": name, "ok": ok, "status": status, "response": response, "error": None})
+                except Exception as error:
+                    results.append({"ID": ID, "Name": name, "ok": False, "status": None, "response": None, "error": str(error)})
+
+        return self._report(action, False, results)
+
+
+    @classmethod
+    def _report(self, action, dry_run, results):
+        succeeded = sum(1 for result in results if result["ok"])
+
+        return {
+            "action": action,
+            "dry_run": dry_run,
+            "total": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "results": results,
+        }
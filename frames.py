@@ -0,0 +1,252 @@
+'''
+Columnar NumPy frames over the lists returned by get_detections, get_alerts and get_timelines
+
+The records are walked once to pull out the fields that matter. Text fields such as the
+environment, inspector, system and status names become integer codes plus a lookup table,
+and timestamps become datetime64. Counting and time bucketing after that is done with
+NumPy instead of Python loops over dictionaries.
+
+Usage:
+    frame = detections_frame(test.get_detections())
+    frame.count_by("environment")                         # ---> {("Acme",): 120, ...}
+    frame.count_by("environment", "inspector")            # ---> {("Acme", "Microsoft 365"): 40, ...}
+    buckets, counts = frame.time_buckets("D")             # detections per day
+    frame.filter(frame.equals("status", "Open")).count_by("system")
+'''
+
+import numpy as np
+
+from jsonstream import lookup
+
+
+# column name ---> (kind, path into the record), kind is one of "category", "time" or "number"
+DETECTION_COLUMNS = {
+    "ID": ("number", ("ID",)),
+    "environment": ("category", ("Environment", "Name")),
+    "inspector": ("category", ("Inspector", "Name")),
+    "system": ("category", ("System", "Name")),
+    "status": ("category", ("Status",)),
+    "time": ("time", ("CreatedOn",)),
+}
+
+ALERT_COLUMNS = {
+    "ID": ("number", ("ID",)),
+    "environment": ("category", ("Environment", "Name")),
+    "inspector": ("category", ("Inspector", "Name")),
+    "system": ("category", ("System", "Name")),
+    "status": ("category", ("Status", "Name")),
+    "time": ("time", ("CreatedOn",)),
+}
+
+TIMELINE_COLUMNS = {
+    "ID": ("number", ("ID",)),
+    "environment": ("category", ("Environment", "Name")),
+    "inspector": ("category", ("Inspector", "Name")),
+    "system": ("category", ("System", "Name")),
+    "status": ("category", ("Status",)),
+    "launchpoint": ("category", ("Launchpoint", "Alias")),
+    "changes": ("number", ("ChangeDetections",)),
+    "time": ("time", ("CreatedOn",)),
+}
+
+
+def _lookup(record, path):
+    '''
+    Helper function: the value at path, a nested record (ex: a Status object) is read as its Name or ID
+    '''
+    value = lookup(record, path)
+
+    if isinstance(value, dict):
+        value = value.get('Name', value.get('ID'))
+
+    return value
+
+
+def _timestamp(value):
+    '''
+    Helper function: trims the timezone off of Liongard's UTC timestamps so NumPy can read them
+    '''
+    if not value:
+        return "NaT"
+
+    value = str(value)
+    if value.endswith("Z"):
+        return value[:-1]
+    if value.endswith("+00:00"):
+        return value[:-6]
+
+    return value
+
+
+class Frame():
+    '''
+    Purpose:
+        column oriented view of a list of records
+
+        columns ---> {name: numpy array}, category columns hold integer codes
+        categories ---> {name: numpy array of labels}, labels[code] gives back the text
+
+    List of Methods:
+        def __len__(self)
+        def __getitem__(self, name)
+        def labels(self, name)
+        def equals(self, name, label)
+        def filter(self, mask)
+        def count_by(self, *names)
+        def time_buckets(self, unit="D", by="", column="time")
+    '''
+
+    def __init__(self, columns, categories):
+        self.columns = columns
+        self.categories = categories
+
+
+    def __len__(self):
+        for column in self.columns.values():
+            return len(column)
+
+        return 0
+
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+
+    def labels(self, name):
+        '''
+        returns: the column decoded back in to its text labels
+        '''
+        return self.categories[name][self.columns[name]]
+
+
+    def equals(self, name, label):
+        '''
+        returns: boolean mask of the rows where the category column matches label
+        '''
+        matches = np.flatnonzero(self.categories[name] == label)
+
+        if len(matches) == 0:
+            return np.zeros(len(self), dtype=bool)
+
+        return self.columns[name] == matches[0]
+
+
+    def filter(self, mask):
+        '''
+        returns: a new Frame holding only the rows where mask is True, categories are shared
+        '''
+        return Frame({name: column[mask] for name, column in self.columns.items()}, self.categories)
+
+
+    def count_by(self, *names):
+        '''
+        description:
+            group by one or more category columns and count the rows in each group,
+            groups with no rows are left out
+
+        returns: {(label, ...): count}
+        '''
+        if len(self) == 0:
+            return {}
+
+        # only the code combinations that actually occur are counted, so the cost follows the
+        # number of rows rather than the product of every column's number of categories
+        codes, counts = np.unique(np.stack([self.columns[name] for name in names], axis=1), axis=0, return_counts=True)
+
+        return {
+            tuple(self.categories[name][code] for name, code in zip(names, row)): int(count)
+            for row, count in zip(codes, counts)
+        }
+
+
+    def time_buckets(self, unit="D", by="", column="time"):
+        '''
+        description:
+            counts the rows per time bucket, unit is any NumPy datetime unit
+            ---> "Y", "M", "W", "D", "h", "m"
+
+            by ---> optionally a category column to split every bucket on
+
+        returns:
+            (buckets, counts)
+                buckets ---> sorted datetime64 array of the bucket starts
+                counts ---> array with one count per bucket, or when by is passed
+                    {(bucket start, label): count} holding only the pairs that have rows
+        '''
+        times = self.columns[column]
+        present = ~np.isnat(times)
+        truncated = times[present].astype(f"datetime64[{unit}]")
+
+        buckets, index = np.unique(truncated, return_inverse=True)
+
+        if by == "":
+            return buckets, np.bincount(index, minlength=len(buckets))
+
+        pairs, counts = np.unique(np.stack([index, self.columns[by][present]], axis=1), axis=0, return_counts=True)
+
+        return buckets, {
+            (buckets[bucket], self.categories[by][code]): int(count)
+            for (bucket, code), count in zip(pairs, counts)
+        }
+
+
+def build_frame(records, columns):
+    '''
+    description:
+        turns a list of records in to a Frame, columns is one of the *_COLUMNS layouts above
+        or your own in the same format
+
+    returns: Frame
+    '''
+    if not records:
+        records = []
+
+    raw = {name: [] for name in columns}
+
+    for record in records:
+        for name, (kind, path) in columns.items():
+            raw[name].append(_lookup(record, path))
+
+    built = {}
+    categories = {}
+
+    for name, (kind, path) in columns.items():
+        values = raw[name]
+
+        if kind == "category":
+            codes = {}
+            encoded = np.fromiter(
+                (codes.setdefault("" if value is None else str(value), len(codes)) for value in values),
+                dtype=np.int32, count=len(values)
+            )
+            built[name] = encoded
+            categories[name] = np.array(list(codes), dtype=object)
+
+        elif kind == "time":
+            built[name] = np.array([_timestamp(value) for value in values], dtype="datetime64[ms]")
+
+        else:
+            built[name] = np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+    return Frame(built, categories)
+
+
+def detections_frame(detections):
+    '''
+    Frame over the list returned by get_detections
+    '''
+    return build_frame(detections, DETECTION_COLUMNS)
+
+
+def alerts_frame(alerts):
+    '''
+    Frame over the list returned by get_alerts
+    '''
+    return build_frame(alerts, ALERT_COLUMNS)
+
+
+def timelines_frame(timelines):
+    '''
+    Frame over the list returned by get_timelines
+    '''
+    return build_frame(timelines, TIMELINE_COLUMNS)
@@ -0,0 +1,386 @@
+'''
+Parent/child tree of the environments with fast subtree questions and rollups
+
+Environments have a Parent, but get_environments hands them back as a flat list. Rolling
+systems, alerts or detections up to each parent company would mean walking the list again for
+every company. EnvironmentHierarchy numbers the tree once with an Euler tour: each environment
+gets the range [start, end] of positions its subtree takes up. That gives:
+
+    is_under(a, b)        O(1)      is a inside of b's subtree
+    ancestor(a, levels)   O(log n)  the environment levels above a (binary lifting)
+    common_ancestor(a, b) O(log n)
+    rollup(ID, metric)    O(log n)  sum of a metric over a subtree (Fenwick tree over the tour)
+    rollups(metric)       O(n)      every environment's subtree total at once
+
+Usage:
+    tree = EnvironmentHierarchy(test.get_environments())
+    tree.collect(test)                            # counts systems, alerts and detections per environment in one pass
+    tree.rollup(parent_ID, "detections")          # detections anywhere under parent_ID
+    tree.descendants(parent_ID)
+    tree.add("alerts", environment_ID, 1)         # incremental count change, O(log n)
+    tree.update(test.get_environments())          # renumbers only if parents changed, counts are kept
+
+Parent can be the parent's ID, its Name or an object with an ID, whichever the API returns.
+Environments whose parent is missing (or that would make a loop) are treated as top level.
+'''
+
+from jsonstream import compile_fields, project, lookup_any
+
+
+# metric ---> list method and the path to the environment ID in its records
+METRICS = {
+    "systems": ("get_systems", ["Environment.ID", "EnvironmentID"]),
+    "alerts": ("get_alerts", ["Environment.ID", "EnvironmentID"]),
+    "detections": ("get_detections", ["Environment.ID", "EnvironmentID"]),
+}
+
+
+class FenwickTree():
+    '''
+    Purpose:
+        prefix sums with O(log n) point updates, indexed from 0
+    '''
+
+    def __init__(self, values):
+        self.size = len(values)
+        self.tree = [0] + list(values)
+
+        # O(n) build: push every node's total up to its parent once
+        for index in range(1, self.size + 1):
+            parent = index + (index & -index)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[index]
+
+
+    def add(self, position, delta):
+        index = position + 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+
+    def prefix(self, position):
+        '''
+        returns: sum of positions 0 through position
+        '''
+        total = 0
+        index = position + 1
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+
+    def range(self, start, end):
+        return self.prefix(end) - (self.prefix(start - 1) if start else 0)
+
+
+class EnvironmentHierarchy():
+    '''
+    Purpose:
+        Euler tour index of the environment tree with per-subtree aggregate counts
+
+    List of Methods:
+        def update(self, environments)
+        def parent(self, ID)
+        def children(self, ID)
+        def roots(self)
+        def depth(self, ID)
+        def is_under(self, ID, ancestorID)
+        def ancestor(self, ID, levels=1)
+        def ancestors(self, ID)
+        def common_ancestor(self, first, second)
+        def descendants(self, ID)
+        def collect(self, api, metrics=None)
+        def set_counts(self, metric, counts)
+        def count_records(self, metric, records, paths=None)
+        def add(self, metric, ID, delta=1)
+        def rollup(self, ID, metric)
+        def rollups(self, metric)
+    '''
+
+    def __init__(self, environments):
+        self.counts = {}
+        self.trees = {}
+        self.signature = None
+        self.update(environments)
+
+
+    def update(self, environments):
+        '''
+        description:
+            takes a fresh get_environments() result, the tree is only renumbered when an
+            environment was added, removed or moved, and the counts loaded so far are kept
+
+        returns: True if the tree was renumbered
+        '''
+        environments = [environment for environment in environments or [] if environment.get('ID') is not None]
+        self.environments = {environment['ID']: environment for environment in environments}
+
+        by_key = {str(ID): ID for ID in self.environments}
+        by_name = {environment.get('Name'): environment['ID'] for environment in environments}
+        parents = {ID: self._resolve(environment.get('Parent'), by_key, by_name) for ID, environment in self.environments.items()}
+
+        signature = sorted((str(ID), str(parent)) for ID, parent in parents.items())
+        if signature == self.signature:
+            return False
+
+        self.signature = signature
+        self._number(parents)
+
+        for metric, counts in list(self.counts.items()):
+            self.set_counts(metric, counts)
+
+        return True
+
+
+    @classmethod
+    def _resolve(self, parent, by_key, by_name):
+        '''
+        Helper function: the ID of the environment a Parent value points at, None for top level
+        '''
+        if isinstance(parent, dict):
+            parent = parent.get('ID', parent.get('Name'))
+
+        if parent is None or parent == "":
+            return None
+
+        if str(parent) in by_key:
+            return by_key[str(parent)]
+
+        return by_name.get(parent)
+
+
+    def _number(self, parents):
+        '''
+        Helper function: builds the child lists, Euler tour ranges and binary lifting table
+        '''
+        # a parent chain that loops back on itself is cut where it closes the loop
+        reaches_top = set()
+        for ID in parents:
+            seen = set()
+            previous, current = None, ID
+            while current is not None and current not in reaches_top:
+                if current in seen:
+                    parents[previous] = None
+                    break
+                seen.add(current)
+                previous, current = current, parents[current]
+            reaches_top |= seen
+
+        self.parents = parents
+        self.child_lists = {ID: [] for ID in parents}
+        for ID, parent in parents.items():
+            if parent is not None:
+                self.child_lists[parent].append(ID)
+
+        name = lambda ID: str(self.environments[ID].get('Name', ID))
+        for children in self.child_lists.values():
+            children.sort(key=name)
+
+        self.root_list = sorted((ID for ID, parent in parents.items() if parent is None), key=name)
+
+        self.start = {}
+        self.end = {}
+        self.depths = {}
+        self.order = []
+
+        # iterative depth first walk so deep trees do not hit the recursion limit
+        for root in self.root_list:
+            stack = [(root, 0, False)]
+            while stack:
+                ID, depth, finished = stack.pop()
+
+                if finished:
+                    self.end[ID] = len(self.order) - 1
+                    continue
+
+                self.start[ID] = len(self.order)
+                self.depths[ID] = depth
+                self.order.append(ID)
+
+                stack.append((ID, depth, True))
+                for child in reversed(self.child_lists[ID]):
+                    stack.append((child, depth + 1, False))
+
+        # lift[k][ID] = the environment 2**k levels above ID
+        self.lift = [dict(parents)]
+        levels = max(self.depths.values(), default=0)
+        while (1 << len(self.lift)) <= levels:
+            previous = self.lift[-1]
+            self.lift.append({ID: None if previous[ID] is None else previous[previous[ID]] for ID in parents})
+
+
+    def parent(self, ID):
+        return self.parents[ID]
+
+
+    def children(self, ID):
+        return list(self.child_lists[ID])
+
+
+    def roots(self):
+        return list(self.root_list)
+
+
+    def depth(self, ID):
+        return self.depths[ID]
+
+
+    def is_under(self, ID, ancestorID):
+        '''
+        returns: True if ID is ancestorID or anywhere below it
+        '''
+        return self.start[ancestorID] <= self.start[ID] <= self.end[ancestorID]
+
+
+    def ancestor(self, ID, levels=1):
+        '''
+        returns: the environment levels above ID, None if the tree is not that deep there
+        '''
+        if levels > self.depths[ID]:
+            return None
+
+        step = 0
+        while levels and ID is not None:
+            if levels & 1:
+                ID = self.lift[step][ID]
+            levels >>= 1
+            step += 1
+
+        return ID
+
+
+    def ancestors(self, ID):
+        '''
+        returns: list from ID's parent up to its top level environment
+        '''
+        found = []
+        while self.parents[ID] is not None:
+            ID = self.parents[ID]
+            found.append(ID)
+        return found
+
+
+    def common_ancestor(self, first, second):
+        '''
+        returns: the deepest environment both are under (either one itself counts), None if they
+            are in different top level trees
+        '''
+        if self.depths[first] < self.depths[second]:
+            first, second = second, first
+
+        first = self.ancestor(first, self.depths[first] - self.depths[second])
+
+        if first == second:
+            return first
+
+        for step in reversed(range(len(self.lift))):
+            if self.lift[step][first] != self.lift[step][second]:
+                first = self.lift[step][first]
+                second = self.lift[step][second]
+
+        return self.parents[first]
+
+
+    def descendants(self, ID):
+        '''
+        returns: every environment below ID, in tour order
+        '''
+        return self.order[self.start[ID] + 1:self.end[ID] + 1]
+
+
+    def collect(self, api, metrics=None):
+        '''
+        description:
+            pulls each metric's list (see METRICS, default all of them) keeping only the
+            environment ID of every record and counts them per environment
+
+        returns: {metric: records counted}
+        '''
+        counted = {}
+
+        for metric in metrics or METRICS:
+            method, paths = METRICS[metric]
+            records = getattr(api, method)(fields=paths)
+            counted[metric] = self.count_records(metric, records or [], paths)
+
+        return counted
+
+
+    def count_records(self, metric, records, paths=None):
+        '''
+        description:
+            counts records per environment in one pass and loads them as metric
+
+            paths ---> dotted paths to try for the environment ID, defaults to METRICS or Environment.ID
+
+        returns: number of records that belonged to a known environment
+        '''
+        if paths is None:
+            paths = METRICS[metric][1] if metric in METRICS else ["Environment.ID", "EnvironmentID"]
+
+        shape = compile_fields(paths)
+        environments = {str(ID): ID for ID in self.environments}
+        counts = {}
+
+        for record in records:
+            ID = environments.get(str(lookup_any(project(record, shape), paths)))
+            if ID is not None:
+                counts[ID] = counts.get(ID, 0) + 1
+
+        self.set_counts(metric, counts)
+
+        return sum(counts.values())
+
+
+    def set_counts(self, metric, counts):
+        '''
+        loads {environment ID: count} as metric, replacing whatever was there
+        '''
+        counts = {ID: count for ID, count in counts.items() if ID in self.start}
+        self.counts[metric] = counts
+        self.trees[metric] = FenwickTree([counts.get(ID, 0) for ID in self.order])
+
+
+    def add(self, metric, ID, delta=1):
+        '''
+        changes the count of metric for one environment by delta, ex: an alert was opened (+1)
+        or closed (-1), O(log n)
+        '''
+        if ID not in self.start:
+            raise KeyError(f"unknown environment {ID!r}")
+
+        if metric not in self.counts:
+            self.set_counts(metric, {})
+
+        self.counts[metric][ID] = self.counts[metric].get(ID, 0) + delta
+        self.trees[metric].add(self.start[ID], delta)
+
+
+    def rollup(self, ID, metric):
+        '''
+        returns: total of metric over ID and everything below it
+        '''
+        if metric not in self.trees:
+            raise ValueError(f"no counts loaded for '{metric}', use collect, count_records or set_counts first")
+
+        return self.trees[metric].range(self.start[ID], self.end[ID])
+
+
+    def rollups(self, metric):
+        '''
+        returns: {environment ID: subtree total of metric} for every environment in one pass
+        '''
+        if metric not in self.counts:
+            raise ValueError(f"no counts loaded for '{metric}', use collect, count_records or set_counts first")
+
+        totals = {ID: self.counts[metric].get(ID, 0) for ID in self.order}
+
+        # children come after their parents in the tour, so walking it backwards finishes
+        # every subtree before its parent needs it
+        for ID in reversed(self.order):
+            if self.parents[ID] is not None:
+                totals[self.parents[ID]] += totals[ID]
+
+        return totals
@@ -0,0 +1,165 @@
+'''
+Optional HTTP/2 transport for LiongardAPI
+
+Over HTTP/1.1 every request in flight needs its own connection, so a fan-out of 100 requests
+means 100 sockets and 100 TLS handshakes. HTTP2Session sends them as streams over a few
+shared connections instead. It has the same request() surface as requests.Session and hands
+back responses that look like requests.Response, so LiongardAPI works the same either way.
+
+Needs httpx with HTTP/2 support: pip install "httpx[http2]"
+
+Usage:
+    test = LiongardAPI("us9", private_key, public_key, pool_size=50, http2=True)
+
+If httpx is not installed LiongardAPI falls back to requests (HTTP/1.1), and any server that
+does not offer HTTP/2 during the TLS handshake is spoken to over HTTP/1.1 on that connection.
+
+See http2_benchmark.py to compare the two against a local stub.
+'''
+
+import json
+import importlib.util
+
+import requests
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# httpx only speaks HTTP/2 when h2 is installed, it is never used from here directly
+HAS_H2 = importlib.util.find_spec("h2") is not None
+
+
+def http2_available():
+    '''
+    returns: True if httpx and h2 are installed
+    '''
+    return httpx is not None and HAS_H2
+
+
+def _translate(error):
+    '''
+    Helper function: the requests exception matching an httpx one, so retries, the circuit
+    breaker and callers catching requests exceptions behave the same on either transport
+    '''
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.Timeout(str(error))
+
+    if isinstance(error, (httpx.ConnectError, httpx.RemoteProtocolError)):
+        return requests.exceptions.ConnectionError(str(error))
+
+    return requests.exceptions.RequestException(str(error))
+
+
+class HTTP2Response():
+    '''
+    Purpose:
+        the parts of requests.Response LiongardAPI and its callers use, on top of an httpx response
+    '''
+
+    def __init__(self, response):
+        self.raw = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.url = str(response.url)
+        self.reason = response.reason_phrase
+        self.http_version = response.http_version
+
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+
+    @property
+    def content(self):
+        try:
+            return self.raw.read()
+        except httpx.HTTPError as error:
+            raise _translate(error) from error
+
+
+    @property
+    def text(self):
+        self.content  # reads the body first if the response was streamed
+        return self.raw.text
+
+
+    def json(self, **kwargs):
+        return json.loads(self.text, **kwargs)
+
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        try:
+            if decode_unicode:
+                yield from self.raw.iter_text(chunk_size)
+            else:
+                yield from self.raw.iter_bytes(chunk_size)
+        except httpx.HTTPError as error:
+            raise _translate(error) from error
+
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} {self.reason} for url: {self.url}", response=self)
+
+
+    def close(self):
+        self.raw.close()
+
+
+class HTTP2Session():
+    '''
+    Purpose:
+        stands in for requests.Session, multiplexing concurrent requests over shared HTTP/2 connections
+
+    Usage:
+        max_connections ---> most connections opened at once, each one carries many requests
+        prior_knowledge ---> speak HTTP/2 straight away on plain http:// URLs (h2c) instead of
+            HTTP/1.1, only for servers known to support it such as the benchmark stub
+
+    List of Methods:
+        def request(self, method, url, params=None, data=None, json=None, headers=None, timeout=None, stream=False, **kwargs)
+        def close(self)
+    '''
+
+    def __init__(self, max_connections=10, prior_knowledge=False):
+        if not http2_available():
+            raise ImportError("httpx with HTTP/2 support is needed for HTTP2Session: pip install \"httpx[http2]\"")
+
+        self.client = httpx.Client(
+            http1=not prior_knowledge,
+            http2=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=None,
+        )
+
+
+    def request(self, method, url, params=None, data=None, json=None, headers=None, timeout=None, stream=False, **kwargs):
+        '''
+        same arguments as requests.Session.request, allow_redirects becomes httpx's follow_redirects
+        (on by default, as with requests) and the other requests only arguments (ex: verify, cookies,
+        proxies) are dropped rather than passed on to httpx
+
+        returns: HTTP2Response
+        '''
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+
+        if isinstance(data, (str, bytes)):
+            body = {"content": data}
+        else:
+            body = {"data": data}
+
+        try:
+            request = self.client.build_request(method, url, params=params, json=json, headers=headers, timeout=timeout, **body)
+            response = self.client.send(request, stream=stream, follow_redirects=kwargs.get("allow_redirects", True))
+        except httpx.HTTPError as error:
+            raise _translate(error) from error
+
+        return HTTP2Response(response)
+
+
+    def close(self):
+        self.client.close()
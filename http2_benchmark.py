@@ -0,0 +1,183 @@
+'''
+Benchmark: LiongardAPI over HTTP/1.1 (requests) vs HTTP/2 (http2.HTTP2Session)
+
+Starts two local stubs that answer /api/v1/agents/<id> after a fixed delay, one speaking
+HTTP/1.1 with keep-alive and one speaking HTTP/2 (h2c, no TLS), both counting the connections
+they accept. The same concurrent fan-out is run against each and the throughput and number of
+connections are printed.
+
+Usage:
+    python http2_benchmark.py --requests 2000 --workers 100 --delay 0.02
+
+Needs httpx[http2] (which brings in h2, used by the stub as well).
+'''
+
+import json
+import time
+import asyncio
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+
+import h2.config
+import h2.events
+import h2.connection
+
+from main import LiongardAPI
+from http2 import HTTP2Session
+
+
+BODY = json.dumps({"ID": 1, "Name": "agent", "Status": "Online", "Environment": {"Name": "stub"}}).encode()
+
+
+def http1_stub(delay):
+    '''
+    Helper function: threaded HTTP/1.1 server with keep-alive
+
+    returns: (port, connection counter)
+    '''
+    connections = {"count": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            with lock:
+                connections["count"] += 1
+            super().setup()
+
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server.server_port, connections
+
+
+class H2StubProtocol(asyncio.Protocol):
+    '''
+    Purpose:
+        one HTTP/2 connection of the stub, every stream gets BODY back after the delay
+    '''
+
+    def __init__(self, delay, connections):
+        self.delay = delay
+        self.connections = connections
+
+
+    def connection_made(self, transport):
+        self.connections["count"] += 1
+        self.transport = transport
+        self.connection = h2.connection.H2Connection(config=h2.config.H2Configuration(client_side=False))
+        self.connection.initiate_connection()
+        self.transport.write(self.connection.data_to_send())
+
+
+    def data_received(self, data):
+        for event in self.connection.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                asyncio.ensure_future(self.respond(event.stream_id))
+            elif isinstance(event, h2.events.DataReceived):
+                self.connection.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self.transport.close()
+
+        self.transport.write(self.connection.data_to_send())
+
+
+    async def respond(self, stream_id):
+        await asyncio.sleep(self.delay)
+
+        self.connection.send_headers(stream_id, [
+            (":status", "200"),
+            ("content-type", "application/json"),
+            ("content-length", str(len(BODY))),
+        ])
+        self.connection.send_data(stream_id, BODY, end_stream=True)
+        self.transport.write(self.connection.data_to_send())
+
+
+def http2_stub(delay):
+    '''
+    Helper function: asyncio HTTP/2 (h2c prior knowledge) server on its own thread
+
+    returns: (port, connection counter)
+    '''
+    connections = {"count": 0}
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+    port = {}
+
+    async def serve():
+        server = await loop.create_server(lambda: H2StubProtocol(delay, connections), "127.0.0.1", 0)
+        port["value"] = server.sockets[0].getsockname()[1]
+        started.set()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(serve())
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    started.wait()
+
+    return port["value"], connections
+
+
+def run(api, requests_count, workers):
+    '''
+    Helper function: fans get_single_agent out over workers threads
+
+    returns: seconds taken
+    '''
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(api.get_single_agent, range(requests_count)))
+
+    elapsed = time.monotonic() - start
+
+    failed = sum(1 for result in results if not result)
+    if failed:
+        print(f"  {failed} requests failed")
+
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="compare HTTP/1.1 and HTTP/2 transports against local stubs")
+    parser.add_argument("--requests", type=int, default=2000, help="number of requests to send")
+    parser.add_argument("--workers", type=int, default=100, help="requests in flight at once")
+    parser.add_argument("--delay", type=float, default=0.02, help="seconds the stub waits before answering")
+    parser.add_argument("--connections", type=int, default=4, help="max HTTP/2 connections")
+    args = parser.parse_args()
+
+    http1_port, http1_connections = http1_stub(args.delay)
+    http2_port, http2_connections = http2_stub(args.delay)
+
+    http1 = LiongardAPI(f"http://127.0.0.1:{http1_port}", pool_size=args.workers)
+    http2 = LiongardAPI(f"http://127.0.0.1:{http2_port}", pool_size=args.workers)
+    # the stub has no TLS to negotiate HTTP/2 over, so talk HTTP/2 to it straight away
+    http2.session = HTTP2Session(max_connections=args.connections, prior_knowledge=True)
+
+    print(f"{args.requests} requests, {args.workers} in flight, {args.delay * 1000:.0f} ms server delay\n")
+
+    for name, api, connections in (("HTTP/1.1", http1, http1_connections), ("HTTP/2", http2, http2_connections)):
+        elapsed = run(api, args.requests, args.workers)
+        print(f"{name:9} {args.requests / elapsed:8.0f} requests/s   {elapsed:6.2f} s   {connections['count']:4} connections")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+'''
+Binary inventory snapshot for quick name <---> ID lookups
+
+get_name_and_ID and get_system_name_ID have to pull the whole environment/system list every
+time a script starts. write_snapshot pulls environments, systems, launchpoints and agents once
+and writes them to a compact binary file. InventorySnapshot memory maps that file and answers
+lookups straight out of it with binary search, no JSON parsing and no API calls.
+
+File layout (little endian, every block 8 byte aligned):
+    header  ---> magic, version, created (epoch seconds), section count
+    table   ---> per section: name, rows, then offsets of the blocks below
+    blocks  ---> ids          int64[rows]     sorted ascending
+                 environment  int64[rows]     environment ID per row, -1 if unknown
+                 name offsets uint64[rows+1]  start/end of every name in the names blob
+                 by name      uint32[rows]    row numbers sorted by name
+                 names        utf-8 bytes
+
+Usage:
+    write_snapshot(test, "inventory")          # run on a schedule, creates inventory.inventory
+
+    inventory = InventorySnapshot("inventory")
+    inventory.name("systems", 1234)            # ---> "DC01 Active Directory"
+    inventory.ID("environments", "Acme Inc")   # ---> 42
+    inventory.name_and_ID("environments")      # ---> same dictionary as get_name_and_ID
+'''
+
+import os
+import mmap
+import time
+import struct
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from transport import submit
+from jsonstream import lookup
+
+
+MAGIC = b"LGINV\x00\x00\x01"
+VERSION = 1
+
+HEADER = struct.Struct("<8sIIqI4x")
+SECTION = struct.Struct("<16sQQQQQQQ")
+
+# section name ---> (LiongardAPI method, name field, environment field)
+SECTIONS = {
+    "environments": ("get_environments", ("Name",), None),
+    "systems": ("get_systems", ("Name",), ("Environment", "ID")),
+    "launchpoints": ("get_launchpoints", ("Alias",), ("Environment", "ID")),
+    "agents": ("get_agents", ("Name",), ("Environment", "ID")),
+}
+
+
+def _pad(output):
+    '''
+    Helper function: pads the bytearray to the next 8 byte boundary and returns its length
+    '''
+    output.extend(b"\x00" * (-len(output) % 8))
+    return len(output)
+
+
+def _section(records, name_path, environment_path):
+    '''
+    Helper function: turns a list of records in to the arrays for one section
+    '''
+    rows = []
+    for record in records or []:
+        try:
+            ID = int(record['ID'])
+        except (KeyError, TypeError, ValueError):
+            continue
+
+        name = lookup(record, name_path)
+        environment = lookup(record, environment_path) if environment_path else None
+
+        try:
+            environment = int(environment)
+        except (TypeError, ValueError):
+            environment = -1
+
+        rows.append((ID, "" if name is None else str(name), environment))
+
+    rows.sort()
+
+    ids = np.array([row[0] for row in rows], dtype='<i8')
+    environments = np.array([row[2] for row in rows], dtype='<i8')
+
+    encoded = [row[1].encode() for row in rows]
+    offsets = np.zeros(len(rows) + 1, dtype='<u8')
+    offsets[1:] = np.cumsum([len(name) for name in encoded], dtype=np.uint64)
+    by_name = np.array(sorted(range(len(rows)), key=lambda row: encoded[row]), dtype='<u4')
+
+    return ids, environments, offsets, by_name, b"".join(encoded)
+
+
+def build_snapshot(sections, file):
+    '''
+    description:
+        writes the snapshot file from records you already have
+
+        sections ---> {"environments": [...], "systems": [...], ...} using the section names
+            in SECTIONS, any section left out is written empty
+
+    returns: the path of the file written
+    '''
+    blocks = bytearray()
+    table = []
+
+    start = HEADER.size + SECTION.size * len(SECTIONS)
+    start += -start % 8
+
+    for section, (_, name_path, environment_path) in SECTIONS.items():
+        ids, environments, offsets, by_name, names = _section(sections.get(section), name_path, environment_path)
+
+        positions = []
+        for block in (ids, environments, offsets, by_name):
+            positions.append(start + _pad(blocks))
+            blocks.extend(block.tobytes())
+
+        positions.append(start + _pad(blocks))
+        blocks.extend(names)
+
+        table.append(SECTION.pack(section.encode(), len(ids), *positions, len(names)))
+
+    output = bytearray(HEADER.pack(MAGIC, VERSION, 0, int(time.time()), len(SECTIONS)))
+    for entry in table:
+        output.extend(entry)
+    _pad(output)
+    output.extend(blocks)
+
+    # written to the side and swapped in so a process mapping the old file never sees half of the new one
+    path = f"{file}.inventory"
+    with open(f"{path}.tmp", 'wb') as writer:
+        writer.write(output)
+    os.replace(f"{path}.tmp", path)
+
+    return path
+
+
+def write_snapshot(api, file="inventory"):
+    '''
+    description:
+        pulls environments, systems, launchpoints and agents at the same time through the
+        LiongardAPI instance passed through and writes them to file (.inventory is added)
+
+    returns: the path of the file written
+    '''
+    with ThreadPoolExecutor(max_workers=len(SECTIONS)) as pool:
+        pulls = {section: submit(pool, getattr(api, method)) for section, (method, _, _) in SECTIONS.items()}
+        sections = {section: pull.result() for section, pull in pulls.items()}
+
+    for section, records in sections.items():
+        if not records:
+            print(f"write_snapshot: no {section} were returned, that section will be empty")
+            sections[section] = []
+
+    return build_snapshot(sections, file)
+
+
+class InventorySnapshot():
+    '''
+    Purpose:
+        memory mapped reader for files written by write_snapshot/build_snapshot
+
+    List of Methods:
+        def sections(self)
+        def count(self, section)
+        def name(self, section, ID)
+        def ID(self, section, name)
+        def environment(self, section, ID)
+        def name_and_ID(self, section)
+        def age(self)
+    '''
+
+    def __init__(self, file="inventory"):
+        with open(f"{file}.inventory", 'rb') as reader:
+            self.buffer = mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, self.created, count = HEADER.unpack_from(self.buffer, 0)
+
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{file}.inventory is not an inventory snapshot this version can read")
+
+        self.tables = {}
+        for index in range(count):
+            entry = SECTION.unpack_from(self.buffer, HEADER.size + index * SECTION.size)
+            section = entry[0].rstrip(b"\x00").decode()
+            rows, ids, environments, offsets, by_name, names, size = entry[1:]
+
+            self.tables[section] = {
+                "ids": np.frombuffer(self.buffer, dtype='<i8', count=rows, offset=ids),
+                "environments": np.frombuffer(self.buffer, dtype='<i8', count=rows, offset=environments),
+                "offsets": np.frombuffer(self.buffer, dtype='<u8', count=rows + 1, offset=offsets),
+                "by_name": np.frombuffer(self.buffer, dtype='<u4', count=rows, offset=by_name),
+                "names": names,
+            }
+
+
+    def sections(self):
+        return list(self.tables)
+
+
+    def count(self, section):
+        return len(self.tables[section]["ids"])
+
+
+    def age(self):
+        '''
+        returns: seconds since the snapshot was written
+        '''
+        return time.time() - self.created
+
+
+    def _name_at(self, table, row):
+        '''
+        Helper function: raw utf-8 bytes of the name stored for row
+        '''
+        start = table["names"] + int(table["offsets"][row])
+        end = table["names"] + int(table["offsets"][row + 1])
+
+        return self.buffer[start:end]
+
+
+    def _row(self, section, ID):
+        '''
+        Helper function: binary search on the sorted ID array, None if the ID is not stored
+        '''
+        ids = self.tables[section]["ids"]
+        row = int(np.searchsorted(ids, int(ID)))
+
+        if row < len(ids) and ids[row] == int(ID):
+            return row
+
+        return None
+
+
+    def name(self, section, ID):
+        '''
+        returns: the name stored for ID, or None
+        '''
+        row = self._row(section, ID)
+
+        if row is None:
+            return None
+
+        return self._name_at(self.tables[section], row).decode()
+
+
+    def environment(self, section, ID):
+        '''
+        returns: the environment ID stored for ID, or None
+        '''
+        row = self._row(section, ID)
+
+        if row is None or self.tables[section]["environments"][row] < 0:
+            return None
+
+        return int(self.tables[section]["environments"][row])
+
+
+    def ID(self, section, name):
+        '''
+        returns: the ID stored for name (the lowest one if the name is used more than once), or None
+        '''
+        table = self.tables[section]
+        target = name.encode()
+        low, high = 0, len(table["by_name"])
+
+        while low < high:
+            middle = (low + high) // 2
+            if self._name_at(table, int(table["by_name"][middle])) < target:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low < len(table["by_name"]):
+            row = int(table["by_name"][low])
+            if self._name_at(table, row) == target:
+                return int(table["ids"][row])
+
+        return None
+
+
+    def name_and_ID(self, section):
+        '''
+        returns: {ID: name} for the whole section, same shape get_name_and_ID gives back
+        '''
+        table = self.tables[section]
+
+        return {int(table["ids"][row]): self._name_at(table, row).decode() for row in range(len(table["ids"]))}
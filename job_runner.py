@@ -0,0 +1,379 @@
+'''
+Declarative batch jobs for LiongardAPI
+
+A job is a JSON (or YAML, if PyYAML is installed) file listing the LiongardAPI calls to make
+and where their arguments come from. Steps that do not depend on each other run at the same
+time, all on one LiongardAPI instance so they share its connection pool and rate limit.
+A for_each step starts on each item as soon as the step it loops over produces it, so it
+does not wait for the whole upstream step to finish.
+
+Example job:
+    {
+        "steps": [
+            {"id": "envs", "call": "get_environments"},
+            {"id": "related", "call": "get_related_entities", "for_each": "envs",
+             "args": {"organizationID": "$item.ID"}},
+            {"id": "runs", "call": "run_single_launchpoint", "for_each": "related", "flatten": true,
+             "where": {"Enabled": true}, "args": {"launchpointID": "$item.ID"}}
+        ]
+    }
+
+Step keys:
+    id        ---> name other steps use to refer to this one
+    call      ---> name of the LiongardAPI method to call
+    args      ---> keyword arguments, strings starting with $ are references
+                    $item.<path>         the current item of a for_each
+                    $steps.<id>.<path>   the result of another step (waits for it to finish)
+    for_each  ---> id of the step to loop over, the call is made once per item
+    flatten   ---> when looping over a for_each step whose calls return lists, loop over the
+                    entries of those lists instead
+    where     ---> {field: value} only items matching every field are used
+    after     ---> list of step ids to wait on that are not referenced anywhere else
+
+Usage:
+    runner = JobRunner(test, "nightly.json", workers=16, checkpoint="nightly")
+    results = runner.run()          # {step id: result}, for_each steps give a list
+    runner.errors                   # [(step id, item key, error message), ...]
+
+    # if it gets interrupted, running it again with the same checkpoint skips every call
+    # that already finished
+'''
+
+import os
+import json
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from transport import submit
+from jsonstream import lookup
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+def load_job(path):
+    '''
+    Helper function: reads a job description from a .json, .yaml or .yml file
+    '''
+    with open(path, 'r') as reader:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ImportError("PyYAML is needed to read YAML jobs: pip install pyyaml")
+            return yaml.safe_load(reader)
+
+        return json.load(reader)
+
+
+def _sort_key(key):
+    '''
+    Helper function: item keys look like "3" or "3.1", sort them numerically
+    '''
+    return tuple(int(part) for part in key.split(".")) if key else ()
+
+
+def _references(value):
+    '''
+    Helper function: every step id referenced with $steps.<id> inside of value
+    '''
+    if isinstance(value, str) and value.startswith("$steps."):
+        return {value.split(".")[1]}
+
+    found = set()
+
+    if isinstance(value, dict):
+        for inner in value.values():
+            found |= _references(inner)
+
+    if isinstance(value, list):
+        for inner in value:
+            found |= _references(inner)
+
+    return found
+
+
+class StepStream():
+    '''
+    Purpose:
+        results of one step as they come in, other steps can loop over them while it is running
+    '''
+
+    def __init__(self):
+        self.items = {}
+        self.arrived = []
+        self.done = False
+        self.result = None
+        self.condition = threading.Condition()
+
+
+    def publish(self, key, value):
+        with self.condition:
+            self.items[key] = value
+            self.arrived.append(key)
+            self.condition.notify_all()
+
+
+    def finish(self, result):
+        with self.condition:
+            self.result = result
+            self.done = True
+            self.condition.notify_all()
+
+
+    def wait(self):
+        '''
+        blocks until the step is finished and returns its result
+        '''
+        with self.condition:
+            while not self.done:
+                self.condition.wait()
+
+            return self.result
+
+
+    def follow(self):
+        '''
+        generator of (key, value) in the order the results arrive, ends when the step is finished
+        '''
+        position = 0
+
+        while True:
+            with self.condition:
+                while position >= len(self.arrived) and not self.done:
+                    self.condition.wait()
+
+                if position >= len(self.arrived):
+                    return
+
+                key = self.arrived[position]
+                value = self.items[key]
+
+            position += 1
+            yield key, value
+
+
+class JobRunner():
+    '''
+    Purpose:
+        compiles a job description in to a DAG of steps and runs it on a LiongardAPI instance
+
+    Usage:
+        job ---> a job dictionary or the path to a job file
+        workers ---> max calls in flight at once across the whole job
+        checkpoint ---> file name (.jsonl is added) to record finished calls to, running with the
+            same checkpoint again picks up where the last run stopped
+
+    List of Methods:
+        def order(self)
+        def run(self)
+    '''
+
+    def __init__(self, api, job, workers=16, checkpoint=""):
+        if isinstance(job, str):
+            job = load_job(job)
+
+        self.api = api
+        self.workers = workers
+        self.steps = {step['id']: step for step in job['steps']}
+        self.errors = []
+
+        self.dependencies = {}
+        for ID, step in self.steps.items():
+            needs = _references(step.get('args', {})) | set(step.get('after', []))
+            if step.get('for_each'):
+                needs.add(step['for_each'])
+
+            unknown = needs - set(self.steps)
+            if unknown:
+                raise ValueError(f"step '{ID}' depends on steps that do not exist: {sorted(unknown)}")
+
+            if not hasattr(api, step['call']):
+                raise ValueError(f"step '{ID}' calls '{step['call']}' which LiongardAPI does not have")
+
+            self.dependencies[ID] = needs
+
+        self.order()
+
+        self.checkpoint = f"{checkpoint}.jsonl" if checkpoint else ""
+        self.finished = {}
+        self.checkpoint_lock = threading.Lock()
+
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            with open(self.checkpoint, 'r') as reader:
+                for line in reader:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.finished[(entry['step'], entry['key'])] = entry['result']
+
+
+    def order(self):
+        '''
+        returns: the step ids in an order where every step comes after what it depends on,
+            raises ValueError if the job has a cycle in it
+        '''
+        ordered = []
+        state = {}
+
+        def visit(ID):
+            if state.get(ID) == "done":
+                return
+            if state.get(ID) == "visiting":
+                raise ValueError(f"job has a cycle through step '{ID}'")
+
+            state[ID] = "visiting"
+            for need in sorted(self.dependencies[ID]):
+                visit(need)
+            state[ID] = "done"
+            ordered.append(ID)
+
+        for ID in self.steps:
+            visit(ID)
+
+        return ordered
+
+
+    def _resolve(self, value, item, streams):
+        '''
+        Helper function: swaps $item/$steps references for their values
+        '''
+        if isinstance(value, str) and value.startswith("$item"):
+            return lookup(item, value[len("$item"):], strict=True)
+
+        if isinstance(value, str) and value.startswith("$steps."):
+            parts = value.split(".")
+            return lookup(streams[parts[1]].wait(), parts[2:], strict=True)
+
+        if isinstance(value, dict):
+            return {key: self._resolve(inner, item, streams) for key, inner in value.items()}
+
+        if isinstance(value, list):
+            return [self._resolve(inner, item, streams) for inner in value]
+
+        return value
+
+
+    def _record(self, ID, key, result):
+        '''
+        Helper function: appends a finished call to the checkpoint file
+        '''
+        if not self.checkpoint:
+            return
+
+        line = json.dumps({"step": ID, "key": key, "result": result}, default=str)
+
+        with self.checkpoint_lock:
+            with open(self.checkpoint, 'a') as writer:
+                writer.write(line + "\n")
+
+
+    def _items(self, step, streams):
+        '''
+        Helper function: generator of (key, item) for a for_each step, following its source live
+        '''
+        source = self.steps[step['for_each']]
+        where = step.get('where', {})
+
+        if source.get('for_each'):
+            entries = streams[source['id']].follow()
+        else:
+            result = streams[source['id']].wait()
+            entries = ((str(index), value) for index, value in enumerate(result or []))
+
+        for key, value in entries:
+            if step.get('flatten') and isinstance(value, list):
+                expanded = [(f"{key}.{index}", inner) for index, inner in enumerate(value)]
+            else:
+                expanded = [(key, value)]
+
+            for inner_key, inner in expanded:
+                if all(isinstance(inner, dict) and inner.get(field) == wanted for field, wanted in where.items()):
+                    yield inner_key, inner
+
+
+    def _call(self, ID, key, item, streams):
+        '''
+        Helper function: one LiongardAPI call, or its checkpointed result
+        '''
+        if (ID, key) in self.finished:
+            return self.finished[(ID, key)]
+
+        step = self.steps[ID]
+        args = self._resolve(step.get('args', {}), item, streams)
+
+        result = getattr(self.api, step['call'])(**args)
+        self._record(ID, key, result)
+
+        return result
+
+
+    def _item(self, ID, key, item, streams, stream):
+        '''
+        Helper function: one for_each call, publishes the result so downstream steps can start on it
+        '''
+        try:
+            result = self._call(ID, key, item, streams)
+        except Exception as error:
+            self.errors.append((ID, key, str(error)))
+            print(f"job step '{ID}' failed on item {key}: {error}")
+            return
+
+        stream.publish(key, result)
+
+
+    def _coordinate(self, ID, pool, streams):
+        '''
+        Helper function: runs on its own thread per step, hands the step's calls to the shared
+        pool and publishes the results
+        '''
+        step = self.steps[ID]
+        stream = streams[ID]
+
+        try:
+            for need in self.dependencies[ID]:
+                if need != step.get('for_each'):
+                    streams[need].wait()
+
+            if not step.get('for_each'):
+                stream.finish(submit(pool, self._call, ID, "", None, streams).result())
+                return
+
+            pending = []
+            for key, item in self._items(step, streams):
+                pending.append(submit(pool, self._item, ID, key, item, streams, stream))
+
+            for future in pending:
+                future.result()
+
+            stream.finish([stream.items[key] for key in sorted(stream.items, key=_sort_key)])
+        except Exception as error:
+            self.errors.append((ID, "", str(error)))
+            print(f"job step '{ID}' failed: {error}")
+            stream.finish(None)
+
+
+    def run(self):
+        '''
+        description:
+            runs every step, independent steps and for_each items at the same time
+
+        returns: {step id: result}, failed calls are left out of for_each results and listed
+            in self.errors, they are not checkpointed so a rerun tries them again
+        '''
+        self.errors = []
+        streams = {ID: StepStream() for ID in self.steps}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            coordinators = [
+                threading.Thread(target=contextvars.copy_context().run, args=(self._coordinate, ID, pool, streams), daemon=True)
+                for ID in self.order()
+            ]
+
+            for coordinator in coordinators:
+                coordinator.start()
+
+            for coordinator in coordinators:
+                coordinator.join()
+
+        return {ID: stream.result for ID, stream in streams.items()}
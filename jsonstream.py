@@ -0,0 +1,258 @@
+'''
+Incremental JSON parsing for large responses
+
+iter_json_array reads a response a chunk at a time and yields the entries of a top level JSON
+array one by one, so the whole body (and the whole parsed list) never has to be in memory at
+once. Responses that are not a top level array are parsed whole and yielded as a single value,
+unless nested=True (or path=) finds an array inside of a top level object to stream instead.
+
+compile_fields/project cut records down to a few (dotted) fields, used on each entry as it is
+parsed so the full records never pile up. lookup/lookup_any read a single (dotted) field.
+'''
+
+import json
+import codecs
+
+
+WHITESPACE = " \t\r\n"
+NUMBER = "0123456789+-.eE"
+
+# once this much of the buffer has been parsed it is cut off
+TRIM_AT = 1 << 16
+
+
+def iter_json_array(chunks, nested=False, path=None):
+    '''
+    description:
+        chunks ---> iterable of bytes or str, ex: response.iter_content(65536)
+        nested ---> set to True to also stream the first array directly inside of a top level
+            object, ex: {"Count": 2, "Data": [...]}, members before it are parsed whole and
+            members after it are never read
+        path ---> dotted keys of the one array inside of the top level object to stream instead,
+            ex: "Data.LaunchPoints" for {"Success": true, "Data": {"LaunchPoints": [...]}}
+
+    returns:
+        generator, yields ("item", entry) for each entry of a top level array (or with nested/path,
+        of the array they point to), or a single ("value", parsed) when the body is anything else,
+        an object without that array in it included
+    '''
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+
+    buffer = ""
+    position = 0
+    finished = False
+
+    def more():
+        nonlocal buffer, position, finished
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            finished = True
+            buffer += text.decode(b"", final=True)
+            return False
+
+        if position > TRIM_AT:
+            buffer = buffer[position:]
+            position = 0
+
+        buffer += text.decode(chunk) if isinstance(chunk, bytes) else chunk
+        return True
+
+    def skip(characters):
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in characters:
+                position += 1
+            if position < len(buffer) or not more():
+                return
+
+    def parse():
+        nonlocal position
+        while True:
+            try:
+                entry, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not more():
+                    raise
+                continue
+
+            # a number that runs to the end of the buffer (ex: "12" or "-3." of "-3.5") might
+            # continue in the next chunk
+            if not finished and isinstance(entry, (int, float)) and not buffer[end:].lstrip(NUMBER):
+                more()
+                continue
+
+            position = end
+            return entry
+
+    def items():
+        nonlocal position
+        position += 1
+
+        while True:
+            skip(WHITESPACE + ",")
+
+            if position >= len(buffer):
+                raise ValueError("response ended in the middle of a JSON array")
+
+            if buffer[position] == "]":
+                return
+
+            yield "item", parse()
+
+    skip(WHITESPACE)
+
+    if position >= len(buffer):
+        return
+
+    if buffer[position] == "[":
+        yield from items()
+        return
+
+    def members(keys):
+        '''
+        parses the object at position, streaming the array at keys (any first array when keys is None)
+
+        returns: (the members parsed, True when the array was streamed)
+        '''
+        nonlocal position
+        position += 1
+        found = {}
+
+        while True:
+            skip(WHITESPACE + ",")
+
+            if position >= len(buffer):
+                raise ValueError("response ended in the middle of a JSON object")
+
+            if buffer[position] == "}":
+                position += 1
+                return found, False
+
+            key = parse()
+            skip(WHITESPACE + ":")
+            opening = buffer[position] if position < len(buffer) else ""
+
+            if opening == "[" and (keys is None or keys == [key]):
+                yield from items()
+                return found, True
+
+            if opening == "{" and keys and len(keys) > 1 and keys[0] == key:
+                inner, streamed = yield from members(keys[1:])
+                if streamed:
+                    return found, True
+                found[key] = inner
+                continue
+
+            found[key] = parse()
+
+    if (nested or path) and buffer[position] == "{":
+        found, streamed = yield from members(path.split(".") if isinstance(path, str) else list(path) if path else None)
+        if not streamed:
+            yield "value", found
+        return
+
+    while more():
+        pass
+    yield "value", json.loads(buffer[position:])
+
+
+def iter_json_entries(chunks):
+    '''
+    Entries of a top level array one at a time, a body that is not an array is yielded as is
+    '''
+    for _, entry in iter_json_array(chunks):
+        yield entry
+
+
+def compile_fields(fields):
+    '''
+    Helper function: turns dotted field paths in to the nested shape project() walks
+        ["ID", "Environment.Name", "Environment.ID"] ---> {"ID": None, "Environment": {"Name": None, "ID": None}}
+
+    returns: the shape, None if fields is empty (keep everything)
+    '''
+    if not fields:
+        return None
+
+    if isinstance(fields, str):
+        fields = [fields]
+
+    shape = {}
+
+    for field in fields:
+        level = shape
+        parts = field.split(".")
+
+        for part in parts[:-1]:
+            if level.get(part, {}) is None:
+                break
+            level = level.setdefault(part, {})
+        else:
+            level[parts[-1]] = None
+
+    return shape
+
+
+def project(value, shape):
+    '''
+    description:
+        keeps only the fields in shape (from compile_fields) out of a record, lists along the way
+        are projected entry by entry and fields a record does not have are left out
+
+    returns: the projected copy, or value untouched when shape is None
+    '''
+    if shape is None:
+        return value
+
+    if isinstance(value, list):
+        return [project(entry, shape) for entry in value]
+
+    if not isinstance(value, dict):
+        return value
+
+    return {key: project(value[key], inner) for key, inner in shape.items() if key in value}
+
+
+def lookup(value, path, default=None, strict=False):
+    '''
+    description:
+        follows path through nested dictionaries, and lists by position
+
+        path ---> dotted string ("Environment.Name", "Data.0.ID") or a sequence of keys ("Environment", "Name"),
+            empty parts are skipped
+        strict ---> True to raise KeyError for a missing part instead of returning default
+
+    returns: the value at path, default if any part of it is missing
+    '''
+    parts = path.split(".") if isinstance(path, str) else path
+
+    for part in parts:
+        if part == "":
+            continue
+
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and str(part).isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        elif strict:
+            raise KeyError(f"'{part}' of '{path if isinstance(path, str) else '.'.join(map(str, path))}' is missing")
+        else:
+            return default
+
+    return value
+
+
+def lookup_any(value, paths, default=None):
+    '''
+    returns: the value at the first of paths (see lookup) that is there and not None, else default
+    '''
+    for path in paths:
+        found = lookup(value, path)
+
+        if found is not None:
+            return found
+
+    return default
@@ -1,6 +1,36 @@
 import requests
 import json
+import time
+import re
+import gzip
 from base64 import b64encode
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from transport import RateLimiter, LatencyTracker, CircuitBreaker, CircuitOpenError, endpoint_key, hedged_call
+from transport import Deadline, DeadlineExceeded, current_deadline, submit, run_async
+from jsonstream import iter_json_array, compile_fields, project, lookup
+from spill import SpillList, SPILL_MEMORY
+from http2 import HTTP2Session, http2_available
+from scheduler import RequestScheduler, Priority, current_priority, DEFAULT_PRIORITY
+
+
+# bytes read off the wire at a time by the streaming readers
+STREAM_CHUNK = 1 << 16
+
+# list method ---> path of the endpoint behind it, see get_list
+LIST_PATHS = {
+    "get_environments": "/api/v2/environments/",
+    "get_systems": "/api/v1/systems",
+    "get_inspectors": "/api/v1/inspectors",
+    "get_alerts": "/api/v1/tasks",
+    "get_detections": "/api/v1/detections",
+    "get_agents": "/api/v1/agents",
+    "get_users": "/api/v1/users",
+    "get_launchpoints": "/api/v1/launchpoints",
+    "get_timelines": "/api/v1/timeline",
+    "get_metrics": "/api/v1/metrics",
+}
 
 
 class LiongardAPI():
@@ -23,63 +53,101 @@ class LiongardAPI():
 
         The methods are self explanitory and have comments to help you use them. 
 
+        Every list and single item getter takes fields=[...] to only keep the fields you need,
+        ex: test.get_agents(fields=["ID", "Name", "Environment.Name"]), see get_json
+
     List of Methods: 
-        def __init__(self, instance_url="example", private_api_key="example", public_api_key="example")
+        def __init__(self, instance_url="example", private_api_key="example", public_api_key="example", pool_size=10, rate_limit=0,
+                 timeout=60, hedge=False, hedge_delay=1.0, breaker_threshold=5, breaker_cooldown=30, http2=False, priorities=None,
+                 default_priority="interactive")
+        def request(self, method, url, **kwargs)
+        def deadline(self, seconds=None)
+        def priority(self, name)
+        async def call_async(self, method, *args, **kwargs)
+        def get_list(self, method, lazy=False)
         def get_environment_count(self)
-        def get_environments(self)
-        def get_single_environment(self, organizationID)
+        def get_environments(self, fields=None)
+        def get_single_environment(self, organizationID, fields=None)
         def get_name_and_ID(self, file="")
         def single_post_environment(self, payload)
         def bulk_post_environments(self, list_envs)
         def update_single_environment(self, organizationID, payload)
         def bulk_update_environments(self, list_envs)
         def delete_single_environment(self, organizationID)
-        def get_related_entities(self, organizationID, file="")
-        def get_metrics(self, file="")
-        def get_metric_data(self, systemID, metricUUID, file="")
+        def get_related_entities(self, organizationID, file="", fields=None)
+        def get_metrics(self, file="", fields=None)
+        def get_metric_data(self, systemID, metricUUID, file="", fields=None)
         def system_count(self)
-        def get_systems(self)
-        def get_system_detail_view(self, systemID)
+        def get_systems(self, fields=None)
+        def get_system_detail_view(self, systemID, fields=None)
         def get_system_name_ID(self, file="")
         def search_systems(self, keywords)
         def alert_count(self)
-        def get_alerts(self, file="", json="")
-        def get_single_alert(self, TaskID, json="")
+        def get_alerts(self, file="", json="", fields=None)
+        def get_single_alert(self, TaskID, json="", fields=None)
         def detections_count(self)
-        def get_detections(self, file="", json="")
-        def get_single_detection(self, DetectionID, json="")
-        def get_detections_by_inspectorID(self, inspectorID, json="")
-        def get_inspectors(self, file="", json="")
-        def get_inspector_versions(self, inspectorID, json="")
+        def get_detections(self, file="", json="", lazy=False, fields=None)
+        def get_single_detection(self, DetectionID, json="", fields=None)
+        def get_detections_by_inspectorID(self, inspectorID, json="", fields=None)
+        def get_inspectors(self, file="", json="", fields=None)
+        def get_inspector_versions(self, inspectorID, json="", fields=None)
         def agent_count(self)
-        def get_agents(self, file="", json="")
-        def get_single_agent(self, agentID, json="")
+        def get_agents(self, file="", json="", fields=None)
+        def get_single_agent(self, agentID, json="", fields=None)
         def flush_agent_job_queue(self, agentID)
         def delete_agent(self, agentID)
+        def agent_call(self, method, agentID, action="", fields=None, parse=True)
         def user_count(self)
-        def get_users(self, file="", json="")
-        def get_single_user(self, UserID, json="")
-        def get_groups(self, json="")
+        def get_users(self, file="", json="", fields=None)
+        def get_single_user(self, UserID, json="", fields=None)
+        def get_groups(self, json="", fields=None)
         def get_launchpoints_count(self)
-        def get_launchpoints(self, file="", json="")
-        def get_single_launchpoint(self, LaunchpointID, json="")
-        def get_single_launchpoint_log(self, launchpointID, timelineID, json="")
+        def get_launchpoints(self, file="", json="", fields=None)
+        def get_single_launchpoint(self, LaunchpointID, json="", fields=None)
+        def get_single_launchpoint_log(self, launchpointID, timelineID, json="", fields=None)
+        def stream_launchpoint_log(self, launchpointID, timelineID, match=None, skip=0)
+        def tail_launchpoint_log(self, launchpointID, timelineID, match=None, interval=5, idle=120)
+        def save_launchpoint_log(self, launchpointID, timelineID, file, match=None, follow=False, interval=5, idle=120)
         def run_single_launchpoint(self, launchpointID)
         def bulk_run_launchpoints(self, launchpointIDs=[0])
         def get_timeline_count(self)
-        def get_timelines(self, file="", json="")
-        def get_single_timeline(self, timelineID)
-        def get_timeline_detail(self, timelineID)
+        def get_timelines(self, file="", json="", lazy=False, fields=None)
+        def get_single_timeline(self, timelineID, fields=None)
+        def get_timeline_detail(self, timelineID, fields=None)
+        def iter_timeline_details(self, timelines=None, logs=True, workers=8, prefetch=32)
     '''
 
 
-    def __init__(self, instance_url="example", private_api_key="example", public_api_key="example"):
+    def __init__(self, instance_url="example", private_api_key="example", public_api_key="example", pool_size=10, rate_limit=0,
+                 timeout=60, hedge=False, hedge_delay=1.0, breaker_threshold=5, breaker_cooldown=30, http2=False,
+                 priorities=None, default_priority=DEFAULT_PRIORITY):
         '''
         Please pass through the 'instance_url', 'private_api_key', 'public_api_key' through in the constructor
         the above are the param names for the constructor. 
         See: https://docs.liongard.com/reference/  for information regarding what those are
 
-        
+        instance_url can also be a full URL such as "http://liongard-proxy:8080" to send every
+        request somewhere other than https://<instance_url>.app.liongard.com (see proxy.py)
+
+        pool_size ---> number of connections kept open to Liongard, raise this if you are running
+            a lot of requests at the same time
+        rate_limit ---> max requests per second across every thread using this instance, 0 is no limit
+        timeout ---> seconds to wait on Liongard before giving up on a request, None waits as long as it takes
+
+        hedge ---> set to True to send a second copy of a read (GET) when the first one is slower
+            than the 95th percentile seen for that endpoint, whichever answers first is used
+        hedge_delay ---> seconds to wait before hedging until an endpoint has enough history
+        breaker_threshold ---> failures in a row (errors, timeouts, 5xx) before an endpoint fails fast
+            with CircuitOpenError instead of being called, 0 turns this off
+        breaker_cooldown ---> seconds an endpoint fails fast for before one request is let through to test it
+
+        http2 ---> set to True to multiplex requests over a few HTTP/2 connections instead of one
+            connection per request in flight (see http2.py), needs httpx[http2] and falls back to
+            HTTP/1.1 when it is not installed or the server does not offer HTTP/2
+        priorities ---> priority classes for the request scheduler (see scheduler.py), by default
+            "interactive" and "batch", where batch can only hold 3/4 of the pool_size request slots
+        default_priority ---> class requests made outside of a priority block run under, has to be
+            one of priorities
         '''
 
         self.public_api_key = public_api_key
@@ -87,6 +155,32 @@ class LiongardAPI():
         
         self.instance_url = instance_url
 
+        if instance_url.startswith("http://") or instance_url.startswith("https://"):
+            self.base_url = instance_url.rstrip("/")
+        else:
+            self.base_url = f"https://{self.instance_url}.app.liongard.com"
+
+        if http2 and http2_available():
+            self.session = HTTP2Session(max_connections=pool_size)
+        else:
+            if http2:
+                print("LiongardAPI: httpx[http2] is not installed, falling back to HTTP/1.1")
+
+            self.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
+
+        self.rate_limiter = RateLimiter(rate_limit)
+
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.pool = ThreadPoolExecutor(max_workers=pool_size * 2)
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.scheduler = RequestScheduler(pool_size, priorities, default_priority)
+
         self.passable_key = f"{self.public_api_key}:{self.private_api_key}".encode()
         
         self.passable_key = b64encode(self.passable_key)
@@ -103,16 +197,277 @@ class LiongardAPI():
         }
 
 
-    @classmethod
-    def get_json(self, url, headers):
+    def request(self, method, url, **kwargs):
+        '''
+        Every call to Liongard goes through here, it waits for a request slot under the caller's
+        priority class (see the priority method), then on the rate limit (if one was set) and sends the request over the shared connection pool with the timeout set in the constructor
+
+        reads are hedged when hedge=True, launchpoint runs are GETs too but are never sent twice
+
+        inside of a deadline (see the deadline method) the timeout is cut down to whatever is left
+        of the budget, and the request stops being waited on the moment the deadline is cancelled,
+        the send itself keeps its request slot until it really finishes
+
+        with stream=True the request slot is kept until the response is closed, so close it once
+        the body has been read
+
+        returns: requests.Response, raises CircuitOpenError while the endpoint is failing fast
+            and DeadlineExceeded when the deadline runs out or is cancelled
+        '''
+        key = endpoint_key(method, url)
+        self.breaker.allow(key)
+
+        # anything that ends the request without success() or failure() still has to let go of
+        # a half-open trial, or the endpoint would fail fast for good
+        settled = False
+
+        try:
+            kwargs.setdefault("timeout", self.timeout)
+
+            deadline = current_deadline()
+            if deadline is not None:
+                deadline.check()
+
+                # timeout=None means no timeout of its own, a deadline without a time limit leaves it alone
+                if deadline.remaining() != float("inf"):
+                    kwargs["timeout"] = deadline.remaining() if kwargs["timeout"] is None else min(kwargs["timeout"], deadline.remaining())
+
+            send = lambda: self.send(key, method, url, **kwargs)
+
+            try:
+                # the slot is taken on the caller's thread so queued batch requests never tie up the
+                # worker pool ahead of interactive ones, a hedge rides on the slot of its first attempt
+                priority = self.scheduler.acquire(current_priority(), deadline)
+                held = False
+
+                try:
+                    if self.hedge and method == "GET" and not url.split("?")[0].endswith("/run"):
+                        delay = self.latency.percentile(key, 95)
+                        response = hedged_call(self.pool, send, self.hedge_delay if delay is None else delay, kwargs["timeout"], deadline)
+                    elif deadline is not None:
+                        attempt = self.pool.submit(send)
+
+                        try:
+                            response = deadline.result(attempt)
+                        except DeadlineExceeded:
+                            # the send is still running on the pool, it keeps the slot until it is done
+                            attempt.add_done_callback(lambda done: self.abandoned(done, priority))
+                            held = True
+                            raise
+                    else:
+                        response = send()
+
+                    # a streamed body is still coming in when this returns, the slot goes with it
+                    if kwargs.get("stream"):
+                        self.scheduler.hold(response, priority)
+                        held = True
+                finally:
+                    if not held:
+                        self.scheduler.release(priority)
+            except (CircuitOpenError, DeadlineExceeded):
+                raise
+            except requests.exceptions.RequestException:
+                self.breaker.failure(key)
+                settled = True
+                raise
+
+            if response.status_code >= 500:
+                self.breaker.failure(key)
+            else:
+                self.breaker.success(key)
+            settled = True
+
+            return response
+        finally:
+            if not settled:
+                self.breaker.abandon(key)
+
+
+    def send(self, key, method, url, **kwargs):
+        '''
+        Helper function: a single attempt at a request, records how long it took (and how big it was)
+        for hedging and the query planner
+        '''
+        self.rate_limiter.acquire()
+
+        start = time.monotonic()
+        response = self.session.request(method, url, **kwargs)
+        size = None if kwargs.get("stream") else len(response.content)
+        self.latency.record(key, time.monotonic() - start, size)
+
+        return response
+
+
+    def abandoned(self, attempt, priority):
+        '''
+        Helper function: runs once a send nobody is waiting on any more finishes, closes its
+        response and gives back the request slot it was sent on
+        '''
+        try:
+            if attempt.exception() is None:
+                attempt.result().close()
+        finally:
+            self.scheduler.release(priority)
+
+
+    def deadline(self, seconds=None):
+        '''
+        Gives every request made inside of the with block (on any thread the helpers fan out to)
+        a shared time budget, see transport.Deadline
+
+        usage:
+            with test.deadline(30) as budget:
+                names = test.get_name_and_ID()
+
+            budget.cancel() ---> call from another thread to abort whatever is still running
+
+        returns: Deadline
+        '''
+        return Deadline(seconds)
+
+
+    def priority(self, name):
+        '''
+        Schedules every request made inside of the with block (on any thread the helpers fan out to)
+        under a priority class, requests made outside of one are "interactive"
+
+        usage:
+            with test.priority("batch"):
+                test.get_detections()
+
+        returns: scheduler.Priority
+        '''
+        if name not in self.scheduler.classes:
+            raise ValueError(f"unknown priority '{name}', pick one of {sorted(self.scheduler.classes)}")
+
+        return Priority(name)
+
+
+    async def call_async(self, method, *args, **kwargs):
+        '''
+        Runs any method of this class from asyncio code without blocking the event loop,
+        cancelling the task (or asyncio.wait_for timing out) cancels its requests
+
+        usage:
+            names = await asyncio.wait_for(test.call_async("get_name_and_ID"), 30)
+        '''
+        return await run_async(None, getattr(self, method), *args, **kwargs)
+
+
+    def get_json(self, url, headers, fields=None):
         '''
         Simply a helper method, repetivive action
+
+        fields ---> optional list of the fields to keep, dotted for nested ones, ex: ["ID", "Environment.Name"]
+            the request is the same one it always was, the response is parsed one record at a time
+            and everything else is dropped straight away, so the full records are never all in memory
+            together (the file= writers leave out, as None, the fields that were not kept)
         '''
-        
-        response = requests.get(url, headers=headers)
-        obj = json.loads(response.text)
-        
-        return obj
+        if not fields:
+            response = self.request("GET", url, headers=headers)
+            obj = json.loads(response.text)
+
+            return obj
+
+        shape = compile_fields(fields)
+        response = self.request("GET", url, headers=headers, stream=True)
+        rows = []
+
+        try:
+            for kind, value in iter_json_array(response.iter_content(STREAM_CHUNK)):
+                if kind == "value":
+                    return project(value, shape)
+
+                rows.append(project(value, shape))
+        finally:
+            response.close()
+
+        return rows
+
+
+    def get_json_lazy(self, url, headers, lazy=True, fields=None):
+        '''
+        Helper function: get_json for big lists, parses the response as it streams in and
+        returns a SpillList so rows past the memory limit go to disk instead of RAM
+
+        lazy ---> True for the default limit (spill.SPILL_MEMORY) or the number of bytes to keep in memory
+        '''
+        shape = compile_fields(fields)
+        response = self.request("GET", url, headers=headers, stream=True)
+        rows = SpillList(max_memory=SPILL_MEMORY if lazy is True else lazy)
+
+        try:
+            for kind, value in iter_json_array(response.iter_content(STREAM_CHUNK)):
+                if kind == "value":
+                    rows.close()
+                    return project(value, shape)
+
+                rows.append(project(value, shape))
+        finally:
+            response.close()
+
+        return rows
+
+
+    def get_list(self, method, lazy=False):
+        '''
+        Grabs the same list the list method does (method ---> one of LIST_PATHS, ex: "get_agents"),
+        but an empty list comes back as [] instead of 0 and a failed pull raises instead of
+        returning 0/False, so code that keeps state between pulls (watch.py, mirror.py) can tell
+        "there is nothing" apart from "could not ask"
+
+        lazy ---> same as get_detections(lazy=...), the list comes back as a SpillList
+
+        returns: list (SpillList when lazy), raises ValueError if Liongard did not answer with a list
+        '''
+        if method not in LIST_PATHS:
+            raise ValueError(f"{method} is not a list method, pick one of {sorted(LIST_PATHS)}")
+
+        url = f"{self.base_url}{LIST_PATHS[method]}"
+        data = self.get_json_lazy(url, self.headers, lazy) if lazy else self.get_json(url, self.headers)
+
+        # the v2 endpoints wrap the list as {"Success": ..., "Data": [...]}
+        if isinstance(data, dict) and 'Success' in data:
+            if data['Success'] == False:
+                raise ValueError(f"{method} failed: {data.get('Message')}")
+            data = data.get('Data')
+
+        if not isinstance(data, (list, SpillList)):
+            raise ValueError(f"{method} did not answer with a list: {str(data)[:200]}")
+
+        return data
+
+
+    def get_data(self, url, path="Data", fields=None):
+        '''
+        Helper function: get_json for the endpoints that answer {"Success": ..., "Data": ...},
+        the list at path (dotted, ex: "Data.LaunchPoints") is parsed one record at a time as it
+        streams in and projected with fields (see get_json), a body that is a plain list is too
+
+        returns: what is at path, False (after printing the Message) if Success is False
+        '''
+        shape = compile_fields(fields)
+        response = self.request("GET", url, headers=self.headers, stream=True)
+        rows = []
+
+        try:
+            for kind, value in iter_json_array(response.iter_content(STREAM_CHUNK), path=path):
+                if kind == "item":
+                    rows.append(project(value, shape))
+                    continue
+
+                if not isinstance(value, dict) or 'Success' not in value:
+                    return project(value, shape)
+
+                if value['Success'] == False:
+                    print(f"error occured while posting data\nmessage: {value.get('Message')}")
+                    return value['Success']
+
+                return project(lookup(value, path), shape)
+        finally:
+            response.close()
+
+        return rows
 
 
     @classmethod
@@ -137,6 +492,13 @@ class LiongardAPI():
         '''
         if file == "":
             return 0
+        elif isinstance(data, SpillList):
+            with open(f"{file}.json", 'w') as dumper:
+                dumper.write("[")
+                for index, row in enumerate(data):
+                    dumper.write(", " if index else "")
+                    json.dump(row, dumper)
+                dumper.write("]")
         else:
             dumper = open(f"{file}.json", 'w')
             json.dump(data, dumper)
@@ -148,7 +510,7 @@ class LiongardAPI():
         return an integer number of your environment count
         '''
         
-        count_request = requests.get(f"https://{self.instance_url}.app.liongard.com/api/v2/environments/count", headers=self.headers)
+        count_request = self.request("GET", f"{self.base_url}/api/v2/environments/count", headers=self.headers)
         count = json.loads(count_request.content)
 
         if count['Success'] == False:
@@ -158,23 +520,18 @@ class LiongardAPI():
         return count['Data']
 
 
-    def get_environments(self):    
+    def get_environments(self, fields=None):
         '''
         Grabs a list of the environments in the Liongard instance for the keys passed through.
         it will return an easily parseable JSON object. 
         '''
 
-        environments_request = requests.get(f"https://{self.instance_url}.app.liongard.com/api/v2/environments/", headers=self.headers)
-        environments_json = json.loads(environments_request.content)
-
-        if environments_json['Success'] == False:
-            print(f"error occured while posting data\nmessage: {environments_json['Message']}")
-            return environments_json['Success']
+        url = f"{self.base_url}/api/v2/environments/"
 
-        return environments_json['Data']
+        return self.get_data(url, fields=fields)
 
 
-    def get_single_environment(self, organizationID):
+    def get_single_environment(self, organizationID, fields=None):
         '''
         Simply pass the organization ID of the environment you are trying to get info on
 
@@ -182,16 +539,9 @@ class LiongardAPI():
         '''
 
 
-        url = f"https://{self.instance_url}.app.liongard.com/api/v2/environments/{organizationID}"
-        single_get = requests.get(url, headers=self.headers)
+        url = f"{self.base_url}/api/v2/environments/{organizationID}"
 
-        single_env = json.loads(single_get.text)
-
-        if single_env['Success'] == False:
-            print(f"error occured while posting data\nmessage: {single_env['Message']}")
-            return single_env['Success']
-
-        return single_env['Data']
+        return self.get_data(url, fields=fields)
 
 
     def get_name_and_ID(self, file=""):
@@ -209,7 +559,7 @@ class LiongardAPI():
         .txt is added automatically so simply specify the name as a string 
         '''
         
-        environments = self.get_environments()
+        environments = self.get_environments(fields=["ID", "Name"])
         key_value = {}
 
         if file != "":
@@ -238,8 +588,8 @@ class LiongardAPI():
         }
         '''
         
-        url = f"https://{self.instance_url}.app.liongard.com/api/v2/environments/"        
-        single_post = requests.get(url, headers=self.sec_headers)
+        url = f"{self.base_url}/api/v2/environments/"        
+        single_post = self.request("GET", url, headers=self.sec_headers)
 
         single_response = json.loads(single_post.text)
         
@@ -275,7 +625,7 @@ class LiongardAPI():
         to the provided example and more details
         '''
 
-        bulk_post = requests.post(f"https://{self.instance_url}.app.liongard.com/api/v2/environments/bulk", json=list_envs, headers=self.sec_headers)
+        bulk_post = self.request("POST", f"{self.base_url}/api/v2/environments/bulk", json=list_envs, headers=self.sec_headers)
 
         bulk_response = json.loads(bulk_post.text)
     
@@ -307,7 +657,7 @@ class LiongardAPI():
         
         '''
 
-        bulk_update = requests.put(f"https://{self.instance_url}.app.liongard.com/api/v2/environments/", json=list_envs, headers=self.sec_headers)
+        bulk_update = self.request("PUT", f"{self.base_url}/api/v2/environments/", json=list_envs, headers=self.sec_headers)
 
         bulk_response = json.loads(bulk_update.text)
     
@@ -335,9 +685,9 @@ class LiongardAPI():
 
         '''
         
-        url = f"https://{self.instance_url}.app.liongard.com/api/v2/environments/{organizationID}"
+        url = f"{self.base_url}/api/v2/environments/{organizationID}"
 
-        single_update = requests.put(url, json=payload, headers=self.sec_headers)
+        single_update = self.request("PUT", url, json=payload, headers=self.sec_headers)
 
         single_response = json.loads(single_update.text)
 
@@ -354,9 +704,9 @@ class LiongardAPI():
         Please enter a valid organization ID
         '''
         
-        url = f"https://{self.instance_url}.app.liongard.com/api/v2/environments/{organizationID}"
+        url = f"{self.base_url}/api/v2/environments/{organizationID}"
 
-        single_delete = requests.delete(url, headers=self.headers)
+        single_delete = self.request("DELETE", url, headers=self.headers)
 
         delete_response = json.loads(single_delete.content)
 
@@ -367,7 +717,7 @@ class LiongardAPI():
         return delete_response['Data']
 
 
-    def get_related_entities(self, organizationID, file=""):
+    def get_related_entities(self, organizationID, file="", fields=None):
         '''
         Grabs all the related entities to the environment referenced by organizationID in the params
          and return the 'ID' , 'Alias', 'SystemID', 'InspectorID', 'InspectorName', 'Enabled', and its 'Status'
@@ -376,26 +726,23 @@ class LiongardAPI():
          file name as such --> file="output"  ---> .txt will be added automatically
         '''
         
-        url = f"https://{self.instance_url}.app.liongard.com/api/v2/environments/{organizationID}/relatedEntities"
+        url = f"{self.base_url}/api/v2/environments/{organizationID}/relatedEntities"
 
-        related_request = requests.get(url, headers=self.headers)
+        related = self.get_data(url, "Data.LaunchPoints", fields)
 
-        related_response = json.loads(related_request.text)
-        
-        if related_response['Success'] == False:
-            print(f"error occured while posting data\nmessage: {related_response['Message']}")
-            return related_response['Success']
+        if related == False:
+            return related
 
         if file != "":
             outputF = open(f"{file}.txt", 'w')
 
-            for item in related_response['Data']['LaunchPoints']:
-                outputF.write(f"Name: {item['Alias']}, ID: {item['ID']}, InspectorID: {item['InspectorID']}, SystemID: {item['SystemID']}, Inspector Name: {item['InspectorName']}, Status: {item['Status']}, Enabled: {item['Enabled']} \n")
+            for item in related:
+                outputF.write(f"Name: {lookup(item, 'Alias')}, ID: {lookup(item, 'ID')}, InspectorID: {lookup(item, 'InspectorID')}, SystemID: {lookup(item, 'SystemID')}, Inspector Name: {lookup(item, 'InspectorName')}, Status: {lookup(item, 'Status')}, Enabled: {lookup(item, 'Enabled')} \n")
 
-        return related_response['Data']['LaunchPoints']
+        return related
 
     
-    def get_metrics(self, file=""):
+    def get_metrics(self, file="", fields=None):
         '''
         Grabs and returns list of all the metrics in the Liongard instance
         these metrics will be individual dictionaries that will be easily filtered
@@ -407,23 +754,20 @@ class LiongardAPI():
             ex: (file="output")
         '''
         
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/metrics"
+        url = f"{self.base_url}/api/v1/metrics"
 
-        metrics_request = requests.get(url, headers=self.headers)
-        metrics_response = json.loads(metrics_request.text)
+        metrics = self.get_data(url, fields=fields)
 
-        if metrics_response['Success'] == False:
-            print(f"error occured while posting data\nmessage: {metrics_response['Message']}")
-            return metrics_response['Success']
-        
+        if metrics == False:
+            return metrics
 
         if file != "":
             outputF = open(f"{file}.txt", 'w')
 
-            for metric in metrics_response:
-                outputF.write(f"Name: {metric['Name']}, ID: {metric['ID']}, UUID: {metric['UUID']}, UCK: {metric['UCK']}, Metric Display: {metric['MetricDisplay']}\n")
+            for metric in metrics:
+                outputF.write(f"Name: {lookup(metric, 'Name')}, ID: {lookup(metric, 'ID')}, UUID: {lookup(metric, 'UUID')}, UCK: {lookup(metric, 'UCK')}, Metric Display: {lookup(metric, 'MetricDisplay')}\n")
 
-        return metrics_response
+        return metrics
 
 
     # def create_metric(self, name="", InspectorID=0, queries):
@@ -439,12 +783,13 @@ class LiongardAPI():
     #     pass
     # TODO --> implement create, update and delete methods for metrics 
 
-    def get_metric_data(self, systemID, metricUUID, file=""):
+    def get_metric_data(self, systemID, metricUUID, file="", fields=None):
         '''
         HOT INFO: Can only pass through 10 seperate system ID's to parse at a time
 
         systemID --> Please pass either a single system ID or a list of system ID's no more than 10
         metricUUID --> Please pass through a string for the metricUUID of the metric you wish to see values for
+        fields --> optional fields to keep, see get_json
 
         NOTE NOT DONE WITH THIS METHOD: FINISH TESTING AND TEST WITH REAL SYSTEM ID'S AND METRIC UUID'S
         
@@ -453,10 +798,9 @@ class LiongardAPI():
         #initial parsing to create system_string to pass through to the URL
         system_string = ""
         if type(systemID) == list:
-            for num in systemID:
-                system_string += f"{systemID[num]},"
+            system_string = ",".join(str(num) for num in systemID)
         elif type(systemID) == int or type(systemID) == str:
-            system_string = systemID
+            system_string = str(systemID)
         else:
             print("Error Occurred: did not pass 'int' or 'list' of system ID's")    
             return 0
@@ -465,26 +809,20 @@ class LiongardAPI():
         #initial parsing to create metricUUID to pass through to the URL
         metric_string = ""
         if type(metricUUID) == list:
-            for num in metricUUID:
-                metric_string += f"{metricUUID[num]},"
+            metric_string = ",".join(str(uuid) for uuid in metricUUID)
         elif type(metricUUID) == int or type(metricUUID) == str:
-            metric_string = metricUUID
+            metric_string = str(metricUUID)
         else:
             print("Error Occurred: did not pass 'int' or 'list' of system ID's")    
             return 0
         
-        #taking off the last comma
-        system_string = system_string[:-1]
-        metric_string = metric_string[:-1]
-        
         #creating the URL to pass through to the API
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/metrics/bulk?systems={system_string}&uuid={str(metricUUID)}"
+        url = f"{self.base_url}/api/v1/metrics/bulk?systems={system_string}&uuid={metric_string}"
 
 
-        data_request = requests.get(url, headers=self.headers)
-        data_obj = json.loads(data_request)
+        data_obj = self.get_json(url, self.headers, fields)
 
-        if data_obj['Success'] == False:
+        if isinstance(data_obj, dict) and data_obj.get('Success') == False:
             print(f"error occured while posting data\nmessage: {data_obj['Message']}")
             return data_obj['Success']
 
@@ -506,15 +844,15 @@ class LiongardAPI():
 
         returns: <int> --> number of systems
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/systems/count"
+        url = f"{self.base_url}/api/v1/systems/count"
 
-        systems_request = requests.get(url, headers=self.headers)
+        systems_request = self.request("GET", url, headers=self.headers)
         systems_obj = systems_request.text
 
         return int(systems_obj)
 
     
-    def get_systems(self):
+    def get_systems(self, fields=None):
         '''
         grabs a list of all the systems in the liongard environment
 
@@ -523,14 +861,14 @@ class LiongardAPI():
         TODO implement the rest: https://docs.liongard.com/reference/systems
         '''
         
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/systems"
+        url = f"{self.base_url}/api/v1/systems"
 
-        systems_obj = LiongardAPI.get_json(self, url, headers=self.headers)
+        systems_obj = self.get_json(url, self.headers, fields)
 
         return systems_obj
 
 
-    def get_system_detail_view(self, systemID):
+    def get_system_detail_view(self, systemID, fields=None):
         '''
         Purpose:
             Grabs the data print of an inspector within your Liongard instance
@@ -541,13 +879,17 @@ class LiongardAPI():
             in your instance
 
         systemID ---> must be an integer
+        fields ---> optional fields of the data print to keep, see get_json, ex: ["Users.Name"]
         '''
         if type(systemID) != int:
             return f"System ID is not an integer: {type(systemID)}"
         
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/systems/{systemID}/view"
+        url = f"{self.base_url}/api/v1/systems/{systemID}/view"
+
+        if isinstance(fields, str):
+            fields = [fields]
 
-        data_print = LiongardAPI.get_json(self, url, self.headers)
+        data_print = self.get_json(url, self.headers, fields and [f"raw.{field}" for field in fields])
 
         return data_print['raw']
     
@@ -563,7 +905,7 @@ class LiongardAPI():
         
         name_and_id = {}
 
-        systems = LiongardAPI.get_systems(self)
+        systems = self.get_systems(fields=["Name", "ID", "Environment.Name"])
 
         for system in systems:
             name_and_id[system['Name']] = system['ID']
@@ -571,7 +913,7 @@ class LiongardAPI():
         if file != "":
             output = open(f"{file}.txt", 'w')
             for item in systems:
-                output.write(f"Name: {item['Name']}, ID: {item['ID']}, Environment: {item['Environment']['Name']}\n")
+                output.write(f"Name: {lookup(item, 'Name')}, ID: {lookup(item, 'ID')}, Environment: {lookup(item, 'Environment.Name')}\n")
 
         return name_and_id
     
@@ -586,7 +928,7 @@ class LiongardAPI():
         type(keywords) ---> Either a string or a list of strings
 
         '''
-        systems = LiongardAPI.get_systems()
+        systems = self.get_systems()
 
         matches = []
         
@@ -605,16 +947,14 @@ class LiongardAPI():
         returns: (int)
         '''
 
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/tasks/count"
+        url = f"{self.base_url}/api/v1/tasks/count"
 
-        alert_req = requests.get(url, headers=self.headers)
-
-        data = alert_req.text
+        data = self.get_json(url, self.headers)
 
         return data
 
 
-    def get_alerts(self, file="", json=""):
+    def get_alerts(self, file="", json="", fields=None):
         '''
         returns a list of alerts that you can loop through to grab key info pertaining
         to each individual alert
@@ -626,9 +966,9 @@ class LiongardAPI():
             ex: "output"
         '''
 
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/tasks"
+        url = f"{self.base_url}/api/v1/tasks"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         data = LiongardAPI.data_checker(data)
 
@@ -638,22 +978,22 @@ class LiongardAPI():
         if file != "" and data != 0:
             output = open(f"{file}.txt", 'w')
             for item in data:
-                output.write(f"Name: {item['Name']} : Environment: {item['Environment']['Name']} : ID: {item['ID']} : Status: {item['Status']['Name']}\n")
+                output.write(f"Name: {lookup(item, 'Name')} : Environment: {lookup(item, 'Environment.Name')} : ID: {lookup(item, 'ID')} : Status: {lookup(item, 'Status.Name')}\n")
                 
 
         return data
 
     
-    def get_single_alert(self, TaskID, json=""):
+    def get_single_alert(self, TaskID, json="", fields=None):
         '''
         Grabs a single alert based on the TaskID passed through
 
         If an empty list is returned the TaskID is invalid, please grab a list of the alerts 
         and find a valid one. Liongards API does not provide error messaging for this endpoint
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/tasks/{TaskID}"
+        url = f"{self.base_url}/api/v1/tasks/{TaskID}"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         LiongardAPI.dump_json(data, json)
 
@@ -687,38 +1027,44 @@ class LiongardAPI():
         Grabs the count of total detections in your Liongard instance and returns it as
         an integer
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/detections/count"
+        url = f"{self.base_url}/api/v1/detections/count"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers)
 
         return data
 
 
-    def get_detections(self, file="", json=""):
+    def get_detections(self, file="", json="", lazy=False, fields=None):
         '''
         Grabs a list of all the detections that have occurred within your Liongard instance
+
+        lazy ---> True (or a number of bytes) to get back a spill.SpillList instead of a list,
+            it indexes and iterates the same way but rows past the memory limit are kept on disk
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/detections"
+        url = f"{self.base_url}/api/v1/detections"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        if lazy:
+            data = self.get_json_lazy(url, self.headers, lazy, fields)
+        else:
+            data = self.get_json(url, self.headers, fields)
 
         LiongardAPI.dump_json(data, json)
 
         if file != "":
             output = open(f"{file}.txt", 'w')
             for detection in data:
-                output.write(f"Name: {detection['Name']} : DetectionID: {detection['ID']} : Environment: {detection['Environment']['Name']} : System: {detection['System']['Name']}\n")
+                output.write(f"Name: {lookup(detection, 'Name')} : DetectionID: {lookup(detection, 'ID')} : Environment: {lookup(detection, 'Environment.Name')} : System: {lookup(detection, 'System.Name')}\n")
 
         return data
 
 
-    def get_single_detection(self, DetectionID, json=""):
+    def get_single_detection(self, DetectionID, json="", fields=None):
         '''
         Grabs a specific detection based off of the ID you pass through in the parameter set
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/detections/{DetectionID}"
+        url = f"{self.base_url}/api/v1/detections/{DetectionID}"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         LiongardAPI.dump_json(data, json)
 
@@ -729,7 +1075,7 @@ class LiongardAPI():
         return data
 
 
-    def get_detections_by_inspectorID(self, inspectorID, json=""):
+    def get_detections_by_inspectorID(self, inspectorID, json="", fields=None):
         '''
         Grabs all detections for a specific inspector type
 
@@ -737,12 +1083,15 @@ class LiongardAPI():
                 call the method get_inspectors()
         '''
 
-        data = LiongardAPI.get_detections(self)
+        # the inspector has to be kept until the filtering below is done
+        shape = compile_fields(fields)
+        keep = fields and ([fields] if isinstance(fields, str) else list(fields)) + ["Inspector.ID"]
+        data = LiongardAPI.get_detections(self, fields=keep)
 
         detections = []
         for detection in data:
             if detection['Inspector']['ID'] == inspectorID:
-                detections.append(detection)
+                detections.append(project(detection, shape))
         
 
         LiongardAPI.dump_json(detections, json)
@@ -750,7 +1099,7 @@ class LiongardAPI():
         return detections
 
 
-    def get_inspectors(self, file="", json=""):
+    def get_inspectors(self, file="", json="", fields=None):
         '''
         Grabs a list of available inspectors and all relative fields. Can be used in later methods
         for filtering the data and also seeing key info used for that inspector throughout the API
@@ -758,9 +1107,9 @@ class LiongardAPI():
         file ---> parameter to be used to specify name of output file to send the info to. 
             ex: test.get_inspectors(file="output")
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/inspectors"
+        url = f"{self.base_url}/api/v1/inspectors"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         if not data:
             print("Please check the info in your constructor: No data exists")
@@ -769,23 +1118,23 @@ class LiongardAPI():
         if file != "":
             output = open(f"{file}.txt", 'w')
             for item in data:
-                output.write(f"Name: {item['Name']} , InspectorID: {item['ID']} , Alias: {item['Alias']}\n")
+                output.write(f"Name: {lookup(item, 'Name')} , InspectorID: {lookup(item, 'ID')} , Alias: {lookup(item, 'Alias')}\n")
 
         LiongardAPI.dump_json(data, json)
 
         return data
 
 
-    def get_inspector_versions(self, inspectorID, json=""):
+    def get_inspector_versions(self, inspectorID, json="", fields=None):
         '''
         grabs a list of inspector versions and their ID based off of the inspectorID
         passed through in the parameters
 
         required to be able to post new metrics using the API
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/inspector/{inspectorID}/versions"
+        url = f"{self.base_url}/api/v1/inspector/{inspectorID}/versions"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         if not data:
             print("Info wrong: please check the inspectorID passed to the method")
@@ -802,14 +1151,14 @@ class LiongardAPI():
 
         returns --> integer
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/agents/count"
+        url = f"{self.base_url}/api/v1/agents/count"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers)
 
         return data
 
 
-    def get_agents(self, file="", json=""):
+    def get_agents(self, file="", json="", fields=None):
         '''
         Grabs a list of all the agents in the Liongard instance
 
@@ -818,10 +1167,10 @@ class LiongardAPI():
         file ---> use this to display key agent info into a file to have each
             agent ID/UID easily viewable. 
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/agents"
+        url = f"{self.base_url}/api/v1/agents"
 
     
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         if not data:
             print("No data exists, please check information in constructor")
@@ -830,21 +1179,19 @@ class LiongardAPI():
         if file != "":
             output = open(f"{file}.txt", 'w')
             for item in data:
-                output.write(f"Agent name: {item['Name']}, Agent ID: {item['ID']}, UID: {item['UID']}\n")
+                output.write(f"Agent name: {lookup(item, 'Name')}, Agent ID: {lookup(item, 'ID')}, UID: {lookup(item, 'UID')}\n")
 
         LiongardAPI.dump_json(data, json)
 
         return data
 
-    def get_single_agent(self, agentID, json=""):
+    def get_single_agent(self, agentID, json="", fields=None):
         '''
         grabs a single agent based off of the agentID passed through
 
         returns --> json parceable object
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/agents/{agentID}"
-
-        data = LiongardAPI.get_json(url, self.headers)
+        ok, status, data = self.agent_call("GET", agentID, fields=fields)
 
         if not data:
             print("Agent does not exist: try another ID")
@@ -863,11 +1210,9 @@ class LiongardAPI():
         will return failed to purge agents queue if the agent does not have
         any jobs 
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/agents/{agentID}/flush"
-
-        req = requests.post(url, headers=self.headers)
+        ok, status, text = self.agent_call("POST", agentID, "/flush", parse=False)
 
-        return req.text
+        return text
     
 
     def delete_agent(self, agentID):
@@ -876,11 +1221,33 @@ class LiongardAPI():
 
         Warning: Deleted agents can not be recovered 
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/agents/{agentID}"
+        ok, status, text = self.agent_call("DELETE", agentID, parse=False)
 
-        response = requests.delete(url, headers=self.headers)
+        return text
 
-        return response.text
+
+    def agent_call(self, method, agentID, action="", fields=None, parse=True):
+        '''
+        Helper function: one request to /api/v1/agents/{agentID}{action}, used by the agent methods
+        above and fleet.AgentFleet
+
+        fields ---> optional projection of the parsed body, see get_json
+        parse ---> False to get the body back as text
+
+        returns: (ok, status code, body), body is the parsed JSON or the text when it is not JSON
+        '''
+        url = f"{self.base_url}/api/v1/agents/{agentID}{action}"
+        response = self.request(method, url, headers=self.headers)
+
+        if not parse:
+            return response.ok, response.status_code, response.text
+
+        try:
+            body = project(json.loads(response.text), compile_fields(fields))
+        except ValueError:
+            body = response.text
+
+        return response.ok, response.status_code, body
 
     '''
     NOTE implement updating agents
@@ -892,14 +1259,14 @@ class LiongardAPI():
 
         returns --> (int) number of users
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/users/count"
+        url = f"{self.base_url}/api/v1/users/count"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers)
 
         return data
 
 
-    def get_users(self, file="", json=""):
+    def get_users(self, file="", json="", fields=None):
         '''
         Grabs a list of users from the Liongard instance
         
@@ -908,9 +1275,9 @@ class LiongardAPI():
 
         returns ---> (list) users
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/users"
+        url = f"{self.base_url}/api/v1/users"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         if not data:
             print("Please check constructor info and ensure the keys have been properly typed")
@@ -919,22 +1286,22 @@ class LiongardAPI():
         if file != "":
             output = open(f"{file}.txt", 'w')
             for item in data:
-                output.write(f"Name: {item['FirstName']} {item['LastName']}, UserID: {item['ID']}\n")
+                output.write(f"Name: {lookup(item, 'FirstName')} {lookup(item, 'LastName')}, UserID: {lookup(item, 'ID')}\n")
 
         LiongardAPI.dump_json(data, json)
 
         return data
 
 
-    def get_single_user(self, UserID, json=""):
+    def get_single_user(self, UserID, json="", fields=None):
         '''
         Grabs a single user specified by the UserID passed through in the params
 
         returns a JSON object pertaining to that user
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/users/{UserID}"
+        url = f"{self.base_url}/api/v1/users/{UserID}"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         if not data:
             print("error: no data was returned (check constructor)")
@@ -949,14 +1316,14 @@ class LiongardAPI():
     #def create_user(self, )
 
 
-    def get_groups(self, json=""):
+    def get_groups(self, json="", fields=None):
         '''
         Grabs a list of all the groups in the Liongard instance 
 
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/groups"
+        url = f"{self.base_url}/api/v1/groups"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         if not data:
             print("error: no data returned (check constructor details)")
@@ -974,9 +1341,9 @@ class LiongardAPI():
         returns: <int>
         '''
 
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/launchpoints/count"
+        url = f"{self.base_url}/api/v1/launchpoints/count"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers)
 
         data = LiongardAPI.data_checker(data)
 
@@ -987,7 +1354,7 @@ class LiongardAPI():
         return data
 
     
-    def get_launchpoints(self, file="", json=""):
+    def get_launchpoints(self, file="", json="", fields=None):
         '''
         Grabs all of the launchpoints and returns them as a list of dictionaries
         see: https://docs.liongard.com/reference/getlaunchpoints for more info.
@@ -995,9 +1362,9 @@ class LiongardAPI():
         returns: <list>
 
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/launchpoints"
+        url = f"{self.base_url}/api/v1/launchpoints"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         data = LiongardAPI.data_checker(data)
 
@@ -1007,20 +1374,20 @@ class LiongardAPI():
         if file != "":
             output = open(f"{file}.txt", 'w')
             for launchpoint in data:
-                output.write(f"Name: {launchpoint['Alias']}, ID: {launchpoint['ID']}, Inspector Type: {launchpoint['Inspector']['Name']}\n")
+                output.write(f"Name: {lookup(launchpoint, 'Alias')}, ID: {lookup(launchpoint, 'ID')}, Inspector Type: {lookup(launchpoint, 'Inspector.Name')}\n")
 
         LiongardAPI.dump_json(data, json)
 
         return data
 
     
-    def get_single_launchpoint(self, LaunchpointID, json=""):
+    def get_single_launchpoint(self, LaunchpointID, json="", fields=None):
         '''
         Grabs a single launchpoint by their LaunchpointID 
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/launchpoints/{LaunchpointID}"
+        url = f"{self.base_url}/api/v1/launchpoints/{LaunchpointID}"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         data = LiongardAPI.data_checker(data)
 
@@ -1034,15 +1401,16 @@ class LiongardAPI():
             
     #NOTE implement adding, deleting, and editing launchpoints
 
-    def get_single_launchpoint_log(self, launchpointID, timelineID, json=""):
+    def get_single_launchpoint_log(self, launchpointID, timelineID, json="", fields=None):
         '''
         built to grab a specific log for any launchpoint at any timeline id
 
+        fields ---> optional fields to keep when the log is a list of records, see get_json
 
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/logs?launchpoint={launchpointID}&timeline={timelineID}"
+        url = f"{self.base_url}/api/v1/logs?launchpoint={launchpointID}&timeline={timelineID}"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         data = LiongardAPI.data_checker(data)
 
@@ -1053,7 +1421,161 @@ class LiongardAPI():
 
         return data
 
-    
+
+    def stream_launchpoint_log(self, launchpointID, timelineID, match=None, skip=0):
+        '''
+        description:
+            same log as get_single_launchpoint_log, but read off the wire a chunk at a time and
+            yielded one entry at a time so a huge log is never held in memory all at once, that
+            goes for a log sent as an array or as the first array inside of an object
+            ({"Data": [...]}), a log sent as one big string is still read whole and split in to lines
+
+        match ---> optional filter, either a regex string (searched for in each entry, dict entries
+            are searched as JSON) or a callable taking the entry and returning True to keep it
+        skip ---> number of entries at the start of the log to pass over, used by tail_launchpoint_log
+
+        returns:
+            generator of log entries
+
+        usage:
+            for entry in test.stream_launchpoint_log(1234, 98765, match="(?i)error|denied"):
+                print(entry)
+        '''
+        url = f"{self.base_url}/api/v1/logs?launchpoint={launchpointID}&timeline={timelineID}"
+        keep = LiongardAPI.log_filter(match)
+
+        response = self.request("GET", url, headers=self.headers, stream=True)
+
+        try:
+            for kind, value in iter_json_array(response.iter_content(STREAM_CHUNK), nested=True):
+                entries = [value] if kind == "item" else LiongardAPI.log_entries(value)
+
+                for entry in entries:
+                    if skip:
+                        skip -= 1
+                        continue
+
+                    if keep(entry):
+                        yield entry
+        finally:
+            response.close()
+
+
+    def tail_launchpoint_log(self, launchpointID, timelineID, match=None, interval=5, idle=120):
+        '''
+        description:
+            follows the log of an inspection that is still running, yielding entries as they show up,
+            like tail -f. The log is re-read every interval seconds and only the entries past the ones
+            already seen are yielded, nothing from earlier reads is kept around
+
+            the logs endpoint has no way to start part way in, so every read downloads and parses
+            the whole log again and following a log that grows to n bytes costs about
+            n * (reads made) bytes in total, raise interval when following a big log
+
+        match ---> same as stream_launchpoint_log
+        interval ---> seconds between reads
+        idle ---> stop after this many seconds go by without a new entry, None follows until the
+            generator is closed (or the deadline it is running in runs out)
+
+        returns:
+            generator of log entries
+        '''
+        seen = 0
+        last_new = time.monotonic()
+        keep = LiongardAPI.log_filter(match)
+
+        while True:
+            count = seen
+
+            # the filter is applied here rather than in the stream so the position in the log stays exact
+            for entry in self.stream_launchpoint_log(launchpointID, timelineID, skip=seen):
+                count += 1
+                if keep(entry):
+                    yield entry
+
+            if count > seen:
+                seen = count
+                last_new = time.monotonic()
+            elif idle is not None and time.monotonic() - last_new >= idle:
+                return
+
+            deadline = current_deadline()
+            if deadline is not None:
+                deadline.check()
+
+            time.sleep(interval)
+
+
+    def save_launchpoint_log(self, launchpointID, timelineID, file, match=None, follow=False, interval=5, idle=120):
+        '''
+        description:
+            streams a launchpoint log straight in to a gzip file (file.log.gz), one entry per line,
+            strings are written as they are and anything else as JSON
+
+        match ---> same as stream_launchpoint_log
+        follow ---> set to True to keep following a running inspection, see tail_launchpoint_log
+
+        returns: <int> number of entries written
+        '''
+        if follow:
+            entries = self.tail_launchpoint_log(launchpointID, timelineID, match, interval, idle)
+        else:
+            entries = self.stream_launchpoint_log(launchpointID, timelineID, match)
+
+        written = 0
+
+        with gzip.open(f"{file}.log.gz", 'wt', encoding="utf-8") as writer:
+            for entry in entries:
+                writer.write(LiongardAPI.log_line(entry) + "\n")
+                written += 1
+
+        return written
+
+
+    @classmethod
+    def log_entries(self, value):
+        '''
+        Helper function: entries out of a log response that was not a plain JSON array,
+        the first list found in an object or the lines of a string
+        '''
+        if isinstance(value, str):
+            return value.splitlines()
+
+        if isinstance(value, dict):
+            for inner in value.values():
+                if isinstance(inner, list):
+                    return inner
+
+        return [value]
+
+
+    @classmethod
+    def log_line(self, entry):
+        '''
+        Helper function: a log entry as a single line of text
+        '''
+        if isinstance(entry, str):
+            return entry
+
+        return json.dumps(entry, default=str)
+
+
+    @classmethod
+    def log_filter(self, match):
+        '''
+        Helper function: turns the match argument of the log readers in to a callable
+        '''
+        if match is None:
+            return lambda entry: True
+
+        if callable(match):
+            return match
+
+        pattern = re.compile(match)
+
+        return lambda entry: pattern.search(LiongardAPI.log_line(entry)) is not None
+
+
     def run_single_launchpoint(self, launchpointID):
         '''
         Simply pass the ID of the launchpoint you want to run and this function will go and force run it
@@ -1061,9 +1583,9 @@ class LiongardAPI():
 
           returns a callback confirming the ID that ran
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/launchpoints/{launchpointID}/run"
+        url = f"{self.base_url}/api/v1/launchpoints/{launchpointID}/run"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers)
 
         data = LiongardAPI.data_checker(data)
 
@@ -1082,11 +1604,11 @@ class LiongardAPI():
 
         returns:  a list of all the ones that ran, and all the ones that errored
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/launchpoints/run"
+        url = f"{self.base_url}/api/v1/launchpoints/run"
 
         payload = {"LaunchPoints": launchpointIDs}
 
-        response = requests.post(url, json=payload, headers=self.headers)
+        response = self.request("POST", url, json=payload, headers=self.headers)
 
         return response.text
 
@@ -1098,9 +1620,9 @@ class LiongardAPI():
 
         returns: <int>
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/timeline/count"
+        url = f"{self.base_url}/api/v1/timeline/count"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers)
 
         data = LiongardAPI.data_checker(data)
 
@@ -1109,17 +1631,23 @@ class LiongardAPI():
 
         return data
 
-    def get_timelines(self, file="", json=""):
+    def get_timelines(self, file="", json="", lazy=False, fields=None):
         '''
         description:
             grabs a list of all the timeline entries in your liongard instance
 
+        lazy ---> True (or a number of bytes) to get back a spill.SpillList instead of a list,
+            see get_detections
+
         returns:
             list of all timelines
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/timeline"
+        url = f"{self.base_url}/api/v1/timeline"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        if lazy:
+            data = self.get_json_lazy(url, self.headers, lazy, fields)
+        else:
+            data = self.get_json(url, self.headers, fields)
 
         data = LiongardAPI.data_checker(data)
 
@@ -1129,14 +1657,14 @@ class LiongardAPI():
         if file != "":
             output = open(f"{file}.txt", 'w')
             for timeline in data:
-                output.write(f"ID: {timeline['ID']}, Launchpoint: {timeline['Launchpoint']['Alias']}, Change Detections: {timeline['ChangeDetections']}\n")
+                output.write(f"ID: {lookup(timeline, 'ID')}, Launchpoint: {lookup(timeline, 'Launchpoint.Alias')}, Change Detections: {lookup(timeline, 'ChangeDetections')}\n")
 
         LiongardAPI.dump_json(data, json)
 
         return data
 
 
-    def get_single_timeline(self, timelineID):
+    def get_single_timeline(self, timelineID, fields=None):
         '''
         description:
             grabs a single timeline based on the TimelineID you pass through
@@ -1144,9 +1672,9 @@ class LiongardAPI():
         returns:
             single timeline object
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/timeline/{timelineID}"
+        url = f"{self.base_url}/api/v1/timeline/{timelineID}"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         data = LiongardAPI.data_checker(data)
 
@@ -1155,14 +1683,14 @@ class LiongardAPI():
 
         return data
 
-    def get_timeline_detail(self, timelineID):
+    def get_timeline_detail(self, timelineID, fields=None):
         '''
         description:
             grabs the details of the timelines and returns them
         '''
-        url = f"https://{self.instance_url}.app.liongard.com/api/v1/timeline/{timelineID}/detail"
+        url = f"{self.base_url}/api/v1/timeline/{timelineID}/detail"
 
-        data = LiongardAPI.get_json(url, self.headers)
+        data = self.get_json(url, self.headers, fields)
 
         data = LiongardAPI.data_checker(data)
 
@@ -1172,4 +1700,71 @@ class LiongardAPI():
         return data
 
 
+    def iter_timeline_details(self, timelines=None, logs=True, workers=8, prefetch=32):
+        '''
+        description:
+            walks the timeline entries and yields each one with its detail (and launchpoint log)
+            already attached, the detail/log requests for the next entries are sent concurrently
+            while you work on the current one so you are not waiting on them one at a time
+
+        timelines ---> any iterable of timeline entries, defaults to get_timelines()
+        logs ---> set to False to skip grabbing the launchpoint log for every entry
+        workers ---> number of requests allowed in flight at once
+        prefetch ---> how far ahead of the entry you are on it is allowed to fetch, nothing past
+            that is requested until you ask for the next entry
+
+        returns:
+            generator of timeline entries, in the same order they came in, with the keys
+            'Detail' and 'Log' added on to each one
+
+        usage:
+            for timeline in test.iter_timeline_details():
+                print(timeline['ID'], timeline['Detail'])
+        '''
+        if timelines is None:
+            timelines = self.get_timelines()
+
+            if timelines == 0:
+                return
+
+        window = deque()
+        pool = ThreadPoolExecutor(max_workers=workers)
+
+        try:
+            for timeline in timelines:
+                detail = submit(pool, self.get_timeline_detail, timeline['ID'])
+                log = None
+
+                if logs:
+                    launchpointID = timeline['Launchpoint']['ID']
+                    log = submit(pool, self.get_single_launchpoint_log, launchpointID, timeline['ID'])
+
+                window.append((timeline, detail, log))
+
+                if len(window) >= prefetch:
+                    yield LiongardAPI.enrich_timeline(*window.popleft())
+
+            while window:
+                yield LiongardAPI.enrich_timeline(*window.popleft())
+        finally:
+            for _, detail, log in window:
+                detail.cancel()
+                if log is not None:
+                    log.cancel()
+
+            pool.shutdown(wait=False)
+
+
+    @classmethod
+    def enrich_timeline(self, timeline, detail, log):
+        '''
+        Helper function: waits on the prefetched detail/log for a timeline entry and attaches them
+        '''
+        enriched = dict(timeline)
+        enriched['Detail'] = detail.result()
+        enriched['Log'] = log.result() if log is not None else None
+
+        return enriched
+
+
 test = LiongardAPI("instance_url", "private_key", "public_key")
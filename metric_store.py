@@ -0,0 +1,364 @@
+'''
+Local time series store for the values returned by LiongardAPI.get_metric_data
+
+Every system x metric UUID pair gets its own fixed size ring buffer file that is memory
+mapped with NumPy. Appending writes one row, and queries only touch the part of the file
+they need, so history never has to be loaded whole. Dashboards can open the same directory
+with readonly=True while the poller keeps writing.
+
+Usage:
+    store = MetricStore("metrics", capacity=100000)
+    store.poll(test, [1234, 1235], "6f1c...-metric-uuid")      # run this on a schedule
+
+    reader = MetricStore("metrics", readonly=True)
+    reader.latest(1234, "6f1c...-metric-uuid")                  # ---> (datetime64, value)
+    reader.window(1234, "6f1c...-metric-uuid", "2022-08-01", "2022-08-08")
+    reader.downsample(1234, "6f1c...-metric-uuid", "2022-08-01", "2022-09-01", 86400)
+
+Note:
+    only one process should be writing to a directory at a time, any number can read
+'''
+
+import os
+import time
+import numpy as np
+
+
+ROW = np.dtype([('t', '<i8'), ('v', '<f8')])
+
+MAGIC = 0x4C474D5452494E47
+HEADER_SLOTS = 8
+HEADER_BYTES = HEADER_SLOTS * 8
+
+# header slots
+CAPACITY = 1
+SEQUENCE = 2
+COUNT = 3
+HEAD = 4
+
+
+def _seconds(when):
+    '''
+    Helper function: turns a datetime64, datetime, ISO string or epoch number in to epoch seconds
+    '''
+    if when is None or when == "":
+        return int(time.time())
+
+    if isinstance(when, (int, float, np.integer, np.floating)):
+        return int(when)
+
+    text = str(when)
+    if text.endswith("Z"):
+        text = text[:-1]
+
+    return int(np.datetime64(text, 's').astype(np.int64))
+
+
+class RingBuffer():
+    '''
+    Purpose:
+        one memory mapped ring buffer file of (epoch seconds, value) rows
+
+    The header holds a sequence number that is odd while a write is in progress, readers
+    retry if it was odd or changed while they were copying rows out.
+    '''
+
+    def __init__(self, path, capacity=100000, readonly=False):
+        self.path = path
+
+        if not os.path.exists(path):
+            if readonly:
+                raise FileNotFoundError(path)
+
+            with open(path, 'wb') as output:
+                output.truncate(HEADER_BYTES + capacity * ROW.itemsize)
+
+            header = np.memmap(path, dtype='<i8', mode='r+', shape=(HEADER_SLOTS,))
+            header[CAPACITY] = capacity
+            header[0] = MAGIC
+            header.flush()
+            del header
+
+        mode = 'r' if readonly else 'r+'
+
+        self.header = np.memmap(path, dtype='<i8', mode=mode, shape=(HEADER_SLOTS,))
+        if self.header[0] != MAGIC:
+            raise ValueError(f"{path} is not a metric ring buffer")
+
+        self.capacity = int(self.header[CAPACITY])
+        self.rows = np.memmap(path, dtype=ROW, mode=mode, offset=HEADER_BYTES, shape=(self.capacity,))
+
+
+    def append(self, seconds, value):
+        '''
+        writes one row, rows older than the newest row already stored are skipped and a row with
+        the same time as the newest one replaces its value instead of adding a row, so polling
+        a metric that has not updated does not push real history out of the ring
+
+        returns: True if a row was written or its value changed
+        '''
+        count = int(self.header[COUNT])
+        head = int(self.header[HEAD])
+        last = (head - 1) % self.capacity
+
+        if count and seconds < self.rows['t'][last]:
+            return False
+
+        if count and seconds == self.rows['t'][last]:
+            if self.rows['v'][last] == value or (np.isnan(self.rows['v'][last]) and np.isnan(value)):
+                return False
+
+            self.header[SEQUENCE] += 1
+            self.rows['v'][last] = value
+            self.header[SEQUENCE] += 1
+
+            return True
+
+        self.header[SEQUENCE] += 1
+        self.rows[head] = (seconds, value)
+        self.header[HEAD] = (head + 1) % self.capacity
+        self.header[COUNT] = min(count + 1, self.capacity)
+        self.header[SEQUENCE] += 1
+
+        return True
+
+
+    def flush(self):
+        self.rows.flush()
+        self.header.flush()
+
+
+    def _consistent(self, read):
+        '''
+        Helper function: runs read(count, head) until it did not overlap with a write
+        '''
+        while True:
+            before = int(self.header[SEQUENCE])
+            if before % 2:
+                time.sleep(0)
+                continue
+
+            result = read(int(self.header[COUNT]), int(self.header[HEAD]))
+
+            if int(self.header[SEQUENCE]) == before:
+                return result
+
+
+    def _segments(self, count, head):
+        '''
+        Helper function: the stored rows in time order as (at most) two views of the mapped file
+        '''
+        if count < self.capacity:
+            return [self.rows[:count]]
+
+        return [self.rows[head:], self.rows[:head]]
+
+
+    def latest(self):
+        '''
+        returns: (epoch seconds, value) of the newest row or None when empty
+        '''
+        def read(count, head):
+            if count == 0:
+                return None
+            row = self.rows[(head - 1) % self.capacity]
+            return int(row['t']), float(row['v'])
+
+        return self._consistent(read)
+
+
+    def window(self, start, end):
+        '''
+        returns: copy of the rows with start <= t < end (epoch seconds), found by binary search
+        '''
+        def read(count, head):
+            pieces = []
+            for segment in self._segments(count, head):
+                times = segment['t']
+                low = np.searchsorted(times, start, side='left')
+                high = np.searchsorted(times, end, side='left')
+                pieces.append(np.array(segment[low:high]))
+
+            return np.concatenate(pieces) if pieces else np.empty(0, dtype=ROW)
+
+        return self._consistent(read)
+
+
+class MetricStore():
+    '''
+    Purpose:
+        directory of ring buffers, one per system x metric UUID
+
+    List of Methods:
+        def append(self, systemID, metricUUID, value, when=None)
+        def append_results(self, results)
+        def poll(self, api, systemIDs, metricUUIDs)
+        def series(self)
+        def latest(self, systemID, metricUUID)
+        def window(self, systemID, metricUUID, start, end)
+        def downsample(self, systemID, metricUUID, start, end, bucket_seconds, how="mean")
+    '''
+
+    def __init__(self, directory="metrics", capacity=100000, readonly=False):
+        self.directory = directory
+        self.capacity = capacity
+        self.readonly = readonly
+        self.buffers = {}
+
+        if not readonly:
+            os.makedirs(directory, exist_ok=True)
+
+
+    def _buffer(self, systemID, metricUUID):
+        '''
+        Helper function: opens (and if writing, creates) the ring buffer for a series
+        '''
+        key = (str(systemID), str(metricUUID))
+
+        if key not in self.buffers:
+            path = os.path.join(self.directory, f"{key[0]}_{key[1]}.ring")
+            self.buffers[key] = RingBuffer(path, self.capacity, self.readonly)
+
+        return self.buffers[key]
+
+
+    def append(self, systemID, metricUUID, value, when=None):
+        '''
+        adds a single value, when defaults to now
+
+        returns: True if it was written, False if it was older than what is stored, repeated the
+            newest value at the same time or was not a number
+        '''
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return False
+
+        return self._buffer(systemID, metricUUID).append(_seconds(when), value)
+
+
+    def append_results(self, results):
+        '''
+        description:
+            appends everything in a get_metric_data response, nested 'Metrics' lists are
+            flattened and values that are not numbers (text metrics) are skipped
+
+        returns: number of values written
+        '''
+        if isinstance(results, dict):
+            results = results.get('Data', [results])
+
+        written = 0
+        touched = set()
+
+        for item in results or []:
+            if isinstance(item.get('Metrics'), list):
+                rows = [dict(metric, SystemID=metric.get('SystemID', item.get('SystemID'))) for metric in item['Metrics']]
+            else:
+                rows = [item]
+
+            for row in rows:
+                uuid = row.get('UUID', row.get('MetricUUID', row.get('uuid')))
+                when = row.get('Date', row.get('UpdatedOn', row.get('CreatedOn')))
+
+                if row.get('SystemID') is None or uuid is None:
+                    continue
+
+                if self.append(row['SystemID'], uuid, row.get('Value'), when):
+                    written += 1
+                    touched.add((str(row['SystemID']), str(uuid)))
+
+        for key in touched:
+            self.buffers[key].flush()
+
+        return written
+
+
+    def poll(self, api, systemIDs, metricUUIDs):
+        '''
+        Grabs the current metric values through get_metric_data, 10 systems at a time
+        since that is all the endpoint takes, and appends them
+
+        returns: number of values written
+        '''
+        if type(systemIDs) != list:
+            systemIDs = [systemIDs]
+
+        written = 0
+        for start in range(0, len(systemIDs), 10):
+            results = api.get_metric_data(systemIDs[start:start + 10], metricUUIDs)
+
+            if results is False or results == 0:
+                continue
+
+            written += self.append_results(results)
+
+        return written
+
+
+    def series(self):
+        '''
+        returns: list of (systemID, metricUUID) pairs stored in the directory
+        '''
+        pairs = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".ring"):
+                systemID, _, metricUUID = name[:-5].partition("_")
+                pairs.append((systemID, metricUUID))
+
+        return pairs
+
+
+    def latest(self, systemID, metricUUID):
+        '''
+        returns: (datetime64, value) of the newest value or None
+        '''
+        row = self._buffer(systemID, metricUUID).latest()
+
+        if row is None:
+            return None
+
+        return np.datetime64(row[0], 's'), row[1]
+
+
+    def window(self, systemID, metricUUID, start, end):
+        '''
+        returns: (times, values) arrays for start <= time < end
+        '''
+        rows = self._buffer(systemID, metricUUID).window(_seconds(start), _seconds(end))
+
+        return rows['t'].astype('datetime64[s]'), rows['v']
+
+
+    def downsample(self, systemID, metricUUID, start, end, bucket_seconds, how="mean"):
+        '''
+        description:
+            splits start ---> end in to buckets of bucket_seconds and reduces each one,
+            how is one of "mean", "min", "max", "last" or "count", empty buckets are left out
+
+        returns: (bucket start times, values)
+        '''
+        begin = _seconds(start)
+        rows = self._buffer(systemID, metricUUID).window(begin, _seconds(end))
+
+        index = (rows['t'] - begin) // bucket_seconds
+        buckets, inverse = np.unique(index, return_inverse=True)
+        counts = np.bincount(inverse, minlength=len(buckets))
+
+        if how == "mean":
+            values = np.bincount(inverse, weights=rows['v'], minlength=len(buckets)) / np.maximum(counts, 1)
+        elif how == "count":
+            values = counts.astype(np.float64)
+        elif how in ("min", "max"):
+            values = np.full(len(buckets), np.inf if how == "min" else -np.inf)
+            reduce = np.minimum if how == "min" else np.maximum
+            reduce.at(values, inverse, rows['v'])
+        elif how == "last":
+            values = np.empty(len(buckets))
+            values[inverse] = rows['v']
+        else:
+            raise ValueError(f"unknown downsample method: {how}")
+
+        times = (begin + buckets * bucket_seconds).astype('datetime64[s]')
+
+        return times, values
@@ -0,0 +1,266 @@
+'''
+Local SQLite mirror of a Liongard instance for ad-hoc queries
+
+InstanceMirror pulls every entity endpoint into one table per entity. Each table gets a column
+for its ID, a few common fields and the IDs of the records it points to (environment, system,
+inspector, launchpoint), all indexed. The full record is kept as JSON in a "raw" column for
+anything else (SQLite's json_extract works on it). Each table is replaced in one transaction,
+in large batches, and stays readable with its old rows until the refresh commits. Detections and
+timelines, the big ones, are pulled in lazy mode so rows past the memory limit wait on disk
+(see spill.py), the other lists are pulled whole before they are inserted.
+
+Usage:
+    mirror = InstanceMirror(test, "acme")           # acme.db in the current directory
+    mirror.refresh()                                # every table
+    mirror.refresh("detections", "launchpoints")    # just these
+
+    mirror.query("""
+        SELECT e.name, COUNT(*) AS detections
+        FROM detections d
+        JOIN environments e ON e.id = d.environment_id
+        JOIN launchpoints l ON l.id = d.launchpoint_id
+        WHERE d.inspector_id = ? AND l.enabled = 0
+        GROUP BY e.name ORDER BY detections DESC
+    """, (42,))
+
+Command line:
+    python mirror.py us9 --file acme                            # keys from LIONGARD_PUBLIC_KEY/LIONGARD_PRIVATE_KEY
+    python mirror.py us9 --file acme --tables detections agents
+    python mirror.py us9 --file acme --no-refresh --query "SELECT COUNT(*) AS n FROM agents"
+'''
+
+import os
+import json
+import time
+import sqlite3
+import argparse
+
+from jsonstream import lookup
+
+# table ---> list method, extra arguments for it and {column: candidate paths in the record}
+TABLES = {
+    "environments": {
+        "method": "get_environments", "kwargs": {},
+        "columns": {"name": ["Name"], "parent": ["Parent"], "tier": ["Tier"], "short_name": ["ShortName"]},
+    },
+    "systems": {
+        "method": "get_systems", "kwargs": {},
+        "columns": {"name": ["Name"], "environment_id": ["Environment.ID", "EnvironmentID"],
+                    "inspector_id": ["Inspector.ID", "InspectorID"]},
+    },
+    "inspectors": {
+        "method": "get_inspectors", "kwargs": {},
+        "columns": {"name": ["Name"], "alias": ["Alias"]},
+    },
+    "launchpoints": {
+        "method": "get_launchpoints", "kwargs": {},
+        "columns": {"name": ["Alias", "Name"], "enabled": ["Enabled"], "status": ["Status"],
+                    "environment_id": ["Environment.ID", "EnvironmentID"], "system_id": ["System.ID", "SystemID"],
+                    "inspector_id": ["Inspector.ID", "InspectorID"], "agent_id": ["Agent.ID", "AgentID"]},
+    },
+    "agents": {
+        "method": "get_agents", "kwargs": {},
+        "columns": {"name": ["Name"], "uid": ["UID"], "status": ["Status"],
+                    "environment_id": ["Environment.ID", "EnvironmentID"]},
+    },
+    "detections": {
+        "method": "get_detections", "kwargs": {"lazy": True},
+        "columns": {"name": ["Name"], "environment_id": ["Environment.ID", "EnvironmentID"],
+                    "system_id": ["System.ID", "SystemID"], "inspector_id": ["Inspector.ID", "InspectorID"],
+                    "launchpoint_id": ["Launchpoint.ID", "LaunchpointID"]},
+    },
+    "alerts": {
+        "method": "get_alerts", "kwargs": {},
+        "columns": {"name": ["Name"], "status": ["Status.Name", "Status"],
+                    "environment_id": ["Environment.ID", "EnvironmentID"], "system_id": ["System.ID", "SystemID"]},
+    },
+    "users": {
+        "method": "get_users", "kwargs": {},
+        "columns": {"first_name": ["FirstName"], "last_name": ["LastName"], "email": ["Email"]},
+    },
+    "timelines": {
+        "method": "get_timelines", "kwargs": {"lazy": True},
+        "columns": {"launchpoint_id": ["Launchpoint.ID", "LaunchpointID"], "change_detections": ["ChangeDetections"],
+                    "status": ["Status"]},
+    },
+}
+
+# rows inserted per executemany call
+BATCH = 5000
+
+
+def _column(record, paths):
+    '''
+    Helper function: the first of paths (dotted) the record has a plain value at, else None
+    '''
+    for path in paths:
+        value = lookup(record, path)
+
+        if value is not None and not isinstance(value, (dict, list)):
+            return int(value) if isinstance(value, bool) else value
+
+    return None
+
+
+class InstanceMirror():
+    '''
+    Purpose:
+        keeps a normalized, indexed SQLite copy of the instance's entities
+
+    Usage:
+        file ---> name of the SQLite file, .db is added automatically
+
+    List of Methods:
+        def refresh(self, *tables)
+        def query(self, sql, params=())
+        def refreshed(self)
+        def close(self)
+    '''
+
+    def __init__(self, api, file="liongard_mirror"):
+        self.api = api
+        self.file = f"{file}.db"
+
+        self.connection = sqlite3.connect(self.file, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS mirror_meta (name TEXT PRIMARY KEY, refreshed REAL, rows INTEGER, seconds REAL)"
+            )
+
+            for table, spec in TABLES.items():
+                columns = "".join(f", {column}" for column in spec["columns"])
+                self.connection.execute(f"CREATE TABLE IF NOT EXISTS {table} (id PRIMARY KEY{columns}, raw TEXT NOT NULL)")
+
+                for column in spec["columns"]:
+                    if column.endswith("_id") or column in ("name", "status"):
+                        self.connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column})")
+
+
+    def refresh(self, *tables):
+        '''
+        description:
+            pulls tables (names from TABLES, every table when left blank) from the API again,
+            each table is replaced in one transaction
+
+        returns: {table: rows loaded}, a table whose pull failed is left as it was and reported as None,
+            one whose list came back empty is emptied and reported as 0
+        '''
+        tables = tables or tuple(TABLES)
+
+        unknown = set(tables) - set(TABLES)
+        if unknown:
+            raise ValueError(f"unknown tables {sorted(unknown)}, pick from {sorted(TABLES)}")
+
+        loaded = {}
+
+        with self.api.priority("batch"):
+            for table in tables:
+                try:
+                    loaded[table] = self._refresh(table)
+                except Exception as error:
+                    print(f"mirror: refreshing {table} failed ({error}), keeping the old rows")
+                    loaded[table] = None
+
+        return loaded
+
+
+    def _refresh(self, table):
+        '''
+        Helper function: reloads one table
+        '''
+        spec = TABLES[table]
+        start = time.monotonic()
+
+        # get_list raises when the pull fails, so an empty list really does empty the table
+        records = self.api.get_list(spec["method"], lazy=spec["kwargs"].get("lazy", False))
+
+        columns = list(spec["columns"])
+        insert = (
+            f"INSERT OR REPLACE INTO {table} (id, {', '.join(columns)}, raw) "
+            f"VALUES ({', '.join('?' * (len(columns) + 2))})"
+        )
+
+        rows = 0
+        batch = []
+
+        try:
+            # a failure part way through rolls the whole table back to its old rows
+            with self.connection:
+                self.connection.execute(f"DELETE FROM {table}")
+
+                for record in records:
+                    batch.append(
+                        [_column(record, ["ID"])] + [_column(record, spec["columns"][column]) for column in columns] + [json.dumps(record)]
+                    )
+
+                    if len(batch) >= BATCH:
+                        self.connection.executemany(insert, batch)
+                        rows += len(batch)
+                        batch = []
+
+                self.connection.executemany(insert, batch)
+                rows += len(batch)
+
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO mirror_meta (name, refreshed, rows, seconds) VALUES (?, ?, ?, ?)",
+                    (table, time.time(), rows, time.monotonic() - start)
+                )
+        finally:
+            if hasattr(records, "close"):
+                records.close()
+
+        return rows
+
+
+    def query(self, sql, params=()):
+        '''
+        runs sql against the mirror
+
+        returns: list of dictionaries, one per row
+        '''
+        return [dict(row) for row in self.connection.execute(sql, params)]
+
+
+    def refreshed(self):
+        '''
+        returns: {table: {"refreshed": unix time, "rows": ..., "seconds": ...}} for every table loaded so far
+        '''
+        return {
+            row["name"]: {"refreshed": row["refreshed"], "rows": row["rows"], "seconds": row["seconds"]}
+            for row in self.connection.execute("SELECT * FROM mirror_meta")
+        }
+
+
+    def close(self):
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    from main import LiongardAPI
+
+    parser = argparse.ArgumentParser(description="mirror a Liongard instance in to a local SQLite database")
+    parser.add_argument("instance_url", help="your instance, ex: us9")
+    parser.add_argument("--public-key", default=os.environ.get("LIONGARD_PUBLIC_KEY", ""))
+    parser.add_argument("--private-key", default=os.environ.get("LIONGARD_PRIVATE_KEY", ""))
+    parser.add_argument("--file", default="liongard_mirror", help="database name, .db is added")
+    parser.add_argument("--tables", nargs="*", default=[], help=f"tables to refresh, default all of: {' '.join(TABLES)}")
+    parser.add_argument("--no-refresh", action="store_true", help="only run --query against what is already there")
+    parser.add_argument("--query", default="", help="SQL to run after refreshing, rows are printed as JSON")
+    args = parser.parse_args()
+
+    api = LiongardAPI(args.instance_url, private_api_key=args.private_key, public_api_key=args.public_key)
+    mirror = InstanceMirror(api, args.file)
+
+    if not args.no_refresh:
+        for table, rows in mirror.refresh(*args.tables).items():
+            print(f"{table}: {'failed' if rows is None else f'{rows} rows'}")
+
+    if args.query:
+        for row in mirror.query(args.query):
+            print(json.dumps(row, default=str))
+
+    mirror.close()
@@ -0,0 +1,255 @@
+'''
+Picks between one big list call and many per-ID calls when fetching a set of entities
+
+Asking for 5 detections is cheapest with 5 calls to get_single_detection, asking for 5,000
+is cheapest with one call to get_detections and a filter. Where the line sits depends on how
+big the instance is and how fast each endpoint answers, so QueryPlanner estimates both
+strategies from the (cached) count endpoint and the response times and sizes seen so far,
+then runs the cheaper one.
+
+Usage:
+    planner = QueryPlanner(test)
+    detections = planner.fetch("detections", [101, 102, 103])      # ---> {101: {...}, 102: {...}, ...}
+    planner.fetch("detections", range(5000), explain=True)          # ---> the plan, nothing is fetched
+
+Estimates start from DEFAULTS and are replaced by what is actually measured as calls are made,
+both by the planner itself and by every other call going through the same LiongardAPI instance.
+'''
+
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from transport import endpoint_key, submit
+
+
+# entity ---> methods and paths used to fetch it
+ENTITIES = {
+    "environments": {
+        "list": "get_environments", "single": "get_single_environment", "count": "environment_count",
+        "list_path": "/api/v2/environments/", "single_path": "/api/v2/environments/{id}",
+    },
+    "systems": {
+        "list": "get_systems", "single": None, "count": "system_count",
+        "list_path": "/api/v1/systems", "single_path": None,
+    },
+    "alerts": {
+        "list": "get_alerts", "single": "get_single_alert", "count": "alert_count",
+        "list_path": "/api/v1/tasks", "single_path": "/api/v1/tasks/{id}",
+    },
+    "detections": {
+        "list": "get_detections", "single": "get_single_detection", "count": "detections_count",
+        "list_path": "/api/v1/detections", "single_path": "/api/v1/detections/{id}",
+    },
+    "agents": {
+        "list": "get_agents", "single": "get_single_agent", "count": "agent_count",
+        "list_path": "/api/v1/agents", "single_path": "/api/v1/agents/{id}",
+    },
+    "users": {
+        "list": "get_users", "single": "get_single_user", "count": "user_count",
+        "list_path": "/api/v1/users", "single_path": "/api/v1/users/{id}",
+    },
+    "launchpoints": {
+        "list": "get_launchpoints", "single": "get_single_launchpoint", "count": "get_launchpoints_count",
+        "list_path": "/api/v1/launchpoints", "single_path": "/api/v1/launchpoints/{id}",
+    },
+    "timelines": {
+        "list": "get_timelines", "single": "get_single_timeline", "count": "get_timeline_count",
+        "list_path": "/api/v1/timeline", "single_path": "/api/v1/timeline/{id}",
+    },
+}
+
+# starting guesses, replaced by measurements as soon as there are any
+DEFAULTS = {
+    "single_seconds": 0.3,          # one per-ID call
+    "list_overhead": 0.5,           # a list call with nothing in it
+    "record_seconds": 0.0005,       # each record a list call has to send and parse...
+    "record_bytes": 2048,           # ...when records are this big, scaled by the real size once known
+}
+
+
+class QueryPlanner():
+    '''
+    Purpose:
+        fetches entities by ID with whichever of the list or per-ID strategies is estimated to be faster
+
+    Usage:
+        workers ---> per-ID calls made at the same time
+        count_ttl ---> seconds a count is trusted before the count endpoint is asked again
+
+    List of Methods:
+        def plan(self, entity, ids)
+        def fetch(self, entity, ids, explain=False, fields=None)
+    '''
+
+    def __init__(self, api, workers=8, count_ttl=300):
+        self.api = api
+        self.workers = workers
+        self.count_ttl = count_ttl
+
+        self.counts = {}
+        self.measured = {}
+
+
+    def count(self, entity):
+        '''
+        Helper function: the entity's count, from the count endpoint at most once every count_ttl seconds
+
+        returns: the count, None when the count endpoint did not answer with one (those are not kept)
+        '''
+        cached = self.counts.get(entity)
+
+        if cached is not None and time.monotonic() - cached[1] < self.count_ttl:
+            return cached[0]
+
+        try:
+            count = getattr(self.api, ENTITIES[entity]["count"])()
+        except ValueError:
+            return None
+
+        # the count methods answer False/0/an error body instead of raising when the call fails
+        if not isinstance(count, int) or isinstance(count, bool) or count == 0:
+            return None
+
+        self.counts[entity] = (count, time.monotonic())
+
+        return count
+
+
+    def _observed(self, path):
+        '''
+        Helper function: (average seconds, average bytes) the LiongardAPI instance has seen for an endpoint
+        '''
+        key = endpoint_key("GET", f"{self.api.base_url}{path}")
+
+        return self.api.latency.average(key), self.api.latency.average_bytes(key)
+
+
+    def plan(self, entity, ids):
+        '''
+        description:
+            estimates both strategies for fetching ids of entity without fetching anything
+
+        returns: {"strategy": "list" | "per_id", "reason": ..., "estimates": {...}, "inputs": {...}}
+        '''
+        if entity not in ENTITIES:
+            raise ValueError(f"unknown entity '{entity}', pick one of {sorted(ENTITIES)}")
+
+        spec = ENTITIES[entity]
+        wanted = len(set(ids))
+        count = self.count(entity)
+
+        single_seconds, single_bytes = self._observed(spec["single_path"]) if spec["single_path"] else (None, None)
+        list_seconds, list_bytes = self._observed(spec["list_path"])
+
+        # the planner's own timings of whole strategies beat the per-request stats
+        single_seconds = self.measured.get((entity, "per_id"), single_seconds) or DEFAULTS["single_seconds"]
+
+        if (entity, "list") in self.measured:
+            seconds, measured_count = self.measured[(entity, "list")]
+            list_seconds = seconds * (count / measured_count if count and measured_count else 1)
+            list_source = "measured"
+        elif list_seconds is not None:
+            list_source = "measured"
+        else:
+            record_bytes = single_bytes or DEFAULTS["record_bytes"]
+            list_seconds = DEFAULTS["list_overhead"] + (count or 0) * DEFAULTS["record_seconds"] * record_bytes / DEFAULTS["record_bytes"]
+            list_source = "estimated from record size" if single_bytes else "default"
+
+        rounds = math.ceil(wanted / max(self.workers, 1))
+        per_id = rounds * single_seconds
+
+        rate = self.api.rate_limiter.rate
+        if rate:
+            per_id = max(per_id, wanted / rate)
+
+        estimates = {"list": list_seconds, "per_id": per_id if spec["single"] else float("inf")}
+        strategy = "per_id" if estimates["per_id"] < estimates["list"] else "list"
+
+        if not spec["single"]:
+            reason = f"{entity} has no single item endpoint"
+        elif strategy == "list":
+            reason = f"one list call (~{list_seconds:.2f}s, {list_source}) beats {wanted} per-ID calls in {rounds} rounds (~{per_id:.2f}s)"
+        else:
+            reason = f"{wanted} per-ID calls in {rounds} rounds (~{per_id:.2f}s) beat one list call of {count} records (~{list_seconds:.2f}s, {list_source})"
+
+        return {
+            "entity": entity,
+            "strategy": strategy,
+            "reason": reason,
+            "estimates": estimates,
+            "inputs": {
+                "ids": wanted,
+                "count": count,
+                "workers": self.workers,
+                "rate_limit": rate,
+                "single_seconds": single_seconds,
+                "single_bytes": single_bytes,
+                "list_seconds": list_seconds,
+                "list_bytes": list_bytes,
+            },
+        }
+
+
+    def fetch(self, entity, ids, explain=False, fields=None):
+        '''
+        description:
+            fetches every entity in ids with the cheaper strategy
+
+            explain ---> set to True to get the plan (see plan) back instead of fetching
+            fields ---> optional projection passed on to the getters, ID is always kept
+
+        returns: {ID: record} for the IDs that were found, in the order they were asked for
+        '''
+        ids = list(dict.fromkeys(ids))
+        plan = self.plan(entity, ids)
+
+        if explain:
+            return plan
+
+        if fields:
+            fields = ([fields] if isinstance(fields, str) else list(fields)) + ["ID"]
+
+        start = time.monotonic()
+
+        if plan["strategy"] == "list":
+            found = self._by_list(entity, ids, fields)
+        else:
+            found = self._by_id(entity, ids, fields)
+
+        elapsed = time.monotonic() - start
+
+        if plan["strategy"] == "list":
+            self.measured[(entity, "list")] = (elapsed, plan["inputs"]["count"])
+        elif ids:
+            self.measured[(entity, "per_id")] = elapsed / math.ceil(len(ids) / max(self.workers, 1))
+
+        return found
+
+
+    def _by_list(self, entity, ids, fields):
+        '''
+        Helper function: one list call, filtered down to ids
+        '''
+        records = getattr(self.api, ENTITIES[entity]["list"])(fields=fields)
+        by_ID = {str(record.get("ID")): record for record in records or []}
+
+        return {ID: by_ID[str(ID)] for ID in ids if str(ID) in by_ID}
+
+
+    def _by_id(self, entity, ids, fields):
+        '''
+        Helper function: one call per ID, workers at a time
+        '''
+        single = getattr(self.api, ENTITIES[entity]["single"])
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [(ID, submit(pool, single, ID, fields=fields)) for ID in ids]
+
+            found = {}
+            for ID, future in futures:
+                record = future.result()
+                if record:
+                    found[ID] = record
+
+        return found
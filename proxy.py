@@ -0,0 +1,235 @@
+'''
+Caching read-through proxy for the Liongard API
+
+Serves the same /api/v1 and /api/v2 paths LiongardAPI uses. GET responses are kept in a
+shared cache for a short time, and when several clients ask for the same thing at once only
+one request goes upstream while the rest wait on it. Writes (POST/PUT/DELETE) and launchpoint
+runs are always passed straight through and clear the cached entries for that resource.
+
+Usage:
+    python proxy.py us9 --port 8080 --ttl 60                  # only answers on this machine
+    python proxy.py us9 --host 0.0.0.0 --port 8080            # other machines too, anyone who can reach it can use it
+
+    # then in any script, nothing else changes
+    test = LiongardAPI("http://liongard-proxy:8080", "private_key", "public_key")
+
+Every cached response comes back with:
+    X-Cache        ---> HIT, MISS or SHARED (waited on another client's request)
+    Age            ---> seconds since it was fetched from Liongard
+    Cache-Control  ---> max-age with the seconds it has left
+'''
+
+import time
+import argparse
+import threading
+from collections import OrderedDict
+
+import requests
+from flask import Flask, Response, request
+
+
+# headers that only apply to a single hop and should not be copied across
+HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te",
+    "trailers", "transfer-encoding", "upgrade", "content-encoding", "content-length",
+}
+
+# response bodies kept in the cache at most, a few full detection or timeline lists can be
+# hundreds of megabytes each so the entry count alone does not bound memory
+MAX_BYTES = 256 * 2 ** 20
+
+
+class ResponseCache():
+    '''
+    Purpose:
+        thread safe LRU of upstream responses with request collapsing
+
+    Usage:
+        ttl ---> seconds a response stays fresh
+        ttls ---> optional {path prefix: seconds} overrides, ex: {"/api/v1/agents": 10}
+        max_entries ---> least recently used responses are dropped past this
+        max_bytes ---> ...or once the cached bodies add up to more than this, a single body bigger
+            than max_bytes is passed on without being cached
+    '''
+
+    def __init__(self, ttl=60, ttls=None, max_entries=2048, max_bytes=MAX_BYTES):
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.flights = {}
+        self.lock = threading.Lock()
+
+
+    def ttl_for(self, path):
+        '''
+        Helper function: the longest matching prefix in ttls wins, otherwise the default ttl
+        '''
+        matches = [prefix for prefix in self.ttls if path.startswith(prefix)]
+
+        if not matches:
+            return self.ttl
+
+        return self.ttls[max(matches, key=len)]
+
+
+    def get(self, key, path, fetch):
+        '''
+        description:
+            returns the cached entry for key while it is fresh, otherwise calls fetch(), if another
+            thread is already fetching key this waits for that result instead of fetching again
+
+        returns: (entry, state) where state is "HIT", "MISS" or "SHARED"
+            entry ---> {"status", "headers", "body", "fetched"}
+        '''
+        ttl = self.ttl_for(path)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry["fetched"] < ttl:
+                self.entries.move_to_end(key)
+                return entry, "HIT"
+
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = {"done": threading.Event(), "entry": None, "error": None}
+                self.flights[key] = flight
+
+        if not leader:
+            flight["done"].wait()
+            if flight["error"] is not None:
+                raise flight["error"]
+            return flight["entry"], "SHARED"
+
+        try:
+            entry = fetch()
+            flight["entry"] = entry
+
+            if entry["status"] == 200 and len(entry["body"]) <= self.max_bytes:
+                with self.lock:
+                    self._drop(key)
+                    self.entries[key] = entry
+                    self.bytes += len(entry["body"])
+                    while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                        self._drop(next(iter(self.entries)))
+
+            return entry, "MISS"
+        except Exception as error:
+            flight["error"] = error
+            raise
+        finally:
+            with self.lock:
+                self.flights.pop(key, None)
+            flight["done"].set()
+
+
+    def _drop(self, key):
+        '''
+        Helper function: removes key if it is cached, the lock has to be held
+        '''
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry["body"])
+
+
+    def invalidate(self, api_key, prefix):
+        '''
+        drops every cached entry for api_key whose path starts with prefix
+
+        returns: number of entries dropped
+        '''
+        with self.lock:
+            stale = [key for key in self.entries if key[0] == api_key and key[1].startswith(prefix)]
+            for key in stale:
+                self._drop(key)
+
+        return len(stale)
+
+
+def resource_prefix(path):
+    '''
+    Helper function: /api/v1/agents/12/flush ---> /api/v1/agents
+    '''
+    return "/".join(path.split("/")[:4])
+
+
+def create_app(instance_url, ttl=60, ttls=None, max_entries=2048, timeout=60, max_bytes=MAX_BYTES):
+    '''
+    description:
+        builds the Flask app, instance_url works the same way it does for LiongardAPI
+        ---> "us9" or a full URL
+
+    returns: Flask app, the cache is available as app.config["CACHE"]
+    '''
+    if instance_url.startswith("http://") or instance_url.startswith("https://"):
+        upstream = instance_url.rstrip("/")
+    else:
+        upstream = f"https://{instance_url}.app.liongard.com"
+
+    app = Flask(__name__)
+    cache = ResponseCache(ttl, ttls, max_entries, max_bytes)
+    session = requests.Session()
+    app.config["CACHE"] = cache
+
+
+    def forward(method, path, query, headers, body):
+        '''
+        Helper function: sends the request on to Liongard and packages what came back
+        '''
+        url = f"{upstream}{path}"
+        if query:
+            url = f"{url}?{query}"
+
+        response = session.request(method, url, headers=headers, data=body, timeout=timeout)
+        kept = {name: value for name, value in response.headers.items() if name.lower() not in HOP_HEADERS}
+
+        return {"status": response.status_code, "headers": kept, "body": response.content, "fetched": time.time()}
+
+
+    @app.route("/api/<path:rest>", methods=["GET", "POST", "PUT", "DELETE"])
+    def passthrough(rest):
+        path = f"/api/{rest}"
+        query = request.query_string.decode()
+        api_key = request.headers.get("X-ROAR-API-KEY", "")
+        headers = {name: value for name, value in request.headers.items() if name.lower() not in HOP_HEADERS and name.lower() != "host"}
+
+        # /run on a launchpoint is a GET but it kicks off an inspection, never cache or collapse it
+        if request.method != "GET" or path.endswith("/run"):
+            entry = forward(request.method, path, query, headers, request.get_data())
+
+            if 200 <= entry["status"] < 300:
+                cache.invalidate(api_key, resource_prefix(path))
+
+            return Response(entry["body"], status=entry["status"], headers=entry["headers"])
+
+        key = (api_key, f"{path}?{query}")
+        entry, state = cache.get(key, path, lambda: forward("GET", path, query, headers, None))
+
+        age = int(time.time() - entry["fetched"])
+        fresh = max(cache.ttl_for(path) - age, 0)
+
+        response = Response(entry["body"], status=entry["status"], headers=entry["headers"])
+        response.headers["X-Cache"] = state
+        response.headers["Age"] = str(age)
+        response.headers["Cache-Control"] = f"max-age={fresh}" if entry["status"] == 200 else "no-store"
+
+        return response
+
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="caching read-through proxy for the Liongard API")
+    parser.add_argument("instance_url", help="your instance, ex: us9")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on, 0.0.0.0 for every interface")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--ttl", type=int, default=60, help="seconds a GET response stays fresh")
+    parser.add_argument("--max-mb", type=int, default=MAX_BYTES // 2 ** 20, help="megabytes of response bodies to cache")
+    args = parser.parse_args()
+
+    create_app(args.instance_url, ttl=args.ttl, max_bytes=args.max_mb * 2 ** 20).run(host=args.host, port=args.port, threaded=True)
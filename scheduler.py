@@ -0,0 +1,275 @@
+'''
+Priority classes for the requests going through a LiongardAPI instance
+
+Every request waits for a slot from the instance's RequestScheduler before it goes out. There
+are only so many slots (pool_size by default). When requests are queued, the slots go out by
+weighted fair queuing: a class with weight 8 gets eight turns for every one turn of a class with
+weight 1. No class can hold more than its share of the slots, so a nightly sweep running as
+"batch" always leaves room for interactive lookups. When nothing else is waiting it still gets
+to use every slot it is allowed.
+
+Usage:
+    test = LiongardAPI("us9", private_key, public_key, pool_size=20)
+
+    with test.priority("batch"):                  # everything in here, on any thread the
+        detections = test.get_detections()        # fan-out helpers use, is scheduled as batch
+
+    test.get_single_agent(1234)                   # requests outside of a priority block are "interactive"
+    test.scheduler.stats()                        # ---> {"batch": {"in_flight": 15, "queued": 3012, ...}, ...}
+
+Classes are set with LiongardAPI(priorities={...}, default_priority=...), see PRIORITIES for the
+format, the default class is the one requests outside of a priority block run under.
+
+A streamed response (stream=True) keeps its slot until it is closed, so reading a big body
+still counts against its class's share.
+'''
+
+import time
+import weakref
+import itertools
+import threading
+import contextvars
+from collections import deque
+
+from transport import DeadlineExceeded, CANCEL_CHECK
+
+
+# class ---> weight (share of turns while queued) and share (fraction of the slots it may hold at once)
+PRIORITIES = {
+    "interactive": {"weight": 8, "share": 1.0},
+    "batch": {"weight": 1, "share": 0.75},
+}
+
+DEFAULT_PRIORITY = "interactive"
+
+CURRENT_PRIORITY = contextvars.ContextVar("liongard_priority", default=None)
+
+
+def current_priority():
+    '''
+    returns: the priority class the caller is running under, None outside of a priority block
+        (the scheduler's default class is used)
+    '''
+    return CURRENT_PRIORITY.get()
+
+
+class Priority():
+    '''
+    Purpose:
+        context manager that runs every request made inside of it under one priority class,
+        see LiongardAPI.priority
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.tokens = []
+
+
+    def __enter__(self):
+        self.tokens.append(CURRENT_PRIORITY.set(self.name))
+        return self
+
+
+    def __exit__(self, *exc):
+        CURRENT_PRIORITY.reset(self.tokens.pop())
+        return False
+
+
+class PriorityClass():
+    '''
+    Purpose:
+        queue and counters for one priority class
+    '''
+
+    def __init__(self, name, weight, limit):
+        self.name = name
+        self.weight = weight
+        self.limit = limit
+
+        self.queue = deque()
+        self.in_flight = 0
+        self.last_finish = 0.0
+
+        self.dispatched = 0
+        self.waited = 0.0
+
+
+class RequestScheduler():
+    '''
+    Purpose:
+        hands out request slots by weighted fair queuing with a concurrency limit per class
+
+    Usage:
+        capacity ---> requests allowed in flight at once across every class
+        priorities ---> {class: {"weight": ..., "share": ...}}, defaults to PRIORITIES
+        default ---> class for requests made outside of a priority block, has to be one of priorities
+
+    List of Methods:
+        def slot(self, priority=None, deadline=None)
+        def acquire(self, priority=None, deadline=None)
+        def release(self, priority)
+        def hold(self, response, priority)
+        def stats(self)
+    '''
+
+    def __init__(self, capacity=10, priorities=None, default=DEFAULT_PRIORITY):
+        self.capacity = capacity
+        self.classes = {
+            name: PriorityClass(name, settings["weight"], max(1, int(capacity * settings.get("share", 1.0))))
+            for name, settings in (priorities or PRIORITIES).items()
+        }
+
+        if default not in self.classes:
+            raise ValueError(f"default priority '{default}' is not one of {sorted(self.classes)}, pass default= to pick one")
+
+        self.default = default
+
+        self.in_flight = 0
+        self.virtual = 0.0
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+
+    def _class(self, priority):
+        if priority not in self.classes:
+            raise ValueError(f"unknown priority '{priority}', pick one of {sorted(self.classes)}")
+
+        return self.classes[priority]
+
+
+    def slot(self, priority=None, deadline=None):
+        '''
+        context manager around acquire/release:
+            with scheduler.slot("batch"):
+                ...send the request...
+        '''
+        return _Slot(self, priority or current_priority() or self.default, deadline)
+
+
+    def acquire(self, priority=None, deadline=None):
+        '''
+        description:
+            blocks until the request is given a slot
+
+            deadline ---> optional transport.Deadline, waiting stops (and the place in the queue
+                is given up) when it runs out or is cancelled
+
+        returns: the priority class name the slot was taken under, pass it to release
+        '''
+        priority = priority or current_priority() or self.default
+        queue = self._class(priority)
+
+        ticket = {"event": threading.Event(), "granted": False}
+
+        with self.lock:
+            # virtual finish time: the fewer turns a class is owed the further back it sits
+            finish = max(self.virtual, queue.last_finish) + 1.0 / queue.weight
+            queue.last_finish = finish
+            queue.queue.append((finish, next(self.counter), ticket))
+            self._dispatch()
+
+        start = time.monotonic()
+
+        while not ticket["event"].wait(None if deadline is None else min(CANCEL_CHECK, deadline.remaining())):
+            try:
+                deadline.check()
+            except DeadlineExceeded:
+                with self.lock:
+                    if not ticket["granted"]:
+                        queue.queue.remove(next(entry for entry in queue.queue if entry[2] is ticket))
+                        raise
+
+                self.release(priority)
+                raise
+
+        with self.lock:
+            queue.waited += time.monotonic() - start
+
+        return priority
+
+
+    def release(self, priority):
+        with self.lock:
+            self.in_flight -= 1
+            self.classes[priority].in_flight -= 1
+            self._dispatch()
+
+
+    def hold(self, response, priority):
+        '''
+        description:
+            hands a slot taken with acquire over to a streamed response, it is released when
+            response.close() is called (or the response is garbage collected without being closed)
+
+        returns: response
+        '''
+        release = weakref.finalize(response, self.release, priority)
+        close = response.close
+
+        def close_and_release():
+            try:
+                close()
+            finally:
+                release()
+
+        response.close = close_and_release
+
+        return response
+
+
+    def _dispatch(self):
+        '''
+        Helper function: hands free slots to the queued requests with the earliest virtual finish,
+        skipping classes at their limit, called with the lock held
+        '''
+        while self.in_flight < self.capacity:
+            ready = [queue for queue in self.classes.values() if queue.queue and queue.in_flight < queue.limit]
+
+            if not ready:
+                return
+
+            queue = min(ready, key=lambda candidate: candidate.queue[0][:2])
+            finish, _, ticket = queue.queue.popleft()
+
+            self.in_flight += 1
+            queue.in_flight += 1
+            queue.dispatched += 1
+            self.virtual = max(self.virtual, finish)
+
+            ticket["granted"] = True
+            ticket["event"].set()
+
+
+    def stats(self):
+        '''
+        returns: {class: {"in_flight", "queued", "limit", "weight", "dispatched", "average_wait"}}
+        '''
+        with self.lock:
+            return {
+                name: {
+                    "in_flight": queue.in_flight,
+                    "queued": len(queue.queue),
+                    "limit": queue.limit,
+                    "weight": queue.weight,
+                    "dispatched": queue.dispatched,
+                    "average_wait": queue.waited / queue.dispatched if queue.dispatched else 0.0,
+                }
+                for name, queue in self.classes.items()
+            }
+
+
+class _Slot():
+    def __init__(self, scheduler, priority, deadline):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.deadline = deadline
+
+
+    def __enter__(self):
+        self.scheduler.acquire(self.priority, self.deadline)
+        return self
+
+
+    def __exit__(self, *exc):
+        self.scheduler.release(self.priority)
+        return False
@@ -0,0 +1,253 @@
+'''
+List-like results that spill to disk once they get too big for memory
+
+A SpillList keeps rows in memory until they add up to about max_memory bytes of Python objects,
+every row after that goes to a temporary SQLite file and is paged back in when it is read.
+The size of a row is estimated from its JSON length (see RESIDENT_FACTOR), not measured.
+It supports len(), indexing (negative too), slicing and iteration like a list, so code written
+against the lists LiongardAPI returns keeps working.
+
+Usage:
+    detections = test.get_detections(lazy=True)          # ---> SpillList
+    len(detections), detections[0], detections[-1]
+    for detection in detections:                        # pages through the file, 1 page in memory
+        ...
+
+    rows = SpillList(max_memory=256 * 1024 * 1024)       # or build one yourself
+    rows.extend(huge_generator)
+
+Rows that were spilled are copies, changing one after reading it does not change what is stored.
+The temporary file is removed on close() or when the SpillList is garbage collected, a closed
+SpillList raises ValueError when it is used.
+'''
+
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+
+
+# default bytes of rows kept in memory before rows start spilling
+SPILL_MEMORY = 256 * 1024 * 1024
+
+# a parsed row takes about RESIDENT_FACTOR bytes per byte of its JSON plus ROW_OVERHEAD bytes,
+# measured with tracemalloc on detection records, full (~330 JSON bytes each) and cut down with
+# fields= (~50 bytes each)
+RESIDENT_FACTOR = 6
+ROW_OVERHEAD = 320
+
+
+class SpillList(Sequence):
+    '''
+    Purpose:
+        read-only sequence (plus append/extend) that holds the first rows in memory and the rest on disk
+
+    Usage:
+        rows ---> optional iterable to fill it with
+        max_memory ---> bytes of rows (estimated, see RESIDENT_FACTOR) kept in memory before spilling
+        page_size ---> rows read from or written to disk at a time
+        cached_pages ---> pages kept in memory for random access
+
+    List of Methods:
+        def append(self, row)
+        def extend(self, rows)
+        def spilled(self)
+        def close(self)
+    '''
+
+    def __init__(self, rows=(), max_memory=SPILL_MEMORY, page_size=1000, cached_pages=4):
+        self.max_memory = max_memory
+        self.page_size = page_size
+        self.cached_pages = cached_pages
+
+        self.memory = []
+        self.memory_bytes = 0
+
+        self.file = ""
+        self.connection = None
+        self.stored = 0
+        self.pending = []
+        self.pages = OrderedDict()
+        self.lock = threading.RLock()
+        self.closed = False
+
+        self.extend(rows)
+
+
+    def __len__(self):
+        self._check()
+        return len(self.memory) + self.stored + len(self.pending)
+
+
+    def __getitem__(self, index):
+        self._check()
+
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+
+        if not 0 <= index < len(self):
+            raise IndexError("SpillList index out of range")
+
+        if index < len(self.memory):
+            return self.memory[index]
+
+        offset = index - len(self.memory)
+        return self._page(offset // self.page_size)[offset % self.page_size]
+
+
+    def __iter__(self):
+        self._check()
+        yield from self.memory
+
+        for page in range((len(self) - len(self.memory) + self.page_size - 1) // self.page_size):
+            yield from self._page(page, cache=False)
+
+
+    def __repr__(self):
+        if self.closed:
+            return "SpillList(closed)"
+
+        return f"SpillList({len(self)} rows, {len(self.memory)} in memory)"
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+    def __del__(self):
+        self.close()
+
+
+    def append(self, row):
+        '''
+        adds a row to the end, in memory while there is room and on disk after that
+        '''
+        self._check()
+
+        body = json.dumps(row)
+        size = len(body) * RESIDENT_FACTOR + ROW_OVERHEAD
+
+        with self.lock:
+            if self.connection is None and self.memory_bytes + size <= self.max_memory:
+                self.memory.append(row)
+                self.memory_bytes += size
+                return
+
+            if self.connection is None:
+                self._open()
+
+            self.pending.append(body)
+
+            if len(self.pending) >= self.page_size:
+                self._flush()
+
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+
+    def spilled(self):
+        '''
+        returns: number of rows that are on disk rather than in memory
+        '''
+        self._check()
+        return self.stored + len(self.pending)
+
+
+    def close(self):
+        '''
+        deletes the temporary file and lets go of the rows, using the SpillList after this raises ValueError
+        '''
+        if getattr(self, "closed", True):
+            return
+
+        self.closed = True
+        self.memory = []
+        self.pending = []
+        self.pages.clear()
+
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+            if os.path.exists(self.file):
+                os.remove(self.file)
+
+
+    def _check(self):
+        '''
+        Helper function: raises ValueError once the SpillList has been closed
+        '''
+        if self.closed:
+            raise ValueError("SpillList is closed, its rows were let go of by close()")
+
+
+    def _open(self):
+        '''
+        Helper function: creates the temporary SQLite file the first time a row spills
+        '''
+        handle, self.file = tempfile.mkstemp(prefix="liongard_spill_", suffix=".db")
+        os.close(handle)
+
+        self.connection = sqlite3.connect(self.file, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=OFF")
+        self.connection.execute("PRAGMA synchronous=OFF")
+        self.connection.execute("CREATE TABLE rows (position INTEGER PRIMARY KEY, body TEXT NOT NULL)")
+
+
+    def _flush(self):
+        '''
+        Helper function: writes the rows waiting in pending to disk in one transaction
+        '''
+        if not self.pending:
+            return
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO rows (position, body) VALUES (?, ?)",
+                enumerate(self.pending, start=self.stored)
+            )
+
+        # the last page read may have been a partial one that just got more rows
+        self.pages.pop(self.stored // self.page_size, None)
+
+        self.stored += len(self.pending)
+        self.pending = []
+
+
+    def _page(self, page, cache=True):
+        '''
+        Helper function: the rows of one page of the spilled part, decoded
+        '''
+        with self.lock:
+            self._flush()
+
+            if page in self.pages:
+                self.pages.move_to_end(page)
+                return self.pages[page]
+
+            start = page * self.page_size
+            cursor = self.connection.execute(
+                "SELECT body FROM rows WHERE position >= ? AND position < ? ORDER BY position",
+                (start, start + self.page_size)
+            )
+            rows = [json.loads(body) for body, in cursor]
+
+            if cache:
+                self.pages[page] = rows
+                while len(self.pages) > self.cached_pages:
+                    self.pages.popitem(last=False)
+
+            return rows
@@ -0,0 +1,54 @@
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+
+# the modules live at the top of the repository rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    '''
+    answers every request with whatever the test put in server.reply: (status, body, delay)
+    '''
+
+    def _answer(self):
+        status, body, delay = self.server.reply(self.path)
+
+        if delay:
+            self.server.release.wait(delay)
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = do_DELETE = _answer
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    '''
+    local HTTP server, set server.reply = lambda path: (status, body bytes, seconds to stall)
+    '''
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.reply = lambda path: (200, b"[]", 0)
+    server.release = threading.Event()
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.release.set()
+    server.shutdown()
+    server.server_close()
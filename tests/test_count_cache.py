@@ -0,0 +1,123 @@
+import json
+import threading
+
+from main import LiongardAPI
+from count_cache import CountValidatedCache, _estimate_bytes
+
+
+def launchpoint_server(stub_server, state):
+    '''
+    state ---> {"count": body of the count endpoint, "rows": list served by get_launchpoints}
+    '''
+    requested = []
+    lock = threading.Lock()
+
+    def reply(path):
+        with lock:
+            requested.append(path)
+
+        if path in ("/api/v1/launchpoints/count", "/api/v1/timeline/count"):
+            return 200, str(state["count"]).encode(), 0
+        if path in ("/api/v1/launchpoints", "/api/v1/timeline"):
+            return 200, json.dumps(state["rows"]).encode(), 0
+        return 404, b"{}", 0
+
+    stub_server.reply = reply
+    return requested
+
+
+def test_unchanged_count_skips_the_list(stub_server):
+    state = {"count": 2, "rows": [{"ID": 1}, {"ID": 2}]}
+    requested = launchpoint_server(stub_server, state)
+    cache = CountValidatedCache(LiongardAPI(stub_server.url))
+
+    assert cache.get("get_launchpoints") == [{"ID": 1}, {"ID": 2}]
+    assert cache.get("get_launchpoints") == [{"ID": 1}, {"ID": 2}]
+
+    assert requested.count("/api/v1/launchpoints") == 1
+    assert cache.stats["probes"] == 2 and cache.stats["hits"] == 1 and cache.stats["refetches"] == 1
+    assert cache.stats["bytes_saved"] == len(json.dumps(state["rows"]))
+
+    state.update(count=3, rows=[{"ID": 1}, {"ID": 2}, {"ID": 3}])
+    assert len(cache.get("get_launchpoints")) == 3
+    assert requested.count("/api/v1/launchpoints") == 2
+
+
+def test_failed_count_is_never_a_hit(stub_server):
+    state = {"count": 2, "rows": [{"ID": 1}, {"ID": 2}]}
+    requested = launchpoint_server(stub_server, state)
+    cache = CountValidatedCache(LiongardAPI(stub_server.url))
+    cache.get("get_launchpoints")
+
+    # the count endpoint failing makes get_launchpoints_count return 0
+    state["count"] = 0
+    cache.get("get_launchpoints")
+    cache.get("get_launchpoints")
+
+    assert requested.count("/api/v1/launchpoints") == 3
+    assert "get_launchpoints" not in cache.entries
+
+
+def test_callers_get_their_own_list(stub_server):
+    launchpoint_server(stub_server, {"count": 2, "rows": [{"ID": 1}, {"ID": 2}]})
+    cache = CountValidatedCache(LiongardAPI(stub_server.url))
+
+    cache.get("get_launchpoints").clear()
+
+    assert cache.get("get_launchpoints") == [{"ID": 1}, {"ID": 2}]
+
+
+def test_fingerprint_catches_a_replaced_record(stub_server):
+    state = {"count": 1, "rows": [{"ID": 1}]}
+    requested = launchpoint_server(stub_server, state)
+    newest = {"ID": 1}
+    cache = CountValidatedCache(LiongardAPI(stub_server.url), fingerprints={"get_launchpoints": lambda api: newest["ID"]})
+    cache.get("get_launchpoints")
+
+    state["rows"] = [{"ID": 2}]
+    newest["ID"] = 2
+
+    assert cache.get("get_launchpoints") == [{"ID": 2}]
+    assert requested.count("/api/v1/launchpoints") == 2
+
+
+def test_directory_survives_a_new_instance(stub_server, tmp_path):
+    requested = launchpoint_server(stub_server, {"count": 2, "rows": [{"ID": 1}, {"ID": 2}]})
+    api = LiongardAPI(stub_server.url)
+    CountValidatedCache(api, directory=str(tmp_path)).get("get_launchpoints")
+
+    again = CountValidatedCache(api, directory=str(tmp_path))
+
+    assert again.get("get_launchpoints") == [{"ID": 1}, {"ID": 2}]
+    assert requested.count("/api/v1/launchpoints") == 1
+
+    again.invalidate()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stats_add_up_across_threads(stub_server):
+    launchpoint_server(stub_server, {"count": 1, "rows": [{"ID": 1}]})
+    cache = CountValidatedCache(LiongardAPI(stub_server.url), max_age=60)
+    cache.get("get_launchpoints")
+    cache.get("get_timelines")
+
+    # the per-method locks do not keep two methods from counting at the same time
+    def hammer(method):
+        for _ in range(2000):
+            cache.get(method)
+
+    threads = [threading.Thread(target=hammer, args=(method,)) for method in ["get_launchpoints", "get_timelines"] * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.stats["hits"] == 8000
+    assert cache.stats["bytes_saved"] == 8000 * len(json.dumps([{"ID": 1}]))
+
+
+def test_size_estimate_is_close_without_serializing_everything():
+    rows = [{"ID": index, "Name": f"launchpoint {index}", "Enabled": index % 2 == 0} for index in range(5000)]
+
+    assert abs(_estimate_bytes(rows) - len(json.dumps(rows))) < len(json.dumps(rows)) * 0.05
+    assert _estimate_bytes([{"ID": 1}]) == len(json.dumps([{"ID": 1}]))
@@ -0,0 +1,78 @@
+import os
+import json
+
+from dataprint_diff import hash_tree, diff_dataprints, save_hash_tree, load_hash_tree
+
+
+OLD = {
+    "Name": "DC-1",
+    "Settings": {"Firewall": True, "Ports": [80, 443]},
+    "Computers": [{"ID": index, "Name": f"PC-{index}"} for index in range(50)],
+}
+
+
+def copy(value):
+    return json.loads(json.dumps(value))
+
+
+def test_identical_dataprints_have_no_changes_and_equal_hashes():
+    assert hash_tree(OLD)["h"] == hash_tree(copy(OLD))["h"]
+    assert diff_dataprints(OLD, copy(OLD)) == []
+
+
+def test_key_order_does_not_change_the_hash():
+    assert hash_tree({"a": 1, "b": 2})["h"] == hash_tree({"b": 2, "a": 1})["h"]
+
+
+def test_dictionary_changes():
+    new = copy(OLD)
+    new["Name"] = "DC-2"
+    del new["Settings"]["Firewall"]
+    new["Settings"]["Dns"] = "1.1.1.1"
+
+    changes = {(change["path"], change["change"]) for change in diff_dataprints(OLD, new)}
+
+    assert changes == {("Name", "modified"), ("Settings.Firewall", "removed"), ("Settings.Dns", "added")}
+
+
+def test_insert_at_the_front_of_a_list_is_one_added():
+    new = copy(OLD)
+    new["Computers"].insert(0, {"ID": "new", "Name": "PC-new"})
+
+    assert diff_dataprints(OLD, new) == [
+        {"path": "Computers[0]", "change": "added", "old": None, "new": {"ID": "new", "Name": "PC-new"}}
+    ]
+
+
+def test_list_items_with_the_same_ID_are_diffed_inside():
+    new = copy(OLD)
+    new["Computers"].pop(0)
+    new["Computers"][9]["Name"] = "renamed"
+
+    assert diff_dataprints(OLD, new) == [
+        {"path": "Computers[0]", "change": "removed", "old": {"ID": 0, "Name": "PC-0"}, "new": None},
+        {"path": "Computers[9].Name", "change": "modified", "old": "PC-10", "new": "renamed"},
+    ]
+
+
+def test_plain_list_items_are_added_and_removed():
+    changes = diff_dataprints({"Ports": [80, 443]}, {"Ports": [443, 8080]})
+
+    assert changes == [
+        {"path": "Ports[0]", "change": "removed", "old": 80, "new": None},
+        {"path": "Ports[1]", "change": "added", "old": None, "new": 8080},
+    ]
+
+
+def test_type_change_is_a_modification():
+    assert diff_dataprints({"a": [1]}, {"a": {"x": 1}}) == [{"path": "a", "change": "modified", "old": [1], "new": {"x": 1}}]
+
+
+def test_cached_trees_round_trip(tmp_path):
+    save_hash_tree(hash_tree(OLD), os.path.join(tmp_path, "old"))
+    tree = load_hash_tree(os.path.join(tmp_path, "old"))
+
+    new = copy(OLD)
+    new["Name"] = "DC-2"
+
+    assert [change["path"] for change in diff_dataprints(OLD, new, old_tree=tree)] == ["Name"]
@@ -0,0 +1,99 @@
+import os
+import json
+
+import pytest
+
+from dataprint_history import DataprintHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    store = DataprintHistory(os.path.join(tmp_path, "history"))
+    yield store
+    store.connection.close()
+
+
+def dataprint(count=2000):
+    return {
+        "Name": "DC-1",
+        "Settings": {"Firewall": True, "Ports": [80, 443]},
+        "Computers": [{"ID": index, "Name": f"PC-{index}", "OS": {"Version": "10", "Build": index}} for index in range(count)],
+    }
+
+
+def test_round_trip(history):
+    original = dataprint()
+    history.put(1, original, "2024-01-01")
+
+    assert history.fetch_version(1, "2024-01-01") == original
+    assert history.list_versions(1) == ["2024-01-01"]
+    assert history.list_systems() == ["1"]
+
+
+def test_key_order_survives_even_when_the_content_is_shared(history):
+    history.put(1, {"x": {"a": 1, "b": 2}}, "2024-01-01")
+    history.put(2, {"x": {"b": 2, "a": 1}, "y": {"z": [{"q": 1}], "a": 1}}, "2024-01-01")
+
+    assert list(history.fetch_version(1, "2024-01-01")["x"]) == ["a", "b"]
+    assert list(history.fetch_version(2, "2024-01-01")["x"]) == ["b", "a"]
+    assert list(history.fetch_version(2, "2024-01-01")["y"]) == ["z", "a"]
+
+
+def test_unchanged_dataprint_costs_nothing(history):
+    history.put(1, dataprint(), "2024-01-01")
+    before = history.stats()
+
+    history.put(1, dataprint(), "2024-01-02")
+    after = history.stats()
+
+    assert after["versions"] == 2
+    assert after["bytes"] == before["bytes"]
+
+
+@pytest.mark.parametrize("change", ["modify", "insert"])
+def test_one_change_in_a_long_list_rewrites_little(history, change):
+    original = dataprint()
+    history.put(1, original, "2024-01-01")
+    before = history.stats()["bytes"]
+
+    changed = json.loads(json.dumps(original))
+    if change == "modify":
+        changed["Computers"][1000]["Name"] = "renamed"
+    else:
+        changed["Computers"].insert(0, {"ID": -1, "Name": "new"})
+
+    history.put(1, changed, "2024-01-02")
+
+    assert history.stats()["bytes"] - before < before * 0.05
+    assert history.fetch_version(1, "2024-01-01") == original
+    assert history.fetch_version(1, "2024-01-02") == changed
+
+
+def test_very_long_plain_list(history):
+    original = {"Values": list(range(50000))}
+    history.put(1, original, "2024-01-01")
+
+    assert history.fetch_version(1, "2024-01-01") == original
+
+
+def test_missing_version(history):
+    assert history.fetch_version(1, "2024-01-01") == 0
+
+
+class FailingAPI():
+    def __init__(self, result):
+        self.result = result
+
+    def get_system_detail_view(self, systemID):
+        return self.result
+
+
+@pytest.mark.parametrize("result", [0, False, None, "System ID is not an integer: <class 'str'>"])
+def test_record_skips_getter_errors(history, result):
+    assert history.record(FailingAPI(result), 1, "2024-01-01") == 0
+    assert history.list_versions(1) == []
+
+
+def test_record_stores_a_real_dataprint(history):
+    assert history.record(FailingAPI({"a": 1}), 1, "2024-01-01")
+    assert history.fetch_version(1, "2024-01-01") == {"a": 1}
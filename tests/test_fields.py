@@ -0,0 +1,89 @@
+import json
+import threading
+
+from main import LiongardAPI
+
+
+def recording_server(stub_server, bodies):
+    '''
+    bodies ---> {path without the query: what that endpoint answers with}
+    '''
+    requested = []
+    lock = threading.Lock()
+
+    def reply(path):
+        with lock:
+            requested.append(path)
+
+        body = bodies.get(path.split("?")[0])
+        if body is None:
+            return 404, b"{}", 0
+        return 200, json.dumps(body).encode(), 0
+
+    stub_server.reply = reply
+    return requested
+
+
+ENVIRONMENTS = {"Success": True, "Data": [
+    {"ID": 1, "Name": "Acme", "Parent": {"ID": 9, "Name": "MSP"}, "Tier": "Core"},
+    {"ID": 2, "Name": "Beta", "Tier": "Lite"},
+]}
+
+
+def test_fields_are_projected_here_and_never_sent(stub_server):
+    requested = recording_server(stub_server, {
+        "/api/v2/environments/": ENVIRONMENTS,
+        "/api/v1/agents": [{"ID": 5, "Name": "dc01", "UID": "x", "Environment": {"ID": 1, "Name": "Acme"}}],
+        "/api/v1/agents/5": {"ID": 5, "Name": "dc01", "UID": "x"},
+    })
+    api = LiongardAPI(stub_server.url)
+
+    assert api.get_environments(fields=["ID", "Parent.Name"]) == [{"ID": 1, "Parent": {"Name": "MSP"}}, {"ID": 2}]
+    assert api.get_agents(fields=["Name", "Environment.Name"]) == [{"Name": "dc01", "Environment": {"Name": "Acme"}}]
+    assert api.agent_call("GET", 5, fields=["ID"]) == (True, 200, {"ID": 5})
+
+    assert requested and not [path for path in requested if "fields=" in path]
+
+
+def test_v2_getters_unwrap_and_fail_like_before(stub_server):
+    recording_server(stub_server, {
+        "/api/v2/environments/": ENVIRONMENTS,
+        "/api/v2/environments/1": {"Success": True, "Data": ENVIRONMENTS["Data"][0]},
+        "/api/v2/environments/2": {"Success": False, "Message": "not yours"},
+        "/api/v2/environments/1/relatedEntities": {"Success": True, "Data": {"LaunchPoints": [{"ID": 3, "Alias": "fw"}]}},
+    })
+    api = LiongardAPI(stub_server.url)
+
+    assert api.get_environments() == ENVIRONMENTS["Data"]
+    assert api.get_single_environment(1, fields=["Name"]) == {"Name": "Acme"}
+    assert api.get_single_environment(2) == False
+    assert api.get_related_entities(1, fields="ID") == [{"ID": 3}]
+    assert api.get_name_and_ID() == {1: "Acme", 2: "Beta"}
+
+
+def test_file_writers_take_projected_records(stub_server, tmp_path):
+    recording_server(stub_server, {
+        "/api/v2/environments/1/relatedEntities": {"Success": True, "Data": {"LaunchPoints": [{"ID": 3, "Alias": "fw"}]}},
+        "/api/v1/metrics": [{"ID": 8, "Name": "Users", "UUID": "u-1"}],
+    })
+    api = LiongardAPI(stub_server.url)
+
+    assert api.get_related_entities(1, file=str(tmp_path / "related"), fields=["ID", "Alias"]) == [{"ID": 3, "Alias": "fw"}]
+    assert api.get_metrics(file=str(tmp_path / "metrics"), fields=["Name"]) == [{"Name": "Users"}]
+
+    assert (tmp_path / "related.txt").read_text().startswith("Name: fw, ID: 3, InspectorID: None")
+    assert (tmp_path / "metrics.txt").read_text() == "Name: Users, ID: None, UUID: None, UCK: None, Metric Display: None\n"
+
+
+def test_data_print_and_metric_data_take_fields(stub_server):
+    recording_server(stub_server, {
+        "/api/v1/systems/4/view": {"raw": {"Users": [{"Name": "a", "Groups": [1]}], "Licenses": 3}, "Other": 1},
+        "/api/v1/metrics/bulk": [{"SystemID": 4, "Value": 10, "Extra": "x"}],
+        "/api/v1/logs": [{"msg": "started", "level": "info"}],
+    })
+    api = LiongardAPI(stub_server.url)
+
+    assert api.get_system_detail_view(4, fields=["Users.Name"]) == {"Users": [{"Name": "a"}]}
+    assert api.get_system_detail_view(4)["Licenses"] == 3
+    assert api.get_metric_data(4, "u-1", fields=["Value"]) == [{"Value": 10}]
+    assert api.get_single_launchpoint_log(1, 2, fields="msg") == [{"msg": "started"}]
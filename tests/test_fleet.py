@@ -0,0 +1,102 @@
+import re
+import json
+import threading
+
+from main import LiongardAPI
+from fleet import AgentFleet
+
+
+AGENTS = [
+    {"ID": 1, "Name": "old-rmm-01", "Status": "Offline", "UID": "a", "Environment": {"Name": "Acme"}},
+    {"ID": 2, "Name": "old-rmm-02", "Status": "Offline", "UID": "b", "Environment": {"Name": "Beta"}},
+    {"ID": 3, "Name": "dc01", "Status": "Online", "UID": "c", "Environment": {"Name": "Acme"}},
+]
+
+
+def fleet_server(stub_server, broken=()):
+    '''
+    serves AGENTS, the agents in broken answer every call with a 500
+    '''
+    requested = []
+    lock = threading.Lock()
+    by_ID = {str(agent["ID"]): agent for agent in AGENTS}
+
+    def reply(path):
+        with lock:
+            requested.append(path)
+
+        parts = path.split("?")[0].split("/")[4:]
+        if not parts:
+            return 200, json.dumps(AGENTS).encode(), 0
+        if parts[0] in {str(ID) for ID in broken}:
+            return 500, b"agent is busy", 0
+        if parts[0] not in by_ID:
+            return 404, b"{}", 0
+        if parts[1:] == ["flush"]:
+            return 200, b"Agent job queue flushed", 0
+        return 200, json.dumps(by_ID[parts[0]]).encode(), 0
+
+    stub_server.reply = reply
+    return requested
+
+
+def test_select_by_field_nested_field_regex_and_where(stub_server):
+    fleet_server(stub_server)
+    fleet = AgentFleet(LiongardAPI(stub_server.url))
+
+    assert [agent["ID"] for agent in fleet.select(Status="Offline")] == [1, 2]
+    assert [agent["ID"] for agent in fleet.select(Environment__Name="Acme")] == [1, 3]
+    assert [agent["ID"] for agent in fleet.select(Name=re.compile(r"rmm-0[2-9]"))] == [2]
+    assert [agent["ID"] for agent in fleet.select(Status="Offline", where=lambda agent: agent["UID"] == "a")] == [1]
+    assert fleet.select(Missing="x") == []
+
+
+def test_flush_reports_every_agent(stub_server):
+    requested = fleet_server(stub_server, broken={2})
+    fleet = AgentFleet(LiongardAPI(stub_server.url, breaker_threshold=0), workers=4)
+
+    report = fleet.flush(fleet.select(Status="Offline") + [3])
+
+    assert (report["action"], report["dry_run"], report["total"], report["succeeded"], report["failed"]) == ("flush", False, 3, 2, 1)
+    assert [(result["ID"], result["Name"], result["ok"], result["status"]) for result in report["results"]] == [
+        (1, "old-rmm-01", True, 200), (2, "old-rmm-02", False, 500), (3, None, True, 200)]
+    assert report["results"][0]["response"] == "Agent job queue flushed"
+    assert sorted(path for path in requested if path.endswith("/flush")) == [f"/api/v1/agents/{ID}/flush" for ID in (1, 2, 3)]
+
+
+def test_delete_is_a_dry_run_unless_asked(stub_server):
+    requested = fleet_server(stub_server)
+    fleet = AgentFleet(LiongardAPI(stub_server.url))
+
+    report = fleet.delete([AGENTS[0], 2])
+
+    assert report["dry_run"] and report["succeeded"] == 2
+    assert [(result["ID"], result["Name"], result["response"]) for result in report["results"]] == [
+        (1, "old-rmm-01", "would delete"), (2, None, "would delete")]
+    assert requested == []
+
+    deleted = fleet.delete([1, 99], dry_run=False)
+
+    assert not deleted["dry_run"] and [result["ok"] for result in deleted["results"]] == [True, False]
+    assert sorted(requested) == ["/api/v1/agents/1", "/api/v1/agents/99"]
+
+
+def test_refresh_projects_and_catches_errors(stub_server, monkeypatch):
+    fleet_server(stub_server)
+    api = LiongardAPI(stub_server.url)
+    fleet = AgentFleet(api)
+    agent_call = api.agent_call
+
+    def flaky(method, ID, *args, **kwargs):
+        if ID == 3:
+            raise ConnectionError("connection reset")
+        return agent_call(method, ID, *args, **kwargs)
+
+    monkeypatch.setattr(api, "agent_call", flaky)
+
+    report = fleet.refresh([1, 99, 3], fields=["Name", "Environment.Name"])
+
+    assert report["results"][0]["response"] == {"Name": "old-rmm-01", "Environment": {"Name": "Acme"}}
+    assert (report["results"][1]["ok"], report["results"][1]["status"], report["results"][1]["response"]) == (False, 404, {})
+    assert report["results"][2]["ok"] is False and report["results"][2]["error"] == "connection reset"
+    assert report["succeeded"] == 1 and report["failed"] == 2
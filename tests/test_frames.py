@@ -0,0 +1,69 @@
+import numpy as np
+
+from frames import build_frame, detections_frame, alerts_frame
+
+
+DETECTIONS = [
+    {"ID": 1, "Environment": {"Name": "Acme"}, "Inspector": {"Name": "M365"}, "System": {"Name": "a"},
+     "Status": "Open", "CreatedOn": "2024-03-01T10:00:00Z"},
+    {"ID": 2, "Environment": {"Name": "Acme"}, "Inspector": {"Name": "AD"}, "System": {"Name": "b"},
+     "Status": "Closed", "CreatedOn": "2024-03-01T23:59:00+00:00"},
+    {"ID": 3, "Environment": {"Name": "Beta"}, "Inspector": {"Name": "M365"}, "System": {"Name": "c"},
+     "Status": "Open", "CreatedOn": "2024-03-03T08:00:00Z"},
+    {"ID": 4, "Environment": {"Name": "Acme"}, "Inspector": {"Name": "M365"}, "System": {"Name": "a"},
+     "Status": "Open", "CreatedOn": None},
+]
+
+
+def test_categories_round_trip_through_codes():
+    frame = detections_frame(DETECTIONS)
+
+    assert len(frame) == 4
+    assert list(frame.labels("environment")) == ["Acme", "Acme", "Beta", "Acme"]
+    assert frame["ID"].tolist() == [1.0, 2.0, 3.0, 4.0]
+
+
+def test_count_by_one_and_several_columns():
+    frame = detections_frame(DETECTIONS)
+
+    assert frame.count_by("environment") == {("Acme",): 3, ("Beta",): 1}
+    assert frame.count_by("environment", "inspector") == {("Acme", "M365"): 2, ("Acme", "AD"): 1, ("Beta", "M365"): 1}
+
+
+def test_filter_and_equals():
+    frame = detections_frame(DETECTIONS)
+
+    open_frame = frame.filter(frame.equals("status", "Open"))
+
+    assert open_frame.count_by("system") == {("a",): 2, ("c",): 1}
+    assert not frame.equals("status", "Snoozed").any()
+
+
+def test_time_buckets_skip_missing_times():
+    buckets, counts = detections_frame(DETECTIONS).time_buckets("D")
+
+    assert (buckets == np.array(["2024-03-01", "2024-03-03"], dtype="datetime64[D]")).all()
+    assert counts.tolist() == [2, 1]
+
+
+def test_time_buckets_split_by_a_category():
+    buckets, counts = detections_frame(DETECTIONS).time_buckets("D", by="environment")
+
+    first, third = buckets
+    assert counts == {(first, "Acme"): 2, (third, "Beta"): 1}
+
+
+def test_nested_status_objects_are_read_by_name():
+    frame = detections_frame([{"ID": 9, "Status": {"ID": 2, "Name": "Resolved"}}, {"ID": 10, "Status": {"ID": 3}}])
+
+    assert list(frame.labels("status")) == ["Resolved", "3"]
+    assert list(frame.labels("environment")) == ["", ""]
+    assert list(alerts_frame([{"ID": 9, "Status": {"ID": 2, "Name": "Resolved"}}]).labels("status")) == ["Resolved"]
+
+
+def test_empty_and_failed_lists_give_an_empty_frame():
+    for records in ([], 0, None):
+        frame = build_frame(records, {"ID": ("number", ("ID",)), "name": ("category", ("Name",))})
+
+        assert len(frame) == 0
+        assert frame.count_by("name") == {}
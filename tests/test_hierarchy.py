@@ -0,0 +1,124 @@
+import json
+import random
+
+import pytest
+
+from main import LiongardAPI
+from hierarchy import EnvironmentHierarchy, FenwickTree
+
+
+# MSP
+# |-- Acme (parent by ID)
+# |   |-- Acme East (parent by Name)
+# |   `-- Acme West (parent as an object)
+# `-- Beta
+# Loner (parent that does not exist), Loop A <-> Loop B
+ENVIRONMENTS = [
+    {"ID": 1, "Name": "MSP"},
+    {"ID": 2, "Name": "Acme", "Parent": 1},
+    {"ID": 3, "Name": "Acme West", "Parent": {"ID": 2, "Name": "Acme"}},
+    {"ID": 4, "Name": "Acme East", "Parent": "Acme"},
+    {"ID": 5, "Name": "Beta", "Parent": "1"},
+    {"ID": 6, "Name": "Loner", "Parent": 99},
+    {"ID": 7, "Name": "Loop A", "Parent": 8},
+    {"ID": 8, "Name": "Loop B", "Parent": 7},
+]
+
+
+def brute_rollup(tree, ID, counts):
+    return sum(counts.get(other, 0) for other in tree.order if other == ID or ID in tree.ancestors(other))
+
+
+def test_tree_shape_from_every_kind_of_parent():
+    tree = EnvironmentHierarchy(ENVIRONMENTS)
+
+    assert tree.children(1) == [2, 5] and tree.children(2) == [4, 3]
+    assert tree.parent(6) is None
+    assert 1 in tree.roots() and 6 in tree.roots()
+    assert [tree.parent(7), tree.parent(8)].count(None) == 1
+
+    assert tree.depth(3) == 2 and tree.descendants(1) == [2, 4, 3, 5] and tree.descendants(3) == []
+    assert tree.is_under(3, 1) and tree.is_under(2, 2) and not tree.is_under(5, 2) and not tree.is_under(1, 3)
+    assert tree.ancestor(3) == 2 and tree.ancestor(3, 2) == 1 and tree.ancestor(3, 3) is None
+    assert tree.ancestors(4) == [2, 1]
+    assert tree.common_ancestor(3, 4) == 2 and tree.common_ancestor(3, 5) == 1 and tree.common_ancestor(2, 3) == 2
+    assert tree.common_ancestor(3, 6) is None
+
+
+def test_rollups_match_a_brute_force_walk_on_a_random_forest():
+    generator = random.Random(7)
+    environments = [{"ID": ID, "Name": f"env {ID}", "Parent": generator.choice([None] + list(range(ID)))} for ID in range(300)]
+    counts = {ID: generator.randint(0, 5) for ID in range(300)}
+
+    tree = EnvironmentHierarchy(environments)
+    tree.set_counts("alerts", counts)
+    totals = tree.rollups("alerts")
+
+    for ID in range(300):
+        assert tree.rollup(ID, "alerts") == totals[ID] == brute_rollup(tree, ID, counts)
+
+    for _ in range(200):
+        ID, delta = generator.randrange(300), generator.choice([-1, 1, 3])
+        tree.add("alerts", ID, delta)
+        counts[ID] += delta
+
+    totals = tree.rollups("alerts")
+    for ID in generator.sample(range(300), 50):
+        assert tree.rollup(ID, "alerts") == totals[ID] == brute_rollup(tree, ID, counts)
+
+
+def test_deep_chain_does_not_recurse():
+    environments = [{"ID": ID, "Name": f"level {ID}", "Parent": ID - 1 if ID else None} for ID in range(5000)]
+    tree = EnvironmentHierarchy(environments)
+    tree.set_counts("systems", {ID: 1 for ID in range(5000)})
+
+    assert tree.rollup(0, "systems") == 5000 and tree.rollup(4000, "systems") == 1000
+    assert tree.ancestor(4999, 4321) == 678
+    assert tree.common_ancestor(4999, 1234) == 1234
+
+
+def test_update_keeps_counts_and_only_renumbers_on_a_move():
+    tree = EnvironmentHierarchy(ENVIRONMENTS)
+    tree.set_counts("detections", {3: 4, 5: 1})
+
+    renamed = [dict(environment, Tier="Core") for environment in ENVIRONMENTS]
+    assert tree.update(renamed) is False
+
+    moved = [dict(environment, Parent=5) if environment["ID"] == 3 else environment for environment in ENVIRONMENTS]
+    assert tree.update(moved) is True
+    assert tree.rollup(2, "detections") == 0 and tree.rollup(5, "detections") == 5 and tree.rollup(1, "detections") == 5
+
+    with pytest.raises(KeyError):
+        tree.add("detections", 404)
+    with pytest.raises(ValueError):
+        tree.rollup(1, "systems")
+
+
+def test_collect_counts_every_metric_in_one_pass(stub_server):
+    records = {
+        "/api/v1/systems": [{"ID": 1, "Environment": {"ID": 3}}, {"ID": 2, "EnvironmentID": 4}, {"ID": 3, "Environment": {"ID": 77}}],
+        "/api/v1/tasks": [{"ID": 1, "Environment": {"ID": 5, "Name": "Beta"}}],
+        "/api/v1/detections": [{"ID": ID, "Environment": {"ID": 2}} for ID in range(3)],
+    }
+    requested = []
+
+    def reply(path):
+        requested.append(path)
+        return 200, json.dumps(records.get(path.split("?")[0], [])).encode(), 0
+
+    stub_server.reply = reply
+    tree = EnvironmentHierarchy(ENVIRONMENTS)
+
+    assert tree.collect(LiongardAPI(stub_server.url)) == {"systems": 2, "alerts": 1, "detections": 3}
+    assert (tree.rollup(2, "systems"), tree.rollup(1, "systems"), tree.rollup(1, "alerts"), tree.rollup(2, "detections")) == (2, 2, 1, 3)
+    assert not [path for path in requested if "fields=" in path]
+
+
+def test_fenwick_ranges():
+    values = [3, 0, 2, 7, 1]
+    fenwick = FenwickTree(values)
+
+    assert [fenwick.range(start, end) for start, end in [(0, 4), (1, 3), (4, 4), (0, 0)]] == [13, 9, 1, 3]
+
+    fenwick.add(2, -2)
+    assert fenwick.prefix(2) == 3 and fenwick.range(2, 4) == 8
@@ -0,0 +1,82 @@
+import socket
+
+import pytest
+import requests
+
+pytest.importorskip("httpx")
+
+import http2
+from http2 import HTTP2Session, http2_available
+from main import LiongardAPI
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def session():
+    if not http2_available():
+        pytest.skip("h2 is not installed")
+
+    session = HTTP2Session(max_connections=2)
+    yield session
+    session.close()
+
+
+def test_responses_look_like_requests_responses(stub_server, session):
+    stub_server.reply = lambda path: (200, b'[{"ID": 1}, {"ID": 2}]', 0)
+
+    response = session.request("GET", f"{stub_server.url}/api/v1/agents", params={"page": 1}, headers={"X-Test": "1"})
+
+    assert response.ok and response.status_code == 200
+    assert response.json() == [{"ID": 1}, {"ID": 2}]
+    assert response.text == '[{"ID": 1}, {"ID": 2}]'
+    assert response.url.endswith("/api/v1/agents?page=1")
+
+    streamed = session.request("GET", stub_server.url, stream=True)
+    assert b"".join(streamed.iter_content(4)) == b'[{"ID": 1}, {"ID": 2}]'
+    streamed.close()
+
+
+def test_errors_come_back_as_requests_exceptions(stub_server, session):
+    stub_server.reply = lambda path: (503, b"busy", 0)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        session.request("GET", stub_server.url).raise_for_status()
+
+    stub_server.reply = lambda path: (200, b"[]", 2)
+    with pytest.raises(requests.exceptions.Timeout):
+        session.request("GET", stub_server.url, timeout=(1, 0.2))
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.request("GET", f"http://127.0.0.1:{closed_port()}/")
+
+
+def test_requests_only_arguments_are_accepted(stub_server, session):
+    stub_server.reply = lambda path: (200, b"{}", 0)
+
+    response = session.request("POST", stub_server.url, data="{}", verify=False, cookies=None, allow_redirects=False)
+
+    assert response.json() == {}
+
+
+def test_missing_h2_means_no_http2(monkeypatch):
+    monkeypatch.setattr(http2, "HAS_H2", False)
+
+    assert not http2_available()
+    with pytest.raises(ImportError):
+        HTTP2Session()
+
+
+def test_liongard_api_over_http2(stub_server):
+    if not http2_available():
+        pytest.skip("h2 is not installed")
+
+    stub_server.reply = lambda path: (200, b'[{"ID": 5, "Name": "dc01"}]', 0)
+    api = LiongardAPI(stub_server.url, http2=True)
+
+    assert isinstance(api.session, HTTP2Session)
+    assert api.get_agents(fields=["ID"]) == [{"ID": 5}]
@@ -0,0 +1,77 @@
+import json
+import struct
+
+import pytest
+
+from main import LiongardAPI
+from inventory_snapshot import build_snapshot, write_snapshot, InventorySnapshot, HEADER, SECTION
+
+
+SECTIONS = {
+    "environments": [{"ID": 42, "Name": "Acme Inc"}, {"ID": 7, "Name": "Ünïcode GmbH"}, {"ID": "x", "Name": "bad ID"}],
+    "systems": [
+        {"ID": 1234, "Name": "DC01", "Environment": {"ID": 42}},
+        {"ID": 99, "Name": "DC01", "Environment": {"ID": 7}},
+        {"ID": 5, "Name": None},
+    ],
+}
+
+
+def test_round_trip_lookups(tmp_path):
+    inventory = InventorySnapshot(build_snapshot(SECTIONS, str(tmp_path / "inv"))[:-len(".inventory")])
+
+    assert inventory.sections() == ["environments", "systems", "launchpoints", "agents"]
+    assert inventory.count("environments") == 2
+    assert inventory.name("environments", 7) == "Ünïcode GmbH"
+    assert inventory.ID("environments", "Acme Inc") == 42
+    assert inventory.ID("environments", "Nobody") is None
+    assert inventory.name("systems", 1) is None
+    assert inventory.environment("systems", 1234) == 42
+    assert inventory.environment("systems", 5) is None
+    assert inventory.name_and_ID("systems") == {5: "", 99: "DC01", 1234: "DC01"}
+    assert inventory.count("agents") == 0 and inventory.ID("agents", "anything") is None
+    assert 0 <= inventory.age() < 60
+
+
+def test_duplicate_names_give_the_lowest_ID(tmp_path):
+    inventory = InventorySnapshot(build_snapshot(SECTIONS, str(tmp_path / "inv"))[:-len(".inventory")])
+
+    assert inventory.ID("systems", "DC01") == 99
+
+
+def test_blocks_are_8_byte_aligned(tmp_path):
+    with open(build_snapshot(SECTIONS, str(tmp_path / "inv")), 'rb') as reader:
+        data = reader.read()
+
+    count = HEADER.unpack_from(data, 0)[-1]
+    for index in range(count):
+        ids, environments, offsets, by_name = SECTION.unpack_from(data, HEADER.size + index * SECTION.size)[2:6]
+        assert all(position % 8 == 0 for position in (ids, environments, offsets, by_name))
+
+
+def test_other_files_are_refused(tmp_path):
+    (tmp_path / "junk.inventory").write_bytes(struct.pack("<8sIIqI4x", b"NOTMAGIC", 1, 0, 0, 0))
+
+    with pytest.raises(ValueError):
+        InventorySnapshot(str(tmp_path / "junk"))
+
+
+def test_write_snapshot_pulls_every_section(stub_server, tmp_path):
+    def reply(path):
+        path = path.split("?")[0]
+        if path == "/api/v2/environments/":
+            return 200, json.dumps({"Success": True, "Data": [{"ID": 1, "Name": "Acme"}]}).encode(), 0
+        if path == "/api/v1/systems":
+            return 200, json.dumps([{"ID": 10, "Name": "DC01", "Environment": {"ID": 1}}]).encode(), 0
+        if path == "/api/v1/launchpoints":
+            return 200, json.dumps([{"ID": 20, "Alias": "M365", "Environment": {"ID": 1}}]).encode(), 0
+        return 200, b"[]", 0
+
+    stub_server.reply = reply
+    path = write_snapshot(LiongardAPI(stub_server.url), str(tmp_path / "inv"))
+    inventory = InventorySnapshot(path[:-len(".inventory")])
+
+    assert inventory.name_and_ID("environments") == {1: "Acme"}
+    assert inventory.environment("systems", 10) == 1
+    assert inventory.ID("launchpoints", "M365") == 20
+    assert inventory.count("agents") == 0
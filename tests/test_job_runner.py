@@ -0,0 +1,121 @@
+import json
+import threading
+
+import pytest
+
+from job_runner import JobRunner, load_job
+
+
+class FakeAPI():
+    '''
+    stands in for LiongardAPI, records every call and fails the launchpoint IDs in broken
+    '''
+
+    def __init__(self, broken=()):
+        self.calls = []
+        self.broken = set(broken)
+        self.lock = threading.Lock()
+
+    def _called(self, *call):
+        with self.lock:
+            self.calls.append(call)
+
+    def get_environments(self):
+        self._called("get_environments")
+        return [{"ID": 1, "Name": "Acme"}, {"ID": 2, "Name": "Beta"}]
+
+    def get_related_entities(self, organizationID):
+        self._called("get_related_entities", organizationID)
+        return [{"ID": organizationID * 10, "Enabled": True}, {"ID": organizationID * 10 + 1, "Enabled": False}]
+
+    def run_single_launchpoint(self, launchpointID):
+        self._called("run_single_launchpoint", launchpointID)
+        if launchpointID in self.broken:
+            raise RuntimeError(f"launchpoint {launchpointID} failed")
+        return {"Ran": launchpointID}
+
+    def get_single_environment(self, organizationID):
+        self._called("get_single_environment", organizationID)
+        return {"ID": organizationID}
+
+
+JOB = {"steps": [
+    {"id": "envs", "call": "get_environments"},
+    {"id": "related", "call": "get_related_entities", "for_each": "envs", "args": {"organizationID": "$item.ID"}},
+    {"id": "runs", "call": "run_single_launchpoint", "for_each": "related", "flatten": True,
+     "where": {"Enabled": True}, "args": {"launchpointID": "$item.ID"}},
+]}
+
+
+def test_for_each_flatten_and_where():
+    api = FakeAPI()
+
+    results = JobRunner(api, JOB, workers=4).run()
+
+    assert [rows[0]["ID"] for rows in results["related"]] == [10, 20]
+    assert results["runs"] == [{"Ran": 10}, {"Ran": 20}]
+    assert sorted(call for call in api.calls if call[0] == "run_single_launchpoint") == [
+        ("run_single_launchpoint", 10), ("run_single_launchpoint", 20)]
+
+
+def test_steps_references_wait_for_the_other_step():
+    job = {"steps": [
+        {"id": "first", "call": "get_single_environment", "args": {"organizationID": "$steps.envs.1.ID"}},
+        {"id": "envs", "call": "get_environments"},
+    ]}
+    runner = JobRunner(FakeAPI(), job)
+
+    assert runner.order() == ["envs", "first"]
+    assert runner.run()["first"] == {"ID": 2}
+
+
+def test_bad_jobs_are_refused():
+    with pytest.raises(ValueError, match="cycle"):
+        JobRunner(FakeAPI(), {"steps": [
+            {"id": "a", "call": "get_environments", "after": ["b"]},
+            {"id": "b", "call": "get_environments", "after": ["a"]},
+        ]})
+
+    with pytest.raises(ValueError, match="do not exist"):
+        JobRunner(FakeAPI(), {"steps": [{"id": "a", "call": "get_environments", "after": ["missing"]}]})
+
+    with pytest.raises(ValueError, match="does not have"):
+        JobRunner(FakeAPI(), {"steps": [{"id": "a", "call": "no_such_call"}]})
+
+
+def test_missing_item_field_is_an_error_not_a_None_argument():
+    job = {"steps": [
+        {"id": "envs", "call": "get_environments"},
+        {"id": "single", "call": "get_single_environment", "for_each": "envs", "args": {"organizationID": "$item.Missing"}},
+    ]}
+    api = FakeAPI()
+    runner = JobRunner(api, job)
+
+    assert runner.run()["single"] == []
+    assert len(runner.errors) == 2
+    assert not [call for call in api.calls if call[0] == "get_single_environment"]
+
+
+def test_checkpoint_skips_finished_calls_and_retries_failures(tmp_path):
+    checkpoint = str(tmp_path / "nightly")
+
+    first = JobRunner(FakeAPI(broken={20}), JOB, checkpoint=checkpoint)
+    assert first.run()["runs"] == [{"Ran": 10}]
+    assert [error[:2] for error in first.errors] == [("runs", "1.0")]
+
+    with open(f"{checkpoint}.jsonl") as reader:
+        keys = {(entry["step"], entry["key"]) for entry in map(json.loads, reader)}
+    assert ("runs", "1.0") not in keys and ("runs", "0.0") in keys
+
+    api = FakeAPI()
+    second = JobRunner(api, JOB, checkpoint=checkpoint)
+
+    assert second.run()["runs"] == [{"Ran": 10}, {"Ran": 20}]
+    assert api.calls == [("run_single_launchpoint", 20)]
+
+
+def test_load_job_reads_json(tmp_path):
+    path = tmp_path / "job.json"
+    path.write_text(json.dumps(JOB))
+
+    assert load_job(str(path)) == JOB
@@ -0,0 +1,177 @@
+import json
+import random
+
+import pytest
+
+from jsonstream import iter_json_array, iter_json_entries, compile_fields, project, lookup, lookup_any
+
+
+SAMPLE = json.dumps([
+    {"ID": 1, "Name": "a]\"[,}{", "Path": "C:\\temp\\x", "Note": "caf\u00e9 \u2603 \U0001f600"},
+    [1, [2, [3]], {"x": []}],
+    -23500.0,
+    12,
+    1e-07,
+    "plain",
+    True,
+    False,
+    None,
+    {},
+    [],
+], ensure_ascii=False)
+
+
+def chunked(text, size):
+    data = text.encode("utf-8")
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+def parse(chunks):
+    return list(iter_json_array(chunks))
+
+
+def test_every_single_split_point():
+    expected = [("item", entry) for entry in json.loads(SAMPLE)]
+    data = SAMPLE.encode("utf-8")
+
+    for split in range(len(data) + 1):
+        assert parse([data[:split], data[split:]]) == expected
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 1 << 16])
+def test_chunk_sizes(size):
+    assert list(iter_json_entries(chunked(SAMPLE, size))) == json.loads(SAMPLE)
+
+
+def test_multibyte_characters_split_between_chunks():
+    body = json.dumps(["\u00e9\u2603\U0001f600"], ensure_ascii=False).encode("utf-8")
+
+    # one byte at a time cuts through the middle of every multibyte character
+    assert list(iter_json_entries([body[index:index + 1] for index in range(len(body))])) == ["\u00e9\u2603\U0001f600"]
+
+
+def test_numbers_are_not_cut_at_a_chunk_boundary():
+    assert list(iter_json_entries([b"[-235", b"00.", b"0e", b"1, 7", b"]"])) == [-23500.0e1, 7]
+    assert list(iter_json_entries([b"[12", b"]"])) == [12]
+
+
+def test_str_chunks_are_accepted():
+    assert list(iter_json_entries(['[{"a": ', '"b"}]'])) == [{"a": "b"}]
+
+
+@pytest.mark.parametrize("body, expected", [
+    (b'{"Success": true, "Data": [1, 2]}', {"Success": True, "Data": [1, 2]}),
+    (b"  42 ", 42),
+    (b'"text"', "text"),
+    (b"null", None),
+])
+def test_non_array_bodies_come_back_whole(body, expected):
+    for size in (1, 3, len(body)):
+        assert parse([body[start:start + size] for start in range(0, len(body), size)]) == [("value", expected)]
+
+
+def test_empty_bodies():
+    assert parse([]) == []
+    assert parse([b"", b"  \n"]) == []
+    assert parse([b"[", b" ]"]) == []
+
+
+def test_truncated_array_raises():
+    with pytest.raises(ValueError):
+        parse([b'[{"ID": 1}, {"ID": 2'])
+
+    with pytest.raises(ValueError):
+        parse([b'[{"ID": 1},'])
+
+
+def test_random_documents_match_json_loads():
+    generator = random.Random(1234)
+
+    def value(depth):
+        kind = generator.randrange(8 if depth < 3 else 5)
+        if kind == 0:
+            return generator.randint(-10 ** 6, 10 ** 6)
+        if kind == 1:
+            return generator.uniform(-1e6, 1e6)
+        if kind == 2:
+            return "".join(generator.choice('ab"\\/[]{},: \n\t\u00e9\u2603') for _ in range(generator.randrange(8)))
+        if kind == 3:
+            return generator.choice([True, False, None])
+        if kind == 4:
+            return ""
+        if kind == 5:
+            return [value(depth + 1) for _ in range(generator.randrange(4))]
+        return {f"k{index}": value(depth + 1) for index in range(generator.randrange(4))}
+
+    for _ in range(300):
+        document = [value(0) for _ in range(generator.randrange(6))]
+        text = json.dumps(document, ensure_ascii=generator.random() < 0.5, indent=generator.choice([None, 1]))
+
+        assert list(iter_json_entries(chunked(text, generator.randint(1, 40)))) == json.loads(text)
+
+
+def test_compile_fields_nests_dotted_paths():
+    assert compile_fields(None) is None
+    assert compile_fields("ID") == {"ID": None}
+    assert compile_fields(["ID", "Environment.Name", "Environment.ID"]) == {
+        "ID": None, "Environment": {"Name": None, "ID": None}
+    }
+
+    # asking for the whole parent wins over a field inside of it
+    assert compile_fields(["Environment", "Environment.Name"]) == {"Environment": None}
+
+
+def test_project_keeps_only_the_shape():
+    record = {"ID": 1, "Name": "x", "Environment": {"ID": 2, "Name": "Acme", "Tier": 1}, "Tags": [{"Name": "a", "ID": 9}]}
+    shape = compile_fields(["ID", "Environment.Name", "Tags.Name", "Missing.Field"])
+
+    assert project(record, shape) == {"ID": 1, "Environment": {"Name": "Acme"}, "Tags": [{"Name": "a"}]}
+    assert project([record], compile_fields(["ID"])) == [{"ID": 1}]
+    assert project(record, None) is record
+
+
+def test_lookup_follows_dotted_paths_and_key_sequences():
+    record = {"ID": 1, "Environment": {"Name": "Acme", "Parent": None}, "Data": [{"ID": 7}]}
+
+    assert lookup(record, "Environment.Name") == "Acme"
+    assert lookup(record, ("Environment", "Name")) == "Acme"
+    assert lookup(record, "Data.0.ID") == 7
+    assert lookup(record, "") is record
+    assert lookup(record, "Environment.Missing", "none") == "none"
+    assert lookup(record, "ID.Name") is None
+    assert lookup(record, "Data.5.ID") is None
+
+    with pytest.raises(KeyError):
+        lookup(record, "Environment.Missing", strict=True)
+
+    assert lookup_any(record, ["Environment.Parent", "Environment.ID", "ID"]) == 1
+    assert lookup_any(record, ["Nope"], "fallback") == "fallback"
+
+
+def test_nested_array_inside_an_object_is_streamed():
+    body = '{"Count": 3, "Meta": {"a": [1]}, "Data": [{"line": 1}, "two", 3], "After": "never read"'
+
+    # the body is cut off after the array, nothing past it is needed
+    assert list(iter_json_array(chunked(body, 4), nested=True)) == [("item", {"line": 1}), ("item", "two"), ("item", 3)]
+
+
+def test_nested_object_without_an_array_is_one_value():
+    body = '{"Count": 3, "Name": "x"}'
+
+    assert list(iter_json_array(chunked(body, 2), nested=True)) == [("value", {"Count": 3, "Name": "x"})]
+    assert list(iter_json_array(chunked(body, 2))) == [("value", {"Count": 3, "Name": "x"})]
+    assert list(iter_json_array(['"just a string"'], nested=True)) == [("value", "just a string")]
+
+
+def test_path_streams_only_the_array_it_names():
+    body = '{"Success": true, "Other": [1, 2], "Data": {"Count": 2, "LaunchPoints": [{"ID": 1}, {"ID": 2}]}, "After": "never read"'
+
+    for size in (1, 3, 64):
+        assert list(iter_json_array(chunked(body, size), path="Data.LaunchPoints")) == [("item", {"ID": 1}), ("item", {"ID": 2})]
+
+
+def test_path_that_is_not_an_array_is_one_value():
+    body = '{"Success": false, "Message": "nope", "Data": {"ID": 4}}'
+
+    assert list(iter_json_array(chunked(body, 5), path="Data")) == [("value", json.loads(body))]
+    assert list(iter_json_array(chunked("[1, 2]", 1), path="Data")) == [("item", 1), ("item", 2)]
@@ -0,0 +1,55 @@
+import json
+import gzip
+
+from main import LiongardAPI
+
+
+def log_server(stub_server, state):
+    '''
+    state ---> {"body": whatever the logs endpoint answers with}
+    '''
+    def reply(path):
+        if path.startswith("/api/v1/logs"):
+            return 200, json.dumps(state["body"]).encode(), 0
+        return 404, b"{}", 0
+
+    stub_server.reply = reply
+
+
+def test_log_inside_of_an_object_is_streamed_and_filtered(stub_server):
+    log_server(stub_server, {"body": {"Count": 3, "Data": ["started", "ERROR: denied", {"msg": "error two"}]}})
+    api = LiongardAPI(stub_server.url)
+
+    assert list(api.stream_launchpoint_log(1, 2)) == ["started", "ERROR: denied", {"msg": "error two"}]
+    assert list(api.stream_launchpoint_log(1, 2, match="(?i)error")) == ["ERROR: denied", {"msg": "error two"}]
+    assert list(api.stream_launchpoint_log(1, 2, skip=2)) == [{"msg": "error two"}]
+
+
+def test_string_log_is_split_in_to_lines(stub_server):
+    log_server(stub_server, {"body": "first\nsecond"})
+
+    assert list(LiongardAPI(stub_server.url).stream_launchpoint_log(1, 2)) == ["first", "second"]
+
+
+def test_tail_only_yields_new_entries_and_stops_when_idle(stub_server):
+    state = {"body": ["a", "b"]}
+    log_server(stub_server, state)
+    api = LiongardAPI(stub_server.url)
+
+    seen = []
+    for entry in api.tail_launchpoint_log(1, 2, interval=0.01, idle=0.1):
+        seen.append(entry)
+        if entry == "b":
+            state["body"] = ["a", "b", "c", "d"]
+
+    assert seen == ["a", "b", "c", "d"]
+
+
+def test_save_writes_one_line_per_entry(stub_server, tmp_path):
+    log_server(stub_server, {"body": ["plain", {"msg": 1}]})
+
+    written = LiongardAPI(stub_server.url).save_launchpoint_log(1, 2, str(tmp_path / "run"))
+
+    assert written == 2
+    with gzip.open(tmp_path / "run.log.gz", "rt") as reader:
+        assert reader.read() == 'plain\n{"msg": 1}\n'
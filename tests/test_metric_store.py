@@ -0,0 +1,112 @@
+import threading
+
+import numpy as np
+
+from metric_store import MetricStore, RingBuffer, SEQUENCE, COUNT, HEAD
+
+
+def test_ring_wraps_and_keeps_the_newest_rows_in_order(tmp_path):
+    ring = RingBuffer(str(tmp_path / "a.ring"), capacity=5)
+
+    for second in range(12):
+        ring.append(second, second * 10.0)
+
+    rows = ring.window(0, 100)
+
+    assert rows['t'].tolist() == [7, 8, 9, 10, 11]
+    assert rows['v'].tolist() == [70.0, 80.0, 90.0, 100.0, 110.0]
+    assert ring.latest() == (11, 110.0)
+    assert ring.window(8, 10)['t'].tolist() == [8, 9]
+
+
+def test_same_time_replaces_and_old_rows_are_skipped(tmp_path):
+    ring = RingBuffer(str(tmp_path / "a.ring"), capacity=4)
+
+    assert ring.append(10, 1.0)
+    assert not ring.append(10, 1.0)
+    assert ring.append(10, 2.0)
+    assert not ring.append(5, 3.0)
+    assert ring.append(10, float("nan"))
+
+    assert ring.window(0, 100)['t'].tolist() == [10]
+    assert np.isnan(ring.latest()[1])
+    assert not ring.append(10, float("nan"))
+
+
+def test_reader_waits_out_a_write_in_progress(tmp_path):
+    ring = RingBuffer(str(tmp_path / "a.ring"), capacity=4)
+    ring.append(1, 1.0)
+
+    # an odd sequence number means the writer is part way through a row
+    ring.header[SEQUENCE] += 1
+    read = []
+    reader = threading.Thread(target=lambda: read.append(ring.latest()))
+    reader.start()
+    reader.join(0.1)
+
+    assert reader.is_alive()
+
+    ring.rows[1] = (2, 2.0)
+    ring.header[HEAD] = 2
+    ring.header[COUNT] = 2
+    ring.header[SEQUENCE] += 1
+    reader.join(1)
+
+    assert read == [(2, 2.0)]
+
+
+def test_readonly_reader_never_sees_a_torn_window(tmp_path):
+    store = MetricStore(str(tmp_path), capacity=64)
+    store.append(1, "uuid", 0, 0)
+    reader = MetricStore(str(tmp_path), readonly=True)
+    done = threading.Event()
+    torn = []
+
+    def read():
+        while not done.is_set():
+            times, values = reader.window(1, "uuid", 0, 10 ** 6)
+            seconds = times.astype(np.int64)
+            if not (np.diff(seconds) > 0).all() or not (values == seconds).all():
+                torn.append(seconds)
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    for second in range(1, 3000):
+        store.append(1, "uuid", second, second)
+    done.set()
+    thread.join()
+
+    assert torn == []
+    assert reader.latest(1, "uuid") == (np.datetime64(2999, 's'), 2999.0)
+
+
+def test_append_results_flattens_nested_metrics_and_skips_text(tmp_path):
+    store = MetricStore(str(tmp_path))
+
+    written = store.append_results({"Data": [
+        {"SystemID": 7, "Metrics": [
+            {"UUID": "m", "Value": "4", "Date": "2024-01-01T00:00:00Z"},
+            {"UUID": "t", "Value": "text", "Date": "2024-01-01T00:00:00Z"},
+        ]},
+        {"SystemID": 8, "UUID": "m", "Value": 5, "Date": "2024-01-01T00:00:00Z"},
+        {"UUID": "m", "Value": 6},
+    ]})
+
+    assert written == 2
+    assert store.series() == [("7", "m"), ("8", "m")]
+    assert store.latest(7, "m") == (np.datetime64("2024-01-01T00:00:00", 's'), 4.0)
+
+
+def test_downsample(tmp_path):
+    store = MetricStore(str(tmp_path))
+    for second, value in [(0, 1), (10, 3), (60, 5), (130, 7), (170, 9)]:
+        store.append(1, "m", value, second)
+
+    times, means = store.downsample(1, "m", 0, 200, 60)
+    _, counts = store.downsample(1, "m", 0, 200, 60, how="count")
+    _, lasts = store.downsample(1, "m", 0, 200, 60, how="last")
+
+    assert times.astype(np.int64).tolist() == [0, 60, 120]
+    assert means.tolist() == [2.0, 5.0, 8.0]
+    assert counts.tolist() == [2.0, 1.0, 2.0]
+    assert lasts.tolist() == [3.0, 5.0, 9.0]
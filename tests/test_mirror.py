@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from main import LiongardAPI, LIST_PATHS
+from mirror import InstanceMirror, TABLES
+
+
+def instance_server(stub_server, state):
+    '''
+    state ---> {list method: what its endpoint answers with, None for a 500}, missing ones answer []
+    '''
+    paths = {path: method for method, path in LIST_PATHS.items()}
+
+    def reply(path):
+        method = paths.get(path.split("?")[0])
+        if method is None:
+            return 404, b"{}", 0
+
+        body = state.get(method, [])
+        if body is None:
+            return 500, b"upstream error", 0
+        return 200, json.dumps(body).encode(), 0
+
+    stub_server.reply = reply
+
+
+STATE = {
+    "get_environments": {"Success": True, "Data": [{"ID": 1, "Name": "Acme", "Tier": "Core"}, {"ID": 2, "Name": "Beta"}]},
+    "get_launchpoints": [{"ID": 10, "Alias": "fw", "Enabled": False, "Environment": {"ID": 1}, "Inspector": {"ID": 42}}],
+    "get_detections": [
+        {"ID": 100, "Name": "admin added", "Environment": {"ID": 1}, "Inspector": {"ID": 42}, "Launchpoint": {"ID": 10}},
+        {"ID": 101, "Name": "port opened", "EnvironmentID": 1, "InspectorID": 42, "LaunchpointID": 10},
+        {"ID": 102, "Name": "other", "Environment": {"ID": 2}, "Inspector": {"ID": 7}},
+    ],
+}
+
+
+@pytest.fixture
+def mirror(stub_server, tmp_path):
+    state = json.loads(json.dumps(STATE))
+    instance_server(stub_server, state)
+    mirror = InstanceMirror(LiongardAPI(stub_server.url, breaker_threshold=0), str(tmp_path / "acme"))
+    mirror.state = state
+    yield mirror
+    mirror.close()
+
+
+def test_every_table_is_loaded_and_joinable(mirror):
+    loaded = mirror.refresh()
+
+    assert set(loaded) == set(TABLES)
+    assert (loaded["environments"], loaded["launchpoints"], loaded["detections"], loaded["agents"]) == (2, 1, 3, 0)
+
+    rows = mirror.query("""
+        SELECT e.name, COUNT(*) AS detections
+        FROM detections d
+        JOIN environments e ON e.id = d.environment_id
+        JOIN launchpoints l ON l.id = d.launchpoint_id
+        WHERE d.inspector_id = ? AND l.enabled = 0
+        GROUP BY e.name
+    """, (42,))
+
+    assert rows == [{"name": "Acme", "detections": 2}]
+    assert json.loads(mirror.query("SELECT raw FROM environments WHERE id = 1")[0]["raw"])["Tier"] == "Core"
+    assert mirror.refreshed()["detections"]["rows"] == 3
+
+
+def test_failed_pull_keeps_the_old_rows_and_an_empty_one_clears_them(mirror):
+    mirror.refresh("detections", "environments")
+
+    mirror.state["get_detections"] = None
+    mirror.state["get_environments"] = {"Success": False, "Message": "not allowed"}
+    assert mirror.refresh("detections", "environments") == {"detections": None, "environments": None}
+    assert mirror.query("SELECT COUNT(*) AS n FROM detections") == [{"n": 3}]
+    assert mirror.query("SELECT COUNT(*) AS n FROM environments") == [{"n": 2}]
+
+    mirror.state["get_detections"] = []
+    mirror.state["get_environments"] = {"Success": True, "Data": []}
+    assert mirror.refresh("detections", "environments") == {"detections": 0, "environments": 0}
+    assert mirror.query("SELECT COUNT(*) AS n FROM detections") == [{"n": 0}]
+    assert mirror.query("SELECT COUNT(*) AS n FROM environments") == [{"n": 0}]
+
+
+def test_unknown_tables_are_refused(mirror):
+    with pytest.raises(ValueError):
+        mirror.refresh("detections", "nothing")
@@ -0,0 +1,95 @@
+import json
+import threading
+
+import pytest
+
+from main import LiongardAPI
+from planner import QueryPlanner
+
+
+DETECTIONS = [{"ID": index, "Name": f"detection {index}", "Inspector": {"ID": 3}} for index in range(1, 41)]
+
+
+def detection_server(stub_server, state):
+    '''
+    state ---> {"count": body of the count endpoint}, the detections themselves are DETECTIONS
+    '''
+    requested = []
+    lock = threading.Lock()
+    by_ID = {str(detection["ID"]): detection for detection in DETECTIONS}
+
+    def reply(path):
+        with lock:
+            requested.append(path)
+
+        path = path.split("?")[0]
+        if path == "/api/v1/detections/count":
+            return 200, str(state["count"]).encode(), 0
+        if path == "/api/v1/detections":
+            return 200, json.dumps(DETECTIONS).encode(), 0
+        if path.startswith("/api/v1/detections/") and path.rsplit("/", 1)[1] in by_ID:
+            return 200, json.dumps(by_ID[path.rsplit("/", 1)[1]]).encode(), 0
+        if path == "/api/v1/systems":
+            return 200, json.dumps([{"ID": 7, "Name": "fw"}]).encode(), 0
+        if path == "/api/v1/systems/count":
+            return 200, b"1", 0
+        return 404, b"{}", 0
+
+    stub_server.reply = reply
+    return requested
+
+
+def test_count_is_cached_only_when_it_is_a_real_count(stub_server):
+    state = {"count": '{"error": "busy"}'}
+    requested = detection_server(stub_server, state)
+    planner = QueryPlanner(LiongardAPI(stub_server.url))
+
+    assert planner.count("detections") is None
+    state["count"] = "true"
+    assert planner.count("detections") is None
+    state["count"] = 0
+    assert planner.count("detections") is None
+    assert planner.counts == {}
+
+    state["count"] = 40
+    assert planner.count("detections") == 40
+    state["count"] = 41
+    assert planner.count("detections") == 40
+    assert requested.count("/api/v1/detections/count") == 4
+
+
+def test_few_ids_go_one_by_one_and_many_go_through_the_list(stub_server):
+    detection_server(stub_server, {"count": 10000})
+    planner = QueryPlanner(LiongardAPI(stub_server.url), workers=4)
+
+    few = planner.plan("detections", [1, 2, 2, 3])
+    assert few["strategy"] == "per_id" and few["inputs"]["ids"] == 3 and few["inputs"]["count"] == 10000
+
+    many = planner.plan("detections", range(5000))
+    assert many["strategy"] == "list"
+    assert many["estimates"]["per_id"] > many["estimates"]["list"]
+
+    assert planner.plan("systems", [7])["strategy"] == "list"
+
+    with pytest.raises(ValueError):
+        planner.plan("nothing", [1])
+
+
+def test_fetch_returns_the_same_records_either_way(stub_server):
+    requested = detection_server(stub_server, {"count": 40})
+    planner = QueryPlanner(LiongardAPI(stub_server.url))
+
+    explained = planner.fetch("detections", [1, 2], explain=True)
+    assert explained["strategy"] == "per_id"
+    assert not [path for path in requested if not path.endswith("/count")]
+
+    by_ID = planner.fetch("detections", [2, 1, 99], fields=["Name"])
+    assert by_ID == {2: {"ID": 2, "Name": "detection 2"}, 1: {"ID": 1, "Name": "detection 1"}}
+    assert ("detections", "per_id") in planner.measured
+
+    by_list = planner._by_list("detections", [2, 1, 99], ["Name", "ID"])
+    assert by_list == by_ID and list(by_list) == [2, 1]
+
+    assert planner.fetch("systems", [7, 8]) == {7: {"ID": 7, "Name": "fw"}}
+    assert planner.measured[("systems", "list")][1] == 1
+    assert not [path for path in requested if "fields=" in path]
@@ -0,0 +1,114 @@
+import time
+import threading
+
+from proxy import ResponseCache, create_app, resource_prefix
+
+
+def entry(body, status=200):
+    return {"status": status, "headers": {}, "body": body, "fetched": time.time()}
+
+
+def test_hit_after_miss_and_errors_are_not_cached():
+    cache = ResponseCache(ttl=60)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return entry(b"x")
+
+    assert cache.get("a", "/api/v1/agents", fetch)[1] == "MISS"
+    assert cache.get("a", "/api/v1/agents", fetch)[1] == "HIT"
+    assert len(calls) == 1
+
+    assert cache.get("b", "/api/v1/agents", lambda: entry(b"down", 500))[1] == "MISS"
+    assert "b" not in cache.entries
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = ResponseCache(ttl=60)
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(2)
+        return entry(b"x")
+
+    states = []
+    threads = [threading.Thread(target=lambda: states.append(cache.get("a", "/p", fetch)[1])) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while not cache.flights:
+        time.sleep(0.001)
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    # a thread that got there after the fetch finished is a HIT, never a second MISS
+    assert states.count("MISS") == 1 and "SHARED" in states
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = ResponseCache(ttl=60, max_bytes=10)
+
+    cache.get("a", "/p", lambda: entry(b"1234"))
+    cache.get("b", "/p", lambda: entry(b"1234"))
+    cache.get("a", "/p", lambda: entry(b"unused"))
+    cache.get("c", "/p", lambda: entry(b"1234"))
+
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.bytes == 8
+
+    # bigger than the whole budget, passed back but never cached
+    body, state = cache.get("d", "/p", lambda: entry(b"x" * 11))
+    assert state == "MISS" and body["body"] == b"x" * 11
+    assert list(cache.entries) == ["a", "c"] and cache.bytes == 8
+
+
+def test_refetching_a_key_does_not_count_it_twice():
+    cache = ResponseCache(ttl=0, max_bytes=100)
+
+    cache.get("a", "/p", lambda: entry(b"1234"))
+    cache.get("a", "/p", lambda: entry(b"123456"))
+
+    assert cache.bytes == 6
+    assert cache.invalidate("x", "/") == 0
+
+
+def test_invalidate_frees_bytes():
+    cache = ResponseCache(ttl=60)
+    cache.get(("key", "/api/v1/agents?"), "/api/v1/agents", lambda: entry(b"1234"))
+    cache.get(("key", "/api/v1/users?"), "/api/v1/users", lambda: entry(b"12"))
+
+    assert cache.invalidate("key", "/api/v1/agents") == 1
+    assert cache.bytes == 2
+
+
+def test_app_caches_reads_and_clears_them_on_writes(stub_server):
+    calls = []
+
+    def reply(path):
+        calls.append(path)
+        return 200, b"[1]", 0
+
+    stub_server.reply = reply
+    client = create_app(stub_server.url).test_client()
+    headers = {"X-ROAR-API-KEY": "key"}
+
+    assert client.get("/api/v1/agents", headers=headers).headers["X-Cache"] == "MISS"
+    cached = client.get("/api/v1/agents", headers=headers)
+    assert cached.headers["X-Cache"] == "HIT" and cached.data == b"[1]"
+
+    client.get("/api/v1/launchpoints/4/run", headers=headers)
+    client.get("/api/v1/launchpoints/4/run", headers=headers)
+    client.delete("/api/v1/agents/12", headers=headers)
+
+    assert client.get("/api/v1/agents", headers=headers).headers["X-Cache"] == "MISS"
+    assert calls.count("/api/v1/launchpoints/4/run") == 2
+    assert calls.count("/api/v1/agents") == 2
+
+
+def test_resource_prefix():
+    assert resource_prefix("/api/v1/agents/12/flush") == "/api/v1/agents"
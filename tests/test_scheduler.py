@@ -0,0 +1,112 @@
+import time
+import threading
+
+import pytest
+
+from main import LiongardAPI
+from scheduler import RequestScheduler
+from transport import Deadline, DeadlineExceeded
+
+
+PRIORITIES = {"interactive": {"weight": 8, "share": 1.0}, "batch": {"weight": 1, "share": 0.5}}
+
+
+def wait_for(condition, seconds=2):
+    give_up = time.monotonic() + seconds
+    while not condition():
+        assert time.monotonic() < give_up, "timed out waiting"
+        time.sleep(0.005)
+
+
+def test_class_cannot_hold_more_than_its_share():
+    scheduler = RequestScheduler(4, PRIORITIES)
+
+    scheduler.acquire("batch")
+    scheduler.acquire("batch")
+
+    # batch is at its limit of 2 out of 4 slots even though 2 are free
+    with pytest.raises(DeadlineExceeded):
+        with Deadline(0.1) as deadline:
+            scheduler.acquire("batch", deadline)
+
+    # the request that gave up is out of the queue
+    assert scheduler.stats()["batch"]["queued"] == 0
+
+    scheduler.acquire("interactive")
+    scheduler.acquire("interactive")
+    assert scheduler.stats()["interactive"]["in_flight"] == 2
+
+    scheduler.release("batch")
+    scheduler.acquire("batch")
+    assert scheduler.stats()["batch"]["in_flight"] == 2
+
+
+def test_queued_slots_go_out_by_weight():
+    scheduler = RequestScheduler(1, PRIORITIES)
+    scheduler.acquire("interactive")
+
+    granted = []
+    lock = threading.Lock()
+
+    def worker(priority):
+        scheduler.acquire(priority)
+        with lock:
+            granted.append(priority)
+        scheduler.release(priority)
+
+    threads = []
+    for priority in ["batch"] * 9 + ["interactive"] * 9:
+        queued = sum(stats["queued"] for stats in scheduler.stats().values())
+        thread = threading.Thread(target=worker, args=(priority,))
+        thread.start()
+        threads.append(thread)
+        wait_for(lambda: sum(stats["queued"] for stats in scheduler.stats().values()) == queued + 1)
+
+    scheduler.release("interactive")
+
+    for thread in threads:
+        thread.join(2)
+
+    # weight 8 against 1: the first nine turns go 8 to interactive and at most 1 to batch
+    assert granted[:9].count("interactive") >= 8
+    assert sorted(granted) == sorted(["batch"] * 9 + ["interactive"] * 9)
+
+
+def test_unknown_default_priority_is_caught_up_front():
+    priorities = {"high": {"weight": 4}, "low": {"weight": 1, "share": 0.5}}
+
+    with pytest.raises(ValueError):
+        RequestScheduler(4, priorities)
+
+    scheduler = RequestScheduler(4, priorities, default="high")
+    assert scheduler.acquire() == "high"
+    scheduler.release("high")
+
+
+def test_custom_priorities_work_outside_of_a_priority_block(stub_server):
+    api = LiongardAPI(stub_server.url, priorities={"high": {"weight": 4}, "low": {"weight": 1}}, default_priority="high")
+    stub_server.reply = lambda path: (200, b'[{"ID": 1, "Name": "agent"}]', 0)
+
+    assert api.get_agents() == [{"ID": 1, "Name": "agent"}]
+    assert api.scheduler.stats()["high"]["dispatched"] >= 1
+
+
+def test_streamed_response_keeps_its_slot_until_closed(stub_server):
+    api = LiongardAPI(stub_server.url, pool_size=2)
+    stub_server.reply = lambda path: (200, b'[{"ID": 1}]', 0)
+
+    api.request("GET", f"{stub_server.url}/api/v1/agents")
+    assert api.scheduler.stats()["interactive"]["in_flight"] == 0
+
+    with api.priority("batch"):
+        response = api.request("GET", f"{stub_server.url}/api/v1/agents", stream=True)
+
+    assert api.scheduler.stats()["batch"]["in_flight"] == 1
+
+    response.close()
+    response.close()
+    assert api.scheduler.stats()["batch"]["in_flight"] == 0
+
+    # the streaming readers close what they open
+    assert api.get_agents(fields=["ID"]) == [{"ID": 1}]
+    assert api.scheduler.stats()["interactive"]["in_flight"] == 0
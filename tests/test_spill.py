@@ -0,0 +1,87 @@
+import os
+import json
+
+import pytest
+
+from spill import SpillList, RESIDENT_FACTOR, ROW_OVERHEAD
+
+
+ROWS = [{"ID": index, "Name": f"row {index}"} for index in range(2500)]
+
+
+def row_size(row):
+    return len(json.dumps(row)) * RESIDENT_FACTOR + ROW_OVERHEAD
+
+
+def test_rows_past_the_memory_budget_spill_and_read_back():
+    budget = sum(row_size(row) for row in ROWS[:100])
+    rows = SpillList(ROWS, max_memory=budget, page_size=64, cached_pages=2)
+
+    assert len(rows) == 2500
+    assert rows.spilled() == 2400
+    assert os.path.exists(rows.file)
+
+    assert rows[0] == ROWS[0] and rows[99] == ROWS[99] and rows[100] == ROWS[100]
+    assert rows[-1] == ROWS[-1]
+    assert rows[95:105] == ROWS[95:105]
+    assert rows[::500] == ROWS[::500]
+    assert list(rows) == ROWS
+    assert len(rows.pages) <= 2
+
+    with pytest.raises(IndexError):
+        rows[2500]
+
+    rows.close()
+
+
+def test_memory_budget_counts_parsed_size_not_json_length():
+    row = ROWS[0]
+
+    # a budget that would fit ten rows of JSON fits one row once it is parsed
+    rows = SpillList([row] * 10, max_memory=len(json.dumps(row)) * 10)
+
+    assert rows.spilled() == 10 - rows.max_memory // row_size(row)
+    rows.close()
+
+
+def test_appending_after_reading_a_partial_page():
+    rows = SpillList(max_memory=0, page_size=10)
+    rows.extend(ROWS[:15])
+
+    assert rows[12] == ROWS[12]
+
+    rows.extend(ROWS[15:25])
+    assert rows[14:25] == ROWS[14:25]
+    rows.close()
+
+
+def test_spilled_rows_are_copies():
+    rows = SpillList([{"ID": 1}], max_memory=0, cached_pages=0)
+
+    rows[0]["ID"] = 2
+
+    assert rows[0] == {"ID": 1}
+    rows.close()
+
+
+def test_use_after_close_raises():
+    rows = SpillList(ROWS, max_memory=row_size(ROWS[0]) * 10)
+    path = rows.file
+    rows.close()
+
+    assert not os.path.exists(path)
+    assert repr(rows) == "SpillList(closed)"
+
+    for use in (len, lambda rows: rows[0], list, lambda rows: rows.append({}), lambda rows: rows.spilled()):
+        with pytest.raises(ValueError):
+            use(rows)
+
+    rows.close()
+
+
+def test_context_manager_closes_even_when_nothing_spilled():
+    with SpillList([{"ID": 1}]) as rows:
+        assert list(rows) == [{"ID": 1}] and rows.file == ""
+
+    with pytest.raises(ValueError):
+        len(rows)
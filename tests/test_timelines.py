@@ -0,0 +1,66 @@
+import json
+import time
+import threading
+
+from main import LiongardAPI
+
+
+def timeline_server(stub_server, count):
+    requested = []
+    lock = threading.Lock()
+
+    def reply(path):
+        with lock:
+            requested.append(path)
+
+        if path == "/api/v1/timeline":
+            timelines = [{"ID": index, "Launchpoint": {"ID": 100 + index}} for index in range(count)]
+            return 200, json.dumps(timelines).encode(), 0
+
+        if path.endswith("/detail"):
+            ID = int(path.split("/")[-2])
+            # later entries answer first so ordering is actually tested
+            return 200, json.dumps({"Timeline": ID}).encode(), 0.002 * (count - ID)
+
+        if path.startswith("/api/v1/logs"):
+            return 200, json.dumps([path.split("?")[1]]).encode(), 0
+
+        return 404, b"{}", 0
+
+    stub_server.reply = reply
+    return requested
+
+
+def test_entries_come_back_in_order_with_detail_and_log(stub_server):
+    timeline_server(stub_server, 12)
+    api = LiongardAPI(stub_server.url)
+
+    entries = list(api.iter_timeline_details(workers=4, prefetch=5))
+
+    assert [entry["ID"] for entry in entries] == list(range(12))
+    assert [entry["Detail"] for entry in entries] == [{"Timeline": index} for index in range(12)]
+    assert entries[3]["Log"] == ["launchpoint=103&timeline=3"]
+
+
+def test_nothing_is_fetched_past_the_prefetch_window(stub_server):
+    requested = timeline_server(stub_server, 40)
+    api = LiongardAPI(stub_server.url)
+
+    entries = api.iter_timeline_details(logs=False, workers=4, prefetch=3)
+    first = next(entries)
+    time.sleep(0.2)
+
+    assert first["ID"] == 0 and first["Log"] is None
+    assert len([path for path in requested if path.endswith("/detail")]) <= 3
+
+    entries.close()
+
+
+def test_timelines_can_be_passed_in(stub_server):
+    requested = timeline_server(stub_server, 5)
+    api = LiongardAPI(stub_server.url)
+
+    entries = list(api.iter_timeline_details([{"ID": 2, "Launchpoint": {"ID": 9}}], logs=False))
+
+    assert entries == [{"ID": 2, "Launchpoint": {"ID": 9}, "Detail": {"Timeline": 2}, "Log": None}]
+    assert "/api/v1/timeline" not in requested
@@ -0,0 +1,124 @@
+import json
+import threading
+
+from main import LiongardAPI
+from topology import EnvironmentGraph
+
+
+def topology_server(stub_server, environments, related, launchpoints=None):
+    '''
+    environments ---> list served by get_environments, related ---> {environmentID: rows or None for an error},
+    launchpoints ---> {launchpointID: record} for the agent lookups, None answers them with a 500
+    '''
+    requested = []
+    lock = threading.Lock()
+
+    def reply(path):
+        with lock:
+            requested.append(path)
+
+        path = path.split("?")[0]
+
+        if path == "/api/v2/environments/":
+            return 200, json.dumps({"Success": True, "Data": environments}).encode(), 0
+
+        if path.endswith("/relatedEntities"):
+            rows = related[int(path.split("/")[-2])]
+            if rows is None:
+                return 200, json.dumps({"Success": False, "Message": "nope"}).encode(), 0
+            return 200, json.dumps({"Success": True, "Data": {"LaunchPoints": rows}}).encode(), 0
+
+        if path.startswith("/api/v1/launchpoints"):
+            if launchpoints is None:
+                return 500, b"down", 0
+            if path.endswith("/count"):
+                return 200, str(len(launchpoints)).encode(), 0
+            if path == "/api/v1/launchpoints":
+                return 200, json.dumps(list(launchpoints.values())).encode(), 0
+            return 200, json.dumps(launchpoints[int(path.split("/")[-1])]).encode(), 0
+
+        return 404, b"{}", 0
+
+    stub_server.reply = reply
+    return requested
+
+
+def related_pulls(requested):
+    return sorted(int(path.split("/")[-2]) for path in requested if path.endswith("/relatedEntities"))
+
+
+def test_build_indexes_both_directions(stub_server):
+    topology_server(stub_server, [{"ID": 1, "SystemCount": 2}, {"ID": 2, "SystemCount": 1}], {
+        1: [{"ID": 10, "SystemID": 100, "InspectorID": 7, "AgentID": 50},
+            {"ID": 11, "SystemID": 101, "InspectorID": 8, "Agent": {"ID": 51}}],
+        2: [{"ID": 20, "SystemID": 200, "InspectorID": 7, "AgentID": 50}],
+    })
+    graph = EnvironmentGraph(workers=4)
+
+    assert graph.build(LiongardAPI(stub_server.url)) == 2
+
+    assert graph.launchpoint_environment == {10: 1, 11: 1, 20: 2}
+    assert graph.environment_systems == {1: {100, 101}, 2: {200}}
+    assert graph.inspector_environments[7] == {1, 2}
+    assert graph.agent_launchpoints == {50: {10, 20}, 51: {11}}
+
+
+def test_refresh_only_pulls_changed_environments(stub_server):
+    environments = [{"ID": 1, "SystemCount": 2}, {"ID": 2, "SystemCount": 1}]
+    related = {1: [{"ID": 10, "AgentID": 50}], 2: [{"ID": 20, "AgentID": 50}]}
+    requested = topology_server(stub_server, environments, related)
+    api = LiongardAPI(stub_server.url)
+    graph = EnvironmentGraph(workers=4)
+    graph.build(api)
+
+    environments[1] = {"ID": 2, "SystemCount": 2}
+    related[2] = [{"ID": 20, "AgentID": 50}, {"ID": 21, "AgentID": 52}]
+    del requested[:]
+
+    assert graph.refresh(api) == 1
+    assert related_pulls(requested) == [2]
+    assert graph.launchpoint_environment == {10: 1, 20: 2, 21: 2}
+
+    del requested[:]
+    assert graph.refresh(api) == 0
+    assert related_pulls(requested) == []
+
+
+def test_failed_environment_is_retried_and_the_rest_are_kept(stub_server):
+    related = {1: [{"ID": 10, "AgentID": 50}], 2: None}
+    requested = topology_server(stub_server, [{"ID": 1, "SystemCount": 1}, {"ID": 2, "SystemCount": 1}], related)
+    api = LiongardAPI(stub_server.url)
+    graph = EnvironmentGraph(workers=4)
+
+    graph.build(api)
+
+    assert graph.launchpoint_environment == {10: 1}
+
+    related[2] = [{"ID": 20, "AgentID": 51}]
+    del requested[:]
+    graph.refresh(api)
+
+    assert related_pulls(requested) == [2]
+    assert graph.launchpoint_environment == {10: 1, 20: 2}
+
+
+def test_missing_agents_are_looked_up_and_kept_when_the_lookup_fails(stub_server):
+    environments = [{"ID": 1, "SystemCount": 1}]
+    related = {1: [{"ID": 10}, {"ID": 11, "AgentID": 51}]}
+    launchpoints = {10: {"ID": 10, "Agent": {"ID": 60}}, 11: {"ID": 11, "AgentID": 51}}
+    topology_server(stub_server, environments, related, launchpoints)
+    api = LiongardAPI(stub_server.url, breaker_threshold=0)
+    graph = EnvironmentGraph(workers=4)
+
+    graph.build(api)
+
+    assert graph.launchpoint_agents == {10: 60}
+    assert graph.agent_launchpoints == {60: {10}, 51: {11}}
+
+    # the agent lookup is down on the next refresh, what was found last time stays
+    environments[0] = {"ID": 1, "SystemCount": 2}
+    topology_server(stub_server, environments, related, None)
+    graph.refresh(api)
+
+    assert graph.launchpoint_agents == {10: 60}
+    assert graph.agent_launchpoints == {60: {10}, 51: {11}}
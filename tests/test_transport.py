@@ -0,0 +1,215 @@
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import requests
+
+from main import LiongardAPI
+from transport import CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceeded, endpoint_key, hedged_call
+
+
+def test_breaker_opens_after_threshold_and_closes_after_trial():
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+
+    breaker.failure("GET /x")
+    breaker.allow("GET /x")
+    breaker.failure("GET /x")
+
+    with pytest.raises(CircuitOpenError):
+        breaker.allow("GET /x")
+
+    time.sleep(0.06)
+    breaker.allow("GET /x")
+    assert breaker.state("GET /x") == "half-open"
+
+    # only one trial at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.allow("GET /x")
+
+    breaker.success("GET /x")
+    assert breaker.state("GET /x") == "closed"
+
+
+def test_failed_trial_reopens_for_another_cooldown():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+
+    breaker.failure("GET /x")
+    time.sleep(0.06)
+    breaker.allow("GET /x")
+    breaker.failure("GET /x")
+
+    assert breaker.state("GET /x") == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.allow("GET /x")
+
+
+def test_abandoned_trial_lets_the_next_request_try():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+
+    breaker.failure("GET /x")
+    time.sleep(0.06)
+    breaker.allow("GET /x")
+    breaker.abandon("GET /x")
+
+    breaker.allow("GET /x")
+    breaker.success("GET /x")
+    assert breaker.state("GET /x") == "closed"
+
+
+def test_trial_that_runs_out_of_deadline_does_not_wedge_the_endpoint(stub_server):
+    api = LiongardAPI(stub_server.url, breaker_threshold=2, breaker_cooldown=0.05)
+    url = f"{stub_server.url}/api/v1/agents"
+
+    stub_server.reply = lambda path: (500, b"{}", 0)
+    api.request("GET", url)
+    api.request("GET", url)
+
+    with pytest.raises(CircuitOpenError):
+        api.request("GET", url)
+
+    time.sleep(0.06)
+    stub_server.reply = lambda path: (200, b"[]", 2)
+
+    with pytest.raises(DeadlineExceeded):
+        with Deadline(0.1):
+            api.request("GET", url)
+
+    stub_server.reply = lambda path: (200, b"[]", 0)
+    assert api.request("GET", url).status_code == 200
+    assert api.breaker.state(endpoint_key("GET", url)) == "closed"
+
+
+def test_deadline_cancel_stops_waiting(stub_server):
+    api = LiongardAPI(stub_server.url)
+    stub_server.reply = lambda path: (200, b"[]", 2)
+
+    with Deadline() as budget:
+        budget.cancel()
+
+        with pytest.raises(DeadlineExceeded):
+            api.request("GET", f"{stub_server.url}/api/v1/agents")
+
+
+
+def slow_first_server(stub_server, seconds=1):
+    '''
+    the first request stalls for seconds, every one after it answers straight away
+    '''
+    requested = []
+    lock = threading.Lock()
+
+    def reply(path):
+        with lock:
+            requested.append(path)
+            first = len(requested) == 1
+        return 200, json.dumps(len(requested)).encode(), seconds if first else 0
+
+    stub_server.reply = reply
+    return requested
+
+
+def test_slow_read_is_hedged_and_the_faster_copy_wins(stub_server):
+    requested = slow_first_server(stub_server)
+    api = LiongardAPI(stub_server.url, hedge=True, hedge_delay=0.05)
+
+    start = time.monotonic()
+    response = api.request("GET", f"{stub_server.url}/api/v1/agents")
+
+    assert time.monotonic() - start < 0.5
+    assert response.json() == 2
+    assert len(requested) == 2
+
+
+def test_launchpoint_runs_and_writes_are_never_hedged(stub_server):
+    requested = slow_first_server(stub_server, 0.2)
+    api = LiongardAPI(stub_server.url, hedge=True, hedge_delay=0.05)
+
+    api.request("GET", f"{stub_server.url}/api/v1/launchpoints/5/run")
+    api.request("POST", f"{stub_server.url}/api/v1/agents")
+
+    assert requested == ["/api/v1/launchpoints/5/run", "/api/v1/agents"]
+
+
+def test_hedged_call_raises_when_both_attempts_fail():
+    calls = []
+
+    def send():
+        calls.append(1)
+        time.sleep(0.02)
+        raise requests.exceptions.ConnectionError(f"attempt {len(calls)}")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with pytest.raises(requests.exceptions.ConnectionError):
+            hedged_call(pool, send, 0.01, 1)
+
+    assert len(calls) == 2
+
+
+def test_hedged_call_times_out_when_neither_attempt_answers():
+    release = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with pytest.raises(requests.exceptions.Timeout):
+            hedged_call(pool, lambda: release.wait(2), 0.01, 0.1)
+        release.set()
+
+
+def test_5xx_answers_open_the_breaker_and_4xx_do_not(stub_server):
+    api = LiongardAPI(stub_server.url, breaker_threshold=2, breaker_cooldown=30)
+    url = f"{stub_server.url}/api/v1/agents/7"
+
+    stub_server.reply = lambda path: (404, b"{}", 0)
+    for _ in range(3):
+        api.request("GET", url)
+
+    stub_server.reply = lambda path: (503, b"{}", 0)
+    api.request("GET", url)
+    api.request("GET", url)
+
+    # every agent ID shares the circuit, other endpoints do not
+    with pytest.raises(CircuitOpenError):
+        api.request("GET", f"{stub_server.url}/api/v1/agents/8")
+
+    stub_server.reply = lambda path: (200, b"[]", 0)
+    assert api.request("GET", f"{stub_server.url}/api/v1/users").status_code == 200
+
+
+def test_breaker_threshold_0_never_opens(stub_server):
+    api = LiongardAPI(stub_server.url, breaker_threshold=0)
+    stub_server.reply = lambda path: (500, b"{}", 0)
+
+    for _ in range(10):
+        assert api.request("GET", f"{stub_server.url}/api/v1/agents").status_code == 500
+
+
+def test_no_timeout_inside_of_a_deadline(stub_server):
+    api = LiongardAPI(stub_server.url, timeout=None, hedge=True, hedge_delay=0.01)
+    requested = slow_first_server(stub_server, 0.05)
+
+    with Deadline(5):
+        assert api.request("GET", f"{stub_server.url}/api/v1/agents").status_code == 200
+    with Deadline():
+        assert api.request("GET", f"{stub_server.url}/api/v1/agents", timeout=None).status_code == 200
+
+    assert len(requested) >= 2
+
+
+def test_request_the_deadline_gave_up_on_keeps_its_slot(stub_server):
+    api = LiongardAPI(stub_server.url, pool_size=1)
+    stub_server.reply = lambda path: (200, b"[]", 0.3)
+
+    with pytest.raises(DeadlineExceeded):
+        with Deadline(0.05):
+            api.request("GET", f"{stub_server.url}/api/v1/agents")
+
+    assert api.scheduler.in_flight == 1
+
+    stub_server.release.set()
+    for _ in range(100):
+        if api.scheduler.in_flight == 0:
+            break
+        time.sleep(0.01)
+
+    assert api.scheduler.in_flight == 0
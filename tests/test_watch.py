@@ -0,0 +1,139 @@
+import json
+import time
+import asyncio
+import threading
+
+from main import LiongardAPI
+from watch import WatchScheduler
+
+
+def agent_server(stub_server, state):
+    '''
+    state ---> {"agents": list served by get_agents, or None to answer with a 500}
+    '''
+    polls = []
+
+    def reply(path):
+        if path == "/api/v1/agents":
+            polls.append(path)
+            if state["agents"] is None:
+                return 500, b"upstream error", 0
+            return 200, json.dumps(state["agents"]).encode(), 0
+        return 404, b"{}", 0
+
+    stub_server.reply = reply
+    return polls
+
+
+def wait_for(condition, seconds=3):
+    give_up = time.monotonic() + seconds
+    while not condition():
+        if time.monotonic() > give_up:
+            raise AssertionError("timed out waiting")
+        time.sleep(0.01)
+
+
+def test_added_modified_and_removed(stub_server):
+    state = {"agents": [{"ID": 1, "Name": "a"}, {"ID": 2, "Name": "b"}]}
+    polls = agent_server(stub_server, state)
+    events = []
+    scheduler = WatchScheduler(LiongardAPI(stub_server.url, breaker_threshold=0))
+
+    try:
+        watch = scheduler.watch("get_agents", events.append, min_interval=0.01, max_interval=0.02, jitter=0)
+        wait_for(lambda: watch.polls >= 1)
+
+        state["agents"] = [{"ID": 1, "Name": "a2"}, {"ID": 3, "Name": "c"}]
+        wait_for(lambda: len(events) >= 3)
+
+        assert sorted((event["type"], event["ID"]) for event in events) == [("added", 3), ("modified", 1), ("removed", 2)]
+        modified = [event for event in events if event["type"] == "modified"][0]
+        assert modified["previous"] == {"ID": 1, "Name": "a"} and modified["record"] == {"ID": 1, "Name": "a2"}
+
+        # every agent going away is a real change, not a failed poll
+        del events[:]
+        state["agents"] = []
+        wait_for(lambda: len(events) >= 2)
+
+        assert sorted((event["type"], event["ID"]) for event in events) == [("removed", 1), ("removed", 3)]
+    finally:
+        scheduler.stop()
+
+
+def test_failed_poll_keeps_the_last_snapshot(stub_server):
+    state = {"agents": [{"ID": 1}, {"ID": 2}]}
+    polls = agent_server(stub_server, state)
+    events = []
+    scheduler = WatchScheduler(LiongardAPI(stub_server.url, breaker_threshold=0))
+
+    try:
+        watch = scheduler.watch("get_agents", events.append, min_interval=0.01, max_interval=0.02, jitter=0)
+        wait_for(lambda: watch.polls >= 1)
+
+        state["agents"] = None
+        count = len(polls)
+        wait_for(lambda: len(polls) >= count + 3)
+
+        assert events == []
+        assert set(watch.records) == {1, 2}
+
+        state["agents"] = [{"ID": 1}, {"ID": 2}]
+        wait_for(lambda: watch.polls >= 2)
+        assert events == []
+    finally:
+        scheduler.stop()
+
+
+def test_initial_records_reach_async_subscribers(stub_server):
+    agent_server(stub_server, {"agents": [{"ID": 1}, {"ID": 2}]})
+    scheduler = WatchScheduler(LiongardAPI(stub_server.url))
+
+    async def collect():
+        watch = scheduler.watch("get_agents", min_interval=5, emit_initial=True)
+        seen = []
+        async for event in watch.events():
+            seen.append(event["ID"])
+            if len(seen) == 2:
+                watch.stop()
+        return seen
+
+    try:
+        assert sorted(asyncio.run(asyncio.wait_for(collect(), 3))) == [1, 2]
+    finally:
+        scheduler.stop()
+
+
+def test_interval_shrinks_on_change_and_grows_while_quiet(stub_server):
+    agent_server(stub_server, {"agents": []})
+    scheduler = WatchScheduler(LiongardAPI(stub_server.url))
+
+    try:
+        watch = scheduler.watch("get_agents", min_interval=1, max_interval=8, jitter=0)
+        watch.interval = 4
+
+        assert watch.next_delay(2) == 2
+        assert watch.next_delay(0) == 3
+        assert watch.next_delay(None) == 4.5
+        for _ in range(10):
+            watch.next_delay(0)
+        assert watch.interval == 8
+    finally:
+        scheduler.stop()
+
+
+def test_watch_due_after_stop_does_not_crash_the_loop(stub_server, monkeypatch):
+    agent_server(stub_server, {"agents": []})
+    crashes = []
+    monkeypatch.setattr(threading, "excepthook", crashes.append)
+    scheduler = WatchScheduler(LiongardAPI(stub_server.url))
+    watch = scheduler.watch("get_agents", min_interval=60)
+    wait_for(lambda: watch.polls >= 1)
+
+    # the pool is already shut down when the next watch comes due
+    scheduler.pool.shutdown()
+    scheduler._schedule(watch, 0)
+    scheduler.thread.join(2)
+
+    assert not scheduler.thread.is_alive()
+    assert crashes == []
+    scheduler.stop()
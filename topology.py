@@ -0,0 +1,223 @@
+'''
+Environment ---> system/launchpoint/agent graph for a Liongard instance
+
+Calls LiongardAPI.get_related_entities for every environment at the same time instead of
+one after the other, then builds lookups in both directions so questions like "which
+environments use this inspector" do not need another trip to the API.
+
+Usage:
+    graph = EnvironmentGraph(workers=16)
+    graph.build(api)
+    graph.launchpoint_environment[5678]      # ---> environment ID the launchpoint belongs to
+    graph.inspector_environments[12]         # ---> set of environment IDs using inspector 12
+
+    graph.refresh(api)                        # only re-pulls environments whose counts changed
+'''
+
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from transport import submit
+from planner import QueryPlanner
+
+
+class EnvironmentGraph():
+    '''
+    Purpose:
+        holds the relationships between environments, systems, launchpoints, inspectors and agents
+
+    Forward lookups:
+        environments                ---> {environmentID: environment}
+        environment_launchpoints    ---> {environmentID: [launchpoint, ...]}  (rows from get_related_entities)
+        environment_systems         ---> {environmentID: set(systemID)}
+        system_launchpoints         ---> {systemID: set(launchpointID)}
+
+    Reverse lookups:
+        launchpoint_environment     ---> {launchpointID: environmentID}
+        system_environment          ---> {systemID: environmentID}
+        inspector_environments      ---> {inspectorID: set(environmentID)}
+        agent_launchpoints          ---> {agentID: set(launchpointID)}
+
+    List of Methods:
+        def build(self, api)
+        def refresh(self, api)
+        def refresh_agents(self, api, environmentIDs)
+    '''
+
+    def __init__(self, workers=16):
+        self.workers = workers
+
+        self.environments = {}
+        self.environment_launchpoints = {}
+        self.signatures = {}
+        self.launchpoint_agents = {}
+        self.planner = None
+
+        self.index()
+
+
+    @classmethod
+    def signature(self, environment):
+        '''
+        Helper function: fingerprint of the count fields on an environment, if the
+        environment has no count fields the whole record is used instead
+        '''
+        counts = {key: value for key, value in environment.items() if key.endswith("Count")}
+
+        if not counts:
+            counts = environment
+
+        return hashlib.blake2b(json.dumps(counts, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+    @classmethod
+    def agent_of(self, launchpoint):
+        '''
+        Helper function: pulls the agent ID off of a launchpoint if it has one
+        '''
+        if launchpoint.get('AgentID') is not None:
+            return launchpoint['AgentID']
+
+        agent = launchpoint.get('Agent')
+        if isinstance(agent, dict):
+            return agent.get('ID')
+
+        return None
+
+
+    def build(self, api):
+        '''
+        description:
+            pulls every environment and all of their related entities in one parallel sweep
+            and builds the lookups from scratch
+
+        returns: the number of environments swept
+        '''
+        self.environments = {}
+        self.environment_launchpoints = {}
+        self.signatures = {}
+
+        return self.refresh(api)
+
+
+    def refresh(self, api):
+        '''
+        description:
+            re-pulls the environment list and only grabs the related entities for environments
+            that are new or whose counts changed since the last build/refresh, environments that
+            are gone are dropped from the graph
+
+        returns: the number of environments that were re-pulled
+        '''
+        environments = api.get_environments()
+
+        if not environments:
+            print("refresh: no environments were returned, the graph was left as is")
+            return 0
+
+        current = {env['ID']: env for env in environments}
+        changed = [ID for ID, env in current.items() if self.signatures.get(ID) != EnvironmentGraph.signature(env)]
+
+        for ID in list(self.environments):
+            if ID not in current:
+                self.environment_launchpoints.pop(ID, None)
+                self.signatures.pop(ID, None)
+
+        if not changed:
+            self.environments = current
+            self.index()
+            return 0
+
+        pulled = []
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            related = [submit(pool, api.get_related_entities, ID) for ID in changed]
+
+            for ID, pull in zip(changed, related):
+                try:
+                    launchpoints = pull.result()
+                except Exception as error:
+                    print(f"refresh: could not grab related entities for environment {ID} ({error}), it will be retried next refresh")
+                    continue
+
+                if launchpoints is False or launchpoints == 0:
+                    print(f"refresh: could not grab related entities for environment {ID}, it will be retried next refresh")
+                    continue
+
+                self.environment_launchpoints[ID] = launchpoints
+                self.signatures[ID] = EnvironmentGraph.signature(current[ID])
+                pulled.append(ID)
+
+        self.refresh_agents(api, pulled)
+
+        self.environments = current
+        self.index()
+
+        return len(changed)
+
+
+    def refresh_agents(self, api, environmentIDs):
+        '''
+        Helper function: looks up the agents of the launchpoints in environmentIDs whose related
+        entity rows do not carry one, the planner picks between one get_launchpoints call and a
+        get_single_launchpoint per launchpoint, if that fails the agents from last time are kept
+        '''
+        missing = [
+            launchpoint['ID']
+            for ID in environmentIDs
+            for launchpoint in self.environment_launchpoints[ID]
+            if EnvironmentGraph.agent_of(launchpoint) is None
+        ]
+
+        if missing:
+            if self.planner is None or self.planner.api is not api:
+                self.planner = QueryPlanner(api, self.workers)
+
+            try:
+                found = self.planner.fetch("launchpoints", missing)
+            except Exception as error:
+                print(f"refresh: could not grab the agents of {len(missing)} launchpoints ({error}), keeping the ones from last time")
+                found = None
+
+            if found is not None:
+                for launchpointID in missing:
+                    launchpoint = found.get(launchpointID)
+                    self.launchpoint_agents[launchpointID] = None if launchpoint is None else EnvironmentGraph.agent_of(launchpoint)
+
+        known = {launchpoint['ID'] for launchpoints in self.environment_launchpoints.values() for launchpoint in launchpoints}
+        self.launchpoint_agents = {ID: agent for ID, agent in self.launchpoint_agents.items() if ID in known}
+
+
+    def index(self):
+        '''
+        Helper function: rebuilds every lookup from the stored related entities, no API calls
+        '''
+        self.environment_systems = {}
+        self.system_launchpoints = {}
+        self.launchpoint_environment = {}
+        self.system_environment = {}
+        self.inspector_environments = {}
+        self.agent_launchpoints = {}
+
+        for environmentID, launchpoints in self.environment_launchpoints.items():
+            systems = self.environment_systems.setdefault(environmentID, set())
+
+            for launchpoint in launchpoints:
+                launchpointID = launchpoint['ID']
+                systemID = launchpoint.get('SystemID')
+
+                self.launchpoint_environment[launchpointID] = environmentID
+                self.inspector_environments.setdefault(launchpoint.get('InspectorID'), set()).add(environmentID)
+
+                if systemID is not None:
+                    systems.add(systemID)
+                    self.system_environment[systemID] = environmentID
+                    self.system_launchpoints.setdefault(systemID, set()).add(launchpointID)
+
+                agentID = EnvironmentGraph.agent_of(launchpoint)
+                if agentID is None:
+                    agentID = self.launchpoint_agents.get(launchpointID)
+
+                if agentID is not None:
+                    self.agent_launchpoints.setdefault(agentID, set()).add(launchpointID)
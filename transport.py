@@ -0,0 +1,433 @@
+'''
+Pieces of the request path shared by every LiongardAPI instance
+
+LiongardAPI.request sends every call through these before it goes out over the wire.
+'''
+
+import re
+import time
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from urllib.parse import urlsplit
+from concurrent.futures import wait, FIRST_COMPLETED
+
+import requests
+
+
+# path segments that are IDs (numbers or UUIDs) rather than part of the endpoint
+ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F-]{27})$")
+
+
+class RateLimiter():
+    '''
+    Purpose:
+        token bucket shared by every thread using the same LiongardAPI instance
+
+    Usage:
+        rate ---> requests per second allowed, 0 turns the limit off
+        burst ---> how many requests can go out back to back after being idle, defaults to rate
+    '''
+
+    def __init__(self, rate=0, burst=0):
+        self.rate = rate
+        self.burst = burst or max(rate, 1)
+
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+
+    def acquire(self):
+        '''
+        blocks until a request is allowed to go out
+        '''
+        if not self.rate:
+            return
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                pause = (1 - self.tokens) / self.rate
+
+            time.sleep(pause)
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    '''
+    Raised instead of sending a request while the circuit for that endpoint is open
+    '''
+
+
+def endpoint_key(method, url):
+    '''
+    Helper function: groups URLs by endpoint so stats are not split per ID
+        GET https://us9.app.liongard.com/api/v1/agents/1234?x=1 ---> "GET /api/v1/agents/{id}"
+    '''
+    path = urlsplit(url).path
+    parts = ["{id}" if ID_SEGMENT.match(part) else part for part in path.split("/")]
+
+    return f"{method} {'/'.join(parts)}"
+
+
+class LatencyTracker():
+    '''
+    Purpose:
+        keeps the last few response times (and body sizes) per endpoint to work out percentiles
+        and averages
+    '''
+
+    def __init__(self, samples=200):
+        self.samples = samples
+        self.latencies = {}
+        self.sizes = {}
+        self.lock = threading.Lock()
+
+
+    def record(self, key, seconds, size=None):
+        '''
+        size ---> bytes in the response body, left out for streamed responses that have not been read yet
+        '''
+        with self.lock:
+            if key not in self.latencies:
+                self.latencies[key] = deque(maxlen=self.samples)
+                self.sizes[key] = deque(maxlen=self.samples)
+            self.latencies[key].append(seconds)
+
+            if size is not None:
+                self.sizes[key].append(size)
+
+
+    def average(self, key, minimum_samples=1):
+        '''
+        returns: mean response time in seconds, or None without enough samples
+        '''
+        with self.lock:
+            observed = list(self.latencies.get(key, ()))
+
+        if len(observed) < minimum_samples:
+            return None
+
+        return sum(observed) / len(observed)
+
+
+    def average_bytes(self, key, minimum_samples=1):
+        '''
+        returns: mean response body size in bytes, or None without enough samples
+        '''
+        with self.lock:
+            observed = list(self.sizes.get(key, ()))
+
+        if len(observed) < minimum_samples:
+            return None
+
+        return sum(observed) / len(observed)
+
+
+    def percentile(self, key, percent=95, minimum_samples=20):
+        '''
+        returns: the percentile in seconds, or None until there are enough samples to trust it
+        '''
+        with self.lock:
+            observed = sorted(self.latencies.get(key, ()))
+
+        if len(observed) < minimum_samples:
+            return None
+
+        return observed[min(len(observed) - 1, int(len(observed) * percent / 100))]
+
+
+class CircuitBreaker():
+    '''
+    Purpose:
+        stops sending requests to an endpoint that keeps failing
+
+    Usage:
+        threshold ---> consecutive failures (errors, timeouts and 5xx responses) before the circuit
+            opens, 0 turns the breaker off
+        cooldown ---> seconds to fail fast for before letting a single trial request through,
+            if the trial works the circuit closes again, if not it stays open for another cooldown
+    '''
+
+    def __init__(self, threshold=5, cooldown=30):
+        self.threshold = threshold
+        self.cooldown = cooldown
+
+        self.failures = {}
+        self.opened = {}
+        self.trial = set()
+        self.lock = threading.Lock()
+
+
+    def allow(self, key):
+        '''
+        raises CircuitOpenError if the endpoint is failing fast right now
+        '''
+        if not self.threshold:
+            return
+
+        with self.lock:
+            opened = self.opened.get(key)
+
+            if opened is None:
+                return
+
+            if time.monotonic() - opened >= self.cooldown and key not in self.trial:
+                self.trial.add(key)
+                return
+
+        raise CircuitOpenError(f"circuit open for {key}: it failed {self.threshold} times in a row, try again shortly")
+
+
+    def success(self, key):
+        with self.lock:
+            self.failures.pop(key, None)
+            self.opened.pop(key, None)
+            self.trial.discard(key)
+
+
+    def abandon(self, key):
+        '''
+        a request that was let through ended without an answer either way (its deadline ran
+        out, it was cancelled or it raised something other than a request error), if it was the
+        half-open trial the next request gets to be the trial instead, nothing is counted
+        '''
+        with self.lock:
+            self.trial.discard(key)
+
+
+    def failure(self, key):
+        if not self.threshold:
+            return
+
+        with self.lock:
+            self.failures[key] = self.failures.get(key, 0) + 1
+
+            if key in self.trial or self.failures[key] >= self.threshold:
+                self.opened[key] = time.monotonic()
+                self.trial.discard(key)
+
+
+    def state(self, key):
+        '''
+        returns: "closed", "open" or "half-open"
+        '''
+        with self.lock:
+            if key not in self.opened:
+                return "closed"
+            if key in self.trial or time.monotonic() - self.opened[key] >= self.cooldown:
+                return "half-open"
+            return "open"
+
+
+def hedged_call(pool, send, delay, timeout, deadline=None):
+    '''
+    description:
+        calls send() and if it has not come back after delay seconds calls it a second time,
+        whichever finishes first (without raising) wins, the other is left to finish on its own
+
+        deadline ---> optional Deadline, waiting stops as soon as it runs out or is cancelled
+        timeout ---> seconds to wait on both attempts, None waits as long as they take
+
+    returns: whatever send() returns, raises the error if both attempts failed
+    '''
+    primary = pool.submit(send)
+    finished = wait_within([primary], delay, deadline)
+
+    if finished:
+        return primary.result()
+
+    attempts = [primary, pool.submit(send)]
+    give_up = None if timeout is None else time.monotonic() + timeout
+    error = None
+
+    while attempts:
+        finished = wait_within(attempts, None if give_up is None else max(give_up - time.monotonic(), 0), deadline)
+
+        if not finished:
+            raise requests.exceptions.Timeout(f"no response from either attempt within {timeout} seconds")
+
+        for attempt in finished:
+            attempts.remove(attempt)
+
+            if attempt.exception() is None:
+                for loser in attempts:
+                    loser.add_done_callback(_close_response)
+                return attempt.result()
+
+            error = attempt.exception()
+
+    raise error
+
+
+def _close_response(future):
+    '''
+    Helper function: hands the connection of a hedge that lost back to the pool
+    '''
+    if future.exception() is None and hasattr(future.result(), "close"):
+        future.result().close()
+
+
+CURRENT_DEADLINE = contextvars.ContextVar("liongard_deadline", default=None)
+
+# how often a request waiting on a deadline checks whether it was cancelled
+CANCEL_CHECK = 0.05
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    '''
+    Raised when a request is started or still running after its deadline ran out or was cancelled
+    '''
+
+
+class Deadline():
+    '''
+    Purpose:
+        time budget shared by every request made inside of it, including requests made on other
+        threads by the fan-out helpers, and a way to cancel all of them at once
+
+    Usage:
+        with Deadline(30) as budget:          # or: with test.deadline(30) as budget:
+            test.get_name_and_ID()            # every request gets whatever is left of the 30 seconds
+            test.search_systems(["Sonicwall"])
+
+        budget.cancel()                       # from any thread, requests in flight stop waiting right away
+
+    Deadlines nest, an inner one never outlives the one around it and cancelling the outer one
+    cancels the inner one. seconds=None gives a budget that only ends when cancelled.
+    '''
+
+    def __init__(self, seconds=None, parent=None):
+        if parent is None:
+            parent = CURRENT_DEADLINE.get()
+
+        self.parent = parent
+        self.expires = None if seconds is None else time.monotonic() + seconds
+
+        if parent is not None and parent.expires is not None:
+            self.expires = parent.expires if self.expires is None else min(self.expires, parent.expires)
+
+        self.event = threading.Event()
+        self.tokens = []
+
+
+    def __enter__(self):
+        self.tokens.append(CURRENT_DEADLINE.set(self))
+        return self
+
+
+    def __exit__(self, *exc):
+        CURRENT_DEADLINE.reset(self.tokens.pop())
+        return False
+
+
+    def cancel(self):
+        self.event.set()
+
+
+    @property
+    def cancelled(self):
+        return self.event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+
+    def remaining(self):
+        '''
+        returns: seconds left in the budget, float("inf") if it has no time limit
+        '''
+        if self.expires is None:
+            return float("inf")
+
+        return max(self.expires - time.monotonic(), 0.0)
+
+
+    def check(self):
+        '''
+        raises DeadlineExceeded if the budget is used up or was cancelled
+        '''
+        if self.cancelled:
+            raise DeadlineExceeded("deadline was cancelled")
+
+        if self.remaining() <= 0:
+            raise DeadlineExceeded("deadline ran out")
+
+
+    def result(self, future):
+        '''
+        waits on a future for as long as the budget allows
+
+        returns: the future's result, raises DeadlineExceeded if the budget ran out first
+        '''
+        while not wait_within([future], self.remaining(), self):
+            self.check()
+
+        return future.result()
+
+
+def current_deadline():
+    '''
+    returns: the Deadline the caller is running inside of, or None
+    '''
+    return CURRENT_DEADLINE.get()
+
+
+def wait_within(futures, timeout, deadline=None):
+    '''
+    Helper function: concurrent.futures.wait(FIRST_COMPLETED) that also wakes up to check the deadline,
+    timeout=None waits until one finishes
+
+    returns: the set of finished futures, empty if timeout passed first,
+        raises DeadlineExceeded if the deadline ran out or was cancelled first
+    '''
+    if deadline is None:
+        finished, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+        return finished
+
+    give_up = float("inf") if timeout is None else time.monotonic() + timeout
+
+    while True:
+        deadline.check()
+
+        pause = min(CANCEL_CHECK, max(give_up - time.monotonic(), 0), deadline.remaining())
+        finished, _ = wait(futures, timeout=pause, return_when=FIRST_COMPLETED)
+
+        if finished or time.monotonic() >= give_up:
+            return finished
+
+
+def submit(pool, fn, *args, **kwargs):
+    '''
+    pool.submit that carries the caller's deadline (and any other context) over to the worker thread,
+    every fan-out helper submits through this
+    '''
+    return pool.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+async def run_async(pool, fn, *args, **kwargs):
+    '''
+    description:
+        runs a blocking LiongardAPI call on pool (None is the event loop's default executor)
+        from asyncio code, inside of its own Deadline
+        so that cancelling the awaiting task (or asyncio.wait_for timing out) cancels the
+        requests the call is making
+
+    returns: whatever fn returns
+    '''
+    deadline = Deadline()
+    context = contextvars.copy_context()
+    context.run(CURRENT_DEADLINE.set, deadline)
+
+    loop = asyncio.get_running_loop()
+
+    try:
+        return await loop.run_in_executor(pool, lambda: context.run(fn, *args, **kwargs))
+    except asyncio.CancelledError:
+        deadline.cancel()
+        raise
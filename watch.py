@@ -0,0 +1,318 @@
+'''
+Change events for any LiongardAPI list method
+
+A watch polls a list method such as get_agents or get_alerts. It keeps a hash of every record
+keyed by its ID and reports what was added, removed or modified since the last poll. Polling
+speeds up while things are changing and slows down while they are quiet, with some jitter so
+watches started together do not all fire at the same moment. Every watch on a scheduler shares
+one scheduling thread, one worker pool and the LiongardAPI instance's connection pool.
+
+Usage:
+    scheduler = WatchScheduler(test)
+
+    def on_change(event):
+        print(event["type"], event["ID"])
+
+    scheduler.watch("get_agents", on_change, min_interval=10, max_interval=300)
+    alerts = scheduler.watch("get_alerts")
+
+    async for event in alerts.events():           # from asyncio code
+        print(event["type"], event["record"]["Name"])
+
+    scheduler.stop()
+
+Watches on the plain list methods (see LIST_PATHS in main.py) pull through LiongardAPI.get_list,
+so a list that really went empty reports every record as removed. A watch called with args or
+kwargs goes through the method itself, where an empty list and a failed pull both come back as
+0 and are skipped alike.
+
+Events are dictionaries:
+    {"watch": "get_agents", "type": "added" | "removed" | "modified",
+     "ID": ..., "record": <new record or None>, "previous": <old record or None>}
+'''
+
+import json
+import time
+import heapq
+import random
+import asyncio
+import hashlib
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from main import LIST_PATHS
+
+
+def record_hash(record):
+    '''
+    Helper function: hash of a record that does not depend on key order
+    '''
+    return hashlib.blake2b(json.dumps(record, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+class Watch():
+    '''
+    Purpose:
+        one list method being polled, created by WatchScheduler.watch
+
+    List of Methods:
+        def subscribe(self, callback)
+        def events(self)
+        def stop(self)
+    '''
+
+    def __init__(self, scheduler, method, args, kwargs, key, min_interval, max_interval, jitter, emit_initial):
+        self.scheduler = scheduler
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.key = key
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.emit_initial = emit_initial
+
+        self.interval = min_interval
+        self.hashes = None
+        self.records = {}
+        self.callbacks = []
+        self.queues = []
+        self.lock = threading.Lock()
+        self.stopped = False
+        self.polls = 0
+
+
+    def subscribe(self, callback):
+        '''
+        callback(event) is called on a scheduler worker thread for every event
+        '''
+        with self.lock:
+            self.callbacks.append(callback)
+
+
+    async def events(self):
+        '''
+        async iterator of events, use with: async for event in watch.events()
+        '''
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        subscriber = (loop, queue)
+
+        with self.lock:
+            self.queues.append(subscriber)
+
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            with self.lock:
+                if subscriber in self.queues:
+                    self.queues.remove(subscriber)
+
+
+    def stop(self):
+        '''
+        stops polling and ends every events() iterator
+        '''
+        self.stopped = True
+
+        with self.lock:
+            for loop, queue in self.queues:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+
+    def emit(self, event):
+        '''
+        Helper function: hands an event to every callback and async subscriber
+        '''
+        with self.lock:
+            callbacks = list(self.callbacks)
+            queues = list(self.queues)
+
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as error:
+                print(f"watch {self.method}: callback raised {error}")
+
+        for loop, queue in queues:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+
+    def poll(self):
+        '''
+        Helper function: one poll, diffs against the last snapshot and emits the events
+
+        returns: number of events emitted, None if the poll failed
+        '''
+        api = self.scheduler.api
+
+        try:
+            if not self.args and not self.kwargs and self.method in LIST_PATHS:
+                records = api.get_list(self.method)
+            else:
+                records = getattr(api, self.method)(*self.args, **self.kwargs)
+        except Exception as error:
+            print(f"watch {self.method}: poll failed: {error}")
+            return None
+
+        if records is False or records == 0 or records is None:
+            print(f"watch {self.method}: poll returned no data, keeping the last snapshot")
+            return None
+
+        self.polls += 1
+
+        current = {}
+        hashes = {}
+        for record in records:
+            ID = record.get(self.key)
+            current[ID] = record
+            hashes[ID] = record_hash(record)
+
+        events = []
+
+        if self.hashes is None:
+            if self.emit_initial:
+                events = [{"watch": self.method, "type": "added", "ID": ID, "record": record, "previous": None} for ID, record in current.items()]
+        else:
+            for ID, digest in hashes.items():
+                if ID not in self.hashes:
+                    events.append({"watch": self.method, "type": "added", "ID": ID, "record": current[ID], "previous": None})
+                elif self.hashes[ID] != digest:
+                    events.append({"watch": self.method, "type": "modified", "ID": ID, "record": current[ID], "previous": self.records[ID]})
+
+            for ID in self.hashes:
+                if ID not in hashes:
+                    events.append({"watch": self.method, "type": "removed", "ID": ID, "record": None, "previous": self.records[ID]})
+
+        self.hashes = hashes
+        self.records = current
+
+        for event in events:
+            self.emit(event)
+
+        return len(events)
+
+
+    def next_delay(self, changes):
+        '''
+        Helper function: halves the interval after a change, stretches it by half while quiet
+        or failing, then adds +/- jitter
+        '''
+        if changes:
+            self.interval = max(self.min_interval, self.interval / 2)
+        else:
+            self.interval = min(self.max_interval, self.interval * 1.5)
+
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class WatchScheduler():
+    '''
+    Purpose:
+        runs any number of watches on one scheduling thread and a shared worker pool
+
+    Usage:
+        workers ---> max polls running at the same time
+
+    List of Methods:
+        def watch(self, method, callback=None, min_interval=5, max_interval=300, jitter=0.1, key="ID", emit_initial=False, args=(), kwargs=None)
+        def stop(self)
+    '''
+
+    def __init__(self, api, workers=4):
+        self.api = api
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+
+        self.queue = []
+        self.watches = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.running = True
+
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+
+    def watch(self, method, callback=None, min_interval=5, max_interval=300, jitter=0.1, key="ID", emit_initial=False, args=(), kwargs=None):
+        '''
+        description:
+            starts polling method ---> name of a LiongardAPI list method, ex: "get_agents"
+
+            callback ---> optional callback(event), more can be added with watch.subscribe
+            min_interval/max_interval ---> bounds in seconds on the time between polls
+            jitter ---> fraction every delay is randomly stretched or shrunk by
+            key ---> field that identifies a record
+            emit_initial ---> report everything in the first poll as "added"
+
+        returns: Watch
+        '''
+        if not hasattr(self.api, method):
+            raise ValueError(f"LiongardAPI has no method called {method}")
+
+        watch = Watch(self, method, args, kwargs or {}, key, min_interval, max_interval, jitter, emit_initial)
+        if callback is not None:
+            watch.subscribe(callback)
+
+        self.watches.append(watch)
+        self._schedule(watch, 0)
+
+        return watch
+
+
+    def _schedule(self, watch, delay):
+        with self.condition:
+            heapq.heappush(self.queue, (time.monotonic() + delay, next(self.counter), watch))
+            self.condition.notify()
+
+
+    def _loop(self):
+        '''
+        Helper function: the scheduling thread, hands watches that are due to the pool
+        '''
+        while True:
+            with self.condition:
+                while self.running and (not self.queue or self.queue[0][0] > time.monotonic()):
+                    self.condition.wait(None if not self.queue else self.queue[0][0] - time.monotonic())
+
+                if not self.running:
+                    return
+
+                _, _, watch = heapq.heappop(self.queue)
+
+            if watch.stopped:
+                continue
+
+            try:
+                self.pool.submit(self._run, watch)
+            except RuntimeError:
+                # stop() shut the pool down between taking the watch off the queue and here
+                return
+
+
+    def _run(self, watch):
+        '''
+        Helper function: polls on a worker and puts the watch back on the schedule
+        '''
+        changes = watch.poll()
+
+        if not watch.stopped and self.running:
+            self._schedule(watch, watch.next_delay(changes))
+
+
+    def stop(self):
+        '''
+        stops every watch and the scheduling thread
+        '''
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+        for watch in self.watches:
+            watch.stop()
+
+        self.pool.shutdown(wait=False)